@@ -1,6 +1,40 @@
-from django.db.models import Sum
-from django.contrib import admin
-from .models import Booking
+import io
+from datetime import timedelta
+from django.contrib import admin, messages
+from django.contrib.admin.views.main import ChangeList
+from django.http import StreamingHttpResponse
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path
+from django.utils.timezone import now
+from restaurant.models import Restaurant, slot_label
+from .analytics import booking_facts, occupancy_report
+from .bulk import (
+    READ_ERRORS, export_bookings, format_for, import_bookings,
+    read_error_message, read_rows
+)
+from .forms import (
+    BookingAdminForm, BookingImportForm, OccupancyDashboardForm
+)
+from .models import Booking, BookingArchive, SlotOccupancy, WaitlistEntry
+
+
+class BookingChangeList(ChangeList):
+    """
+    Changelist for :model:`booking.Booking` that loads the occupancy of
+    every slot on the current page in one query, so :meth:`spots_left`
+    does not run a query per row.
+    """
+    def get_results(self, request):
+        super().get_results(request)
+        occupancy = SlotOccupancy.seats_for(self.result_list)
+        for booking in self.result_list:
+            booking.slot_seats = occupancy.get(
+                (booking.restaurant_id,
+                 booking.booking_date,
+                 booking.time_slot),
+                0
+            )
 
 
 # Register your models here.
@@ -14,7 +48,7 @@ class BookingAdmin(admin.ModelAdmin):
     - user
     - restaurant
     - booking_date
-    - time_slot
+    - time_slot (as its label)
     - number_of_people
     - get_status
     - spots_left
@@ -24,11 +58,19 @@ class BookingAdmin(admin.ModelAdmin):
     - Filter by restaurant, booking status, and date.
     - Search by username, restaurant name, and special requests.
     - Ordering defaults to most recent bookings.
+    - Restaurant, user and slot occupancy are loaded per page rather than
+      per row; see :class:`BookingChangeList`.
+    - "Export selected bookings as CSV" action and an "Import bookings"
+      page, both streaming; see :mod:`booking.bulk`.
+    - "Occupancy dashboard" page with utilisation and cancellations per
+      weekday and slot, and lead times; see :mod:`booking.analytics`.
+    - The tables a booking is seated at are shown on its page; they are
+      assigned when it is saved.
     """
     list_display = ('user',
                     'restaurant_city',
                     'booking_date',
-                    'time_slot',
+                    'slot',
                     'num_people',
                     'get_status',
                     'spots_left',
@@ -37,11 +79,140 @@ class BookingAdmin(admin.ModelAdmin):
     list_filter = ('restaurant__city', 'status', 'booking_date')
     search_fields = ('user__username', 'restaurant__name', 'special_requests')
     ordering = ('-booking_date', '-time_slot')
+    list_select_related = ('restaurant', 'user')
+    form = BookingAdminForm
+    readonly_fields = ('seated_at',)
+    actions = ['export_csv']
+    change_list_template = 'admin/booking/booking/change_list.html'
+
+    def get_changelist(self, request, **kwargs):
+        return BookingChangeList
+
+    def get_urls(self):
+        return [
+            path(
+                'import/',
+                self.admin_site.admin_view(self.import_view),
+                name='booking_booking_import',
+            ),
+            path(
+                'dashboard/',
+                self.admin_site.admin_view(self.dashboard_view),
+                name='booking_booking_dashboard',
+            ),
+        ] + super().get_urls()
+
+    @admin.action(description="Export selected bookings as CSV")
+    def export_csv(self, request, queryset):
+        response = StreamingHttpResponse(
+            export_bookings(queryset, 'csv'), content_type='text/csv'
+        )
+        response['Content-Disposition'] = (
+            'attachment; filename="bookings.csv"'
+        )
+        return response
+
+    def import_view(self, request):
+        """
+        Import bookings from an uploaded CSV or JSONL file and report the
+        created and rejected rows, or show the form again with an error
+        if the file is not UTF-8 text or not well-formed CSV.
+        """
+        if not self.has_add_permission(request):
+            return redirect('admin:booking_booking_changelist')
+
+        form = BookingImportForm(request.POST or None, request.FILES or None)
+        if request.method == 'POST' and form.is_valid():
+            upload = form.cleaned_data['file']
+            dry_run = form.cleaned_data['dry_run']
+            stream = io.TextIOWrapper(
+                upload.file, encoding='utf-8-sig', newline=''
+            )
+            try:
+                result = import_bookings(
+                    read_rows(stream, format_for(upload.name)),
+                    dry_run=dry_run,
+                )
+            except READ_ERRORS as error:
+                form.add_error('file', read_error_message(error, dry_run))
+            else:
+                verb = "Would import" if dry_run else "Imported"
+                self.message_user(
+                    request,
+                    f"{verb} {result.created} bookings; "
+                    f"rejected {result.rejected} rows.",
+                    messages.WARNING if result.rejected
+                    else messages.SUCCESS,
+                )
+                for line, message in result.errors[:20]:
+                    self.message_user(
+                        request, f"Line {line}: {message}", messages.ERROR
+                    )
+                return redirect('admin:booking_booking_changelist')
+
+        return TemplateResponse(
+            request,
+            'admin/booking/booking/import.html',
+            {
+                **self.admin_site.each_context(request),
+                'opts': self.model._meta,
+                'title': "Import bookings",
+                'form': form,
+            },
+        )
+
+    def dashboard_view(self, request):
+        """
+        Show the occupancy of a restaurant over a date range, by default
+        the first restaurant over the last twelve weeks.
+        """
+        if not self.has_view_permission(request):
+            return redirect('admin:index')
+
+        data = request.GET
+        if not data:
+            restaurant = Restaurant.objects.order_by('name').first()
+            today = now().date()
+            data = {
+                'restaurant': restaurant and restaurant.pk,
+                'start': today - timedelta(weeks=12),
+                'end': today,
+            }
+        form = OccupancyDashboardForm(data)
+        report = None
+        if form.is_valid():
+            report = occupancy_report(
+                booking_facts(),
+                form.cleaned_data['restaurant'],
+                form.cleaned_data['start'],
+                form.cleaned_data['end'],
+            )
+
+        return TemplateResponse(
+            request,
+            'admin/booking/booking/dashboard.html',
+            {
+                **self.admin_site.each_context(request),
+                'opts': self.model._meta,
+                'title': "Occupancy dashboard",
+                'form': form,
+                'report': report,
+            },
+        )
 
     def num_people(self, obj):
         return obj.number_of_people
     num_people.short_description = 'Guests'
 
+    def slot(self, obj):
+        return obj.time_slot_label
+    slot.short_description = 'Time slot'
+    slot.admin_order_field = 'time_slot'
+
+    def seated_at(self, obj):
+        return ", ".join(table.name for table in obj.tables.all()) or "-"
+    seated_at.short_description = 'Tables'
+
     def restaurant_city(self, obj):
         return obj.restaurant.city
     restaurant_city.short_description = 'City'
@@ -54,7 +225,7 @@ class BookingAdmin(admin.ModelAdmin):
             + ("..." if len(obj.special_requests) > 20 else "")
         )
     short_request.short_description = 'Request'
-    
+
     def get_status(self, obj):
         """
         Return the human-readable booking status.
@@ -72,11 +243,100 @@ class BookingAdmin(admin.ModelAdmin):
         if not obj.restaurant:
             return "N/A"
 
-        current_bookings = Booking.objects.filter(
-            restaurant=obj.restaurant,
-            booking_date=obj.booking_date,
-            time_slot=obj.time_slot,
-            status=1,  # Only count 'Confirmed' bookings
-        ).aggregate(Sum('number_of_people'))['number_of_people__sum'] or 0
+        if hasattr(obj, 'slot_seats'):
+            current_bookings = obj.slot_seats
+        else:
+            current_bookings = SlotOccupancy.seats_for([obj]).get(
+                (obj.restaurant_id, obj.booking_date, obj.time_slot), 0
+            )
 
         return obj.restaurant.online_capacity - current_bookings
+
+
+@admin.register(WaitlistEntry)
+class WaitlistEntryAdmin(admin.ModelAdmin):
+    """
+    Admin interface for :model:`booking.WaitlistEntry`.
+
+    **Displayed fields:**
+
+    - user
+    - restaurant
+    - booking_date
+    - time_slot (as its label)
+    - number_of_people
+    - status
+    - created_at
+
+    **Features:**
+
+    - Filter by restaurant, status and date.
+    - Entries are listed in queue order.
+    """
+    list_display = ('user',
+                    'restaurant',
+                    'booking_date',
+                    'slot',
+                    'number_of_people',
+                    'status',
+                    'created_at'
+                    )
+    list_filter = ('restaurant', 'status', 'booking_date')
+    search_fields = ('user__username', 'restaurant__name')
+    list_select_related = ('restaurant', 'user')
+    raw_id_fields = ('user', 'booking')
+
+    def slot(self, obj):
+        return slot_label(obj.time_slot)
+    slot.short_description = 'Time slot'
+    slot.admin_order_field = 'time_slot'
+
+
+@admin.register(BookingArchive)
+class BookingArchiveAdmin(admin.ModelAdmin):
+    """
+    Read-only admin interface for :model:`booking.BookingArchive`.
+
+    **Displayed fields:**
+
+    - user
+    - restaurant
+    - booking_date
+    - time_slot (as its label)
+    - number_of_people
+    - status
+    - archived_at
+
+    **Features:**
+
+    - Filter by city, status and date; on PostgreSQL a date filter only
+      reads the yearly partitions it covers.
+    - Search by username and restaurant name.
+    - The unfiltered total is not counted, which would read every
+      partition.
+    - Archived bookings cannot be added or changed; deleting is allowed.
+    """
+    list_display = ('user',
+                    'restaurant',
+                    'booking_date',
+                    'slot',
+                    'number_of_people',
+                    'status',
+                    'archived_at'
+                    )
+    list_filter = ('restaurant__city', 'status', 'booking_date')
+    search_fields = ('user__username', 'restaurant__name')
+    show_full_result_count = False
+    ordering = ('-booking_date', '-time_slot')
+    list_select_related = ('restaurant', 'user')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def slot(self, obj):
+        return obj.time_slot_label
+    slot.short_description = 'Time slot'
+    slot.admin_order_field = 'time_slot'
@@ -0,0 +1,218 @@
+"""
+Occupancy analytics over every booking ever made, archived ones
+included, for the admin dashboard.
+
+The facts needed (restaurant, date, slot, party size, status and lead
+time of each booking) are read in one query into NumPy columns and
+cached. Later loads only read the bookings saved since the last build
+and patch them in, so opening the dashboard does not re-read years of
+history. Reports are aggregated from the columns with vectorised NumPy
+operations.
+"""
+from datetime import timedelta
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.functions import TruncDate
+from django.utils.timezone import now
+from .models import (
+    BOOKING_FACTS_CACHE_KEY as CACHE_KEY, Booking, BookingArchive
+)
+
+# Bookings saved this long before the last build are read again, so a
+# booking committed while the previous build was running is not missed.
+REFRESH_OVERLAP = timedelta(minutes=5)
+
+# Lower bounds, in days, of the lead time buckets shown.
+LEAD_TIME_BUCKETS = (0, 1, 3, 7, 14, 30, 60)
+
+WEEKDAYS = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday',
+            'Saturday', 'Sunday')
+
+COLUMNS = {
+    'id': np.int64,
+    'restaurant': np.int64,
+    'day': np.int32,
+    'slot': np.int16,
+    'people': np.int16,
+    'cancelled': np.bool_,
+    'lead': np.int32,
+}
+
+
+def _cache_timeout():
+    return getattr(settings, 'ANALYTICS_CACHE_TIMEOUT', 60 * 60 * 24)
+
+
+def read_facts(*querysets):
+    """
+    Return the columns of :const:`COLUMNS` for querysets of
+    :model:`booking.Booking` or :model:`booking.BookingArchive`, read in
+    one query. Days are proleptic ordinals (see
+    :meth:`datetime.date.toordinal`) and the lead time is the number of
+    days between making a booking and its date.
+    """
+    first, *others = [
+        bookings.order_by().annotate(
+            made_on=TruncDate('created_at')
+        ).values_list('id', 'restaurant_id', 'booking_date', 'time_slot',
+                      'number_of_people', 'status', 'made_on')
+        for bookings in querysets
+    ]
+    rows = first.union(*others, all=True) if others else first
+    values = [
+        (pk, restaurant, day.toordinal(), slot, people, status == 2,
+         (day - made_on).days)
+        for pk, restaurant, day, slot, people, status, made_on in rows
+    ]
+    return {
+        name: np.array([row[i] for row in values], dtype=dtype)
+        for i, (name, dtype) in enumerate(COLUMNS.items())
+    }
+
+
+def _merge(facts, changed):
+    """
+    Return ``facts`` with the rows of ``changed`` replacing those with
+    the same id, and new ids added, sorted by id.
+    """
+    keep = ~np.isin(facts['id'], changed['id'])
+    merged = {
+        name: np.concatenate([facts[name][keep], changed[name]])
+        for name in COLUMNS
+    }
+    order = np.argsort(merged['id'], kind='stable')
+    return {name: column[order] for name, column in merged.items()}
+
+
+def booking_facts():
+    """
+    Return the booking facts, as :func:`read_facts`, of every booking,
+    including those moved to :model:`booking.BookingArchive`.
+
+    The facts are kept in the cache with the time they were read. When
+    cached, only bookings saved since then are read again; a deleted
+    booking drops the cache entry (see
+    :func:`booking.models.forget_booking_facts`), so the next call
+    reads everything; archiving deletes the bookings it moves, which
+    are then read from the archive under the same ids. Bookings moving
+    between 'Confirmed' and 'Completed' through ``QuerySet.update()``
+    are not picked up, which does not change any figure.
+    """
+    cached = cache.get(CACHE_KEY)
+    started = now()
+    if cached is None:
+        facts = read_facts(Booking.objects.all(),
+                           BookingArchive.objects.all())
+    else:
+        changed = read_facts(Booking.objects.filter(
+            updated_at__gte=cached['read_at'] - REFRESH_OVERLAP
+        ))
+        facts = _merge(cached['facts'], changed)
+    cache.set(CACHE_KEY, {'read_at': started, 'facts': facts},
+              _cache_timeout())
+    return facts
+
+
+def _value(number):
+    return None if np.isnan(number) else float(number)
+
+
+def occupancy_report(facts, restaurant, start, end):
+    """
+    Return the occupancy of a :model:`restaurant.Restaurant` from
+    ``start`` to ``end`` (inclusive), built from ``facts``:
+
+    ``slots``
+        The ``(start, label)`` pairs of the slots reported.
+    ``cube``
+        Seats held by bookings that were not cancelled, as an array of
+        dates × slots.
+    ``utilisation``
+        Per weekday and slot, the share of the online capacity taken,
+        averaged over the dates in the range.
+    ``cancelled``
+        Per weekday and slot, the share of booked seats later cancelled
+        (a proxy for no-shows), or NaN without bookings.
+    ``weekdays``
+        ``(weekday, cells)`` for each weekday, where ``cells`` hold the
+        ``(utilisation, cancelled)`` of each slot, None for no value.
+    ``lead_times``
+        ``(label, bookings, share)`` for each lead time bucket of the
+        bookings that were not cancelled.
+    ``bookings``, ``seats``, ``cancelled_share``
+        Totals over the range.
+    """
+    slots = restaurant.get_time_slots()
+    starts = np.array([value for value, _ in slots])
+    first, days = start.toordinal(), (end - start).days + 1
+
+    rows = (
+        (facts['restaurant'] == restaurant.pk)
+        & (facts['day'] >= first) & (facts['day'] < first + days)
+        & np.isin(facts['slot'], starts)
+    )
+    day = facts['day'][rows] - first
+    slot = np.searchsorted(starts, facts['slot'][rows])
+    people = facts['people'][rows]
+    cancelled = facts['cancelled'][rows]
+    cell = day * len(starts) + slot
+
+    size = days * len(starts)
+    kept = np.bincount(cell[~cancelled], weights=people[~cancelled],
+                       minlength=size).reshape(days, len(starts))
+    lost = np.bincount(cell[cancelled], weights=people[cancelled],
+                       minlength=size).reshape(days, len(starts))
+
+    # Monday is 0, as for date.weekday(); ordinal 1 was a Monday.
+    weekday = (np.arange(first, first + days) - 1) % 7
+    dates_per_weekday = np.bincount(weekday, minlength=7)
+    kept_by_weekday = np.zeros((7, len(starts)))
+    lost_by_weekday = np.zeros((7, len(starts)))
+    np.add.at(kept_by_weekday, weekday, kept)
+    np.add.at(lost_by_weekday, weekday, lost)
+
+    capacity = restaurant.online_capacity * dates_per_weekday[:, None]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        utilisation = np.where(capacity > 0,
+                               kept_by_weekday / capacity, np.nan)
+        booked = kept_by_weekday + lost_by_weekday
+        cancelled_rate = np.where(booked > 0,
+                                  lost_by_weekday / booked, np.nan)
+
+    # Bookings entered after their date (e.g. imported) count as same day.
+    lead = np.maximum(facts['lead'][rows][~cancelled], 0)
+    counts = np.bincount(
+        np.searchsorted(LEAD_TIME_BUCKETS, lead, side='right') - 1,
+        minlength=len(LEAD_TIME_BUCKETS)
+    )
+    labels = [
+        f"{low}-{high - 1} days" if high - low > 1 else f"{low} days"
+        for low, high in zip(LEAD_TIME_BUCKETS, LEAD_TIME_BUCKETS[1:])
+    ] + [f"{LEAD_TIME_BUCKETS[-1]}+ days"]
+    total = counts.sum()
+
+    seats = kept.sum()
+    return {
+        'slots': slots,
+        'cube': kept,
+        'utilisation': utilisation,
+        'cancelled': cancelled_rate,
+        'weekdays': [
+            (name, [
+                (_value(used), _value(lost))
+                for used, lost in zip(utilisation[i], cancelled_rate[i])
+            ])
+            for i, name in enumerate(WEEKDAYS)
+        ],
+        'lead_times': [
+            (label, int(count), float(count / total) if total else 0.0)
+            for label, count in zip(labels, counts)
+        ],
+        'bookings': int((~cancelled).sum()),
+        'seats': int(seats),
+        'cancelled_share': (
+            float(lost.sum() / (seats + lost.sum()))
+            if seats + lost.sum() else 0.0
+        ),
+    }
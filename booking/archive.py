@@ -0,0 +1,203 @@
+"""
+Move long-past bookings out of the booking table into
+:model:`booking.BookingArchive`.
+
+Bookings are never deleted, so without archiving the table read by every
+booking page and the admin keeps growing with years of history. Only
+cancelled and completed bookings are moved; they no longer hold seats,
+tables or waitlist places.
+
+On PostgreSQL the archive is range-partitioned by ``booking_date`` with
+one partition per year (see
+:class:`booking.operations.PartitionByRangeIfPostgres`): partitions are
+created before rows for their year are moved in, and old years can be
+detached into tables of their own, to be dumped and dropped. The
+booking table itself is not partitioned, as seat, table and waitlist
+rows refer to bookings by id alone. Other databases keep the archive in
+one plain table.
+"""
+from datetime import date
+from django.db import connection, transaction
+from .models import Booking, BookingArchive
+
+# Cancelled and completed bookings are archived this many days after
+# their date by default.
+ARCHIVE_AFTER_DAYS = 365
+
+# Statuses of the bookings archived: 'Cancelled' and 'Completed'.
+ARCHIVED_STATUSES = (2, 3)
+
+# Fields copied from each booking.
+ARCHIVED_FIELDS = (
+    'id',
+    'user_id',
+    'restaurant_id',
+    'booking_date',
+    'time_slot',
+    'number_of_people',
+    'special_requests',
+    'status',
+    'created_at',
+    'updated_at',
+)
+
+
+def is_partitioned():
+    """
+    Return True if the archive is range-partitioned by year, which it is
+    on PostgreSQL.
+    """
+    return connection.vendor == 'postgresql'
+
+
+def partition_name(year):
+    """Return the table name of the archive partition for ``year``."""
+    return f"{BookingArchive._meta.db_table}_y{year}"
+
+
+def _partition_tables():
+    """
+    Return ``{year: (table, attached)}`` for every table named like an
+    archive partition, whether attached to the archive or detached by
+    :func:`detach_partitions` and not dropped yet.
+    """
+    prefix = partition_name('')
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT child.relname, parent.relname = %s FROM pg_class child "
+            "LEFT JOIN pg_inherits ON pg_inherits.inhrelid = child.oid "
+            "LEFT JOIN pg_class parent ON pg_inherits.inhparent = parent.oid "
+            "WHERE child.relkind = 'r' AND starts_with(child.relname, %s) "
+            "AND pg_table_is_visible(child.oid)",
+            [BookingArchive._meta.db_table, prefix],
+        )
+        rows = cursor.fetchall()
+    return {
+        int(name[len(prefix):]): (name, bool(attached))
+        for name, attached in rows
+        if name[len(prefix):].isdigit()
+    }
+
+
+def partitions():
+    """
+    Return ``{year: table}`` for the yearly partitions attached to the
+    archive, or an empty dict if it is not partitioned.
+    """
+    if not is_partitioned():
+        return {}
+    return {
+        year: name
+        for year, (name, attached) in _partition_tables().items()
+        if attached
+    }
+
+
+def detached_partitions():
+    """
+    Return ``{year: table}`` for the partitions detached from the archive
+    whose tables still exist.
+
+    Their tables keep the partition name, so the partition of such a
+    year cannot be created again: its bookings are left in the booking
+    table, and the year is skipped by :func:`create_partitions`, until
+    the detached table is dropped.
+    """
+    if not is_partitioned():
+        return {}
+    return {
+        year: name
+        for year, (name, attached) in _partition_tables().items()
+        if not attached
+    }
+
+
+def create_partitions(years):
+    """
+    Create the archive partitions missing for ``years`` and return their
+    table names; does nothing unless the archive is partitioned. Years
+    of :func:`detached_partitions` are skipped.
+    """
+    if not is_partitioned():
+        return []
+    quote = connection.ops.quote_name
+    missing = sorted(set(years) - set(_partition_tables()))
+    with connection.cursor() as cursor:
+        for year in missing:
+            cursor.execute(
+                f"CREATE TABLE {quote(partition_name(year))} "
+                f"PARTITION OF {quote(BookingArchive._meta.db_table)} "
+                f"FOR VALUES FROM (%s) TO (%s)",
+                [date(year, 1, 1), date(year + 1, 1, 1)],
+            )
+    return [partition_name(year) for year in missing]
+
+
+def detach_partitions(before_year):
+    """
+    Detach the archive partitions of the years before ``before_year``
+    and return their table names. The detached tables keep their rows
+    but are no longer read through :model:`booking.BookingArchive`.
+    """
+    if not is_partitioned():
+        return []
+    quote = connection.ops.quote_name
+    detached = [
+        name for year, name in sorted(partitions().items())
+        if year < before_year
+    ]
+    with connection.cursor() as cursor:
+        for name in detached:
+            cursor.execute(
+                f"ALTER TABLE {quote(BookingArchive._meta.db_table)} "
+                f"DETACH PARTITION {quote(name)}"
+            )
+    return detached
+
+
+def archivable(before):
+    """
+    Return the cancelled and completed :model:`booking.Booking` dated
+    before ``before``, except those of years whose partition is detached
+    (see :func:`detached_partitions`).
+    """
+    bookings = Booking.objects.filter(
+        booking_date__lt=before, status__in=ARCHIVED_STATUSES
+    )
+    for year in detached_partitions():
+        bookings = bookings.exclude(booking_date__year=year)
+    return bookings
+
+
+def archive_bookings(before, batch_size=1000):
+    """
+    Move the bookings of :func:`archivable` into the archive and return
+    how many were moved.
+
+    Bookings are moved oldest first in chunks of ``batch_size``, each
+    chunk copied and deleted in its own short transaction with its rows
+    locked, so a booking is never in both tables or in neither. The
+    partitions for the years moved are created first.
+    """
+    bookings = archivable(before)
+    create_partitions(
+        day.year for day in bookings.dates('booking_date', 'year')
+    )
+    moved = 0
+    while True:
+        with transaction.atomic():
+            rows = list(
+                bookings.select_for_update()
+                .order_by('booking_date', 'pk')
+                .values(*ARCHIVED_FIELDS)[:batch_size]
+            )
+            if not rows:
+                break
+            BookingArchive.objects.bulk_create(
+                BookingArchive(**row) for row in rows
+            )
+            Booking.objects.filter(
+                pk__in=[row['id'] for row in rows]
+            ).delete()
+        moved += len(rows)
+    return moved
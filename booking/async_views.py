@@ -0,0 +1,123 @@
+from asgiref.sync import sync_to_async
+from django.contrib import messages
+from django.http import Http404, JsonResponse
+from django.shortcuts import redirect, render
+from django.template.loader import render_to_string
+from kode_restaurant.async_utils import async_login_required
+from kode_restaurant.replicas import primary_only
+from restaurant.models import Restaurant
+from .availability import aslot_availability
+from .forms import BookingForm
+from .pagination import PAST, SECTIONS, UPCOMING, abookings_page
+from .views import (
+    WAITLIST_MESSAGE, availability_data, availability_range, place_booking
+)
+
+# Async versions of the busiest booking views, used when ``ASYNC_VIEWS``
+# is enabled and the site is served over ASGI (see kode_restaurant.asgi).
+# Reads use the async ORM. Django's async ORM has no transactions, so
+# validating and reserving a booking runs in one worker thread through
+# :func:`booking.views.place_booking`.
+
+
+async def _restaurant_or_404(slug):
+    restaurant = await Restaurant.objects.filter(slug=slug).afirst()
+    if restaurant is None:
+        raise Http404("No restaurant matches the given slug.")
+    return restaurant
+
+
+@primary_only
+@async_login_required
+async def create_booking(request, slug):
+    """
+    Async version of :view:`booking.views.create_booking`.
+    """
+    restaurant = await _restaurant_or_404(slug)
+
+    if request.method == 'POST':
+        form = BookingForm(request.POST, restaurant=restaurant)
+        if await sync_to_async(place_booking)(request, restaurant, form):
+            messages.success(request,
+                             "Your booking has been created successfully!"
+                             )
+            return redirect('my_bookings')
+        if form.waitlist_entry:
+            messages.info(request, WAITLIST_MESSAGE)
+            return redirect('my_bookings')
+
+    else:
+        form = BookingForm(restaurant=restaurant)
+
+    return render(
+        request,
+        'booking/create_booking.html',
+        {
+            'form': form,
+            'restaurant': restaurant
+        }
+    )
+
+
+@async_login_required
+async def my_bookings(request):
+    """
+    Async version of :view:`booking.views.my_bookings`.
+    """
+    upcoming, upcoming_next = await abookings_page(request.user, UPCOMING)
+    past, past_next = await abookings_page(request.user, PAST)
+
+    return render(
+        request,
+        'booking/my_bookings.html',
+        {
+            'upcoming': upcoming,
+            'upcoming_next': upcoming_next,
+            'past': past,
+            'past_next': past_next,
+            'bookings': upcoming + past,
+        })
+
+
+@async_login_required
+async def more_bookings(request):
+    """
+    Async version of :view:`booking.views.more_bookings`.
+    """
+    section = request.GET.get('section')
+    if section not in SECTIONS:
+        return JsonResponse({'error': "Unknown section."}, status=400)
+    try:
+        bookings, next_cursor = await abookings_page(
+            request.user, section, request.GET.get('after')
+        )
+    except ValueError:
+        return JsonResponse({'error': "Invalid cursor."}, status=400)
+
+    context = {'bookings': bookings}
+    return JsonResponse({
+        'rows': render_to_string(
+            'booking/includes/booking_rows.html', context, request
+        ),
+        'cards': render_to_string(
+            'booking/includes/booking_cards.html', context, request
+        ),
+        'next': next_cursor,
+    })
+
+
+async def availability(request, slug):
+    """
+    Async version of :view:`booking.views.availability`.
+    """
+    restaurant = await _restaurant_or_404(slug)
+    try:
+        start, end = availability_range(request)
+    except ValueError:
+        return JsonResponse(
+            {'error': "Dates must be given as YYYY-MM-DD."}, status=400
+        )
+    remaining, largest = await aslot_availability(restaurant, start, end)
+    return JsonResponse(
+        availability_data(restaurant, start, end, remaining, largest)
+    )
@@ -0,0 +1,306 @@
+from datetime import timedelta
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.timezone import now
+from kode_restaurant.replicas import read_from_primary
+from restaurant.models import Table
+from .models import Booking, SlotOccupancy, availability_cache_key
+from .tables import SlotPlan
+
+BOOKING_WINDOW_DAYS = 180
+
+# Largest party the booking forms offer.
+LARGEST_PARTY = 6
+
+
+def booking_window():
+    """
+    Return the first and last dates that can currently be booked:
+    tomorrow up to :const:`BOOKING_WINDOW_DAYS` days ahead.
+    """
+    today = now().date()
+    return (
+        today + timedelta(days=1),
+        today + timedelta(days=BOOKING_WINDOW_DAYS)
+    )
+
+
+def _occupied_slots(restaurant, first_day, last_day):
+    return SlotOccupancy.objects.filter(
+        restaurant=restaurant,
+        booking_date__range=(first_day, last_day),
+        seats__gt=0,
+    ).values_list('booking_date', 'time_slot', 'seats')
+
+
+def _cache_entry(first_day, rows):
+    taken = {}
+    for booking_date, time_slot, seats in rows:
+        taken.setdefault(booking_date, {})[time_slot] = seats
+    return {'first_day': first_day, 'taken': taken}
+
+
+def _cache_timeout():
+    return getattr(settings, 'AVAILABILITY_CACHE_TIMEOUT', 60 * 5)
+
+
+def seats_taken(restaurant):
+    """
+    Return ``{date: {time_slot: seats}}`` for every slot with confirmed
+    bookings in the booking window of a :model:`restaurant.Restaurant`.
+
+    The whole window is read from :model:`booking.SlotOccupancy` in one
+    query and cached per restaurant; the cache entry is dropped whenever
+    seats in that restaurant change and rebuilt when the day rolls over.
+    It is filled from the primary database, so a lagging replica cannot
+    put the seats from before a booking back in the cache.
+    """
+    first_day, last_day = booking_window()
+    key = availability_cache_key(restaurant.pk)
+    cached = cache.get(key)
+    if cached is not None and cached['first_day'] == first_day:
+        return cached['taken']
+
+    with read_from_primary():
+        entry = _cache_entry(
+            first_day, _occupied_slots(restaurant, first_day, last_day)
+        )
+    cache.set(key, entry, _cache_timeout())
+    return entry['taken']
+
+
+async def aseats_taken(restaurant):
+    """Async version of :func:`seats_taken`."""
+    first_day, last_day = booking_window()
+    key = availability_cache_key(restaurant.pk)
+    cached = await cache.aget(key)
+    if cached is not None and cached['first_day'] == first_day:
+        return cached['taken']
+
+    with read_from_primary():
+        entry = _cache_entry(first_day, [
+            row async for row in _occupied_slots(
+                restaurant, first_day, last_day
+            )
+        ])
+    await cache.aset(key, entry, _cache_timeout())
+    return entry['taken']
+
+
+def _remaining(taken, table_fit, restaurant, start, end):
+    slots = [start for start, _ in restaurant.get_time_slots()]
+    capacity = restaurant.online_capacity
+    remaining, largest = {}, {}
+    day = start
+    while day <= end:
+        booked = taken.get(day, {})
+        remaining[day], largest[day] = {}, {}
+        for slot in slots:
+            left = max(capacity - booked.get(slot, 0), 0)
+            party = table_fit.largest_party(restaurant, day, slot, left)
+            # Seats no table can take are not offered.
+            remaining[day][slot] = left if party else 0
+            largest[day][slot] = party
+        day += timedelta(days=1)
+    return remaining, largest
+
+
+def slot_availability(restaurant, start, end):
+    """
+    Return ``(remaining, largest)`` for every date from ``start`` to
+    ``end`` (inclusive) and every slot the restaurant offers, as
+    ``{date: {time_slot: value}}`` dicts.
+
+    ``remaining`` holds the online seats left and ``largest`` the
+    largest party that can still book the slot: at most
+    :const:`LARGEST_PARTY`, the seats left and, at restaurants with
+    tables, the party a table can seat. A slot where no table can seat
+    even one guest has no seats left.
+    """
+    return _remaining(
+        seats_taken(restaurant), _TableFit([restaurant], start, end),
+        restaurant, start, end
+    )
+
+
+async def aslot_availability(restaurant, start, end):
+    """Async version of :func:`slot_availability`."""
+    taken = await aseats_taken(restaurant)
+    table_fit = await sync_to_async(_TableFit)([restaurant], start, end)
+    return _remaining(taken, table_fit, restaurant, start, end)
+
+
+def _seats_taken_many(restaurants):
+    """
+    Return ``{restaurant_id: {date: {time_slot: seats}}}`` like
+    :func:`seats_taken` for several restaurants, reading those missing
+    from the cache in one query to the primary database.
+    """
+    first_day, last_day = booking_window()
+    keys = {availability_cache_key(r.pk): r.pk for r in restaurants}
+    taken = {
+        keys[key]: entry['taken']
+        for key, entry in cache.get_many(keys).items()
+        if entry['first_day'] == first_day
+    }
+    missing = [pk for pk in keys.values() if pk not in taken]
+    if missing:
+        rows = {pk: [] for pk in missing}
+        occupied = SlotOccupancy.objects.filter(
+            restaurant_id__in=missing,
+            booking_date__range=(first_day, last_day),
+            seats__gt=0,
+        ).values_list('restaurant_id', 'booking_date', 'time_slot', 'seats')
+        with read_from_primary():
+            for restaurant_id, *row in occupied:
+                rows[restaurant_id].append(row)
+        entries = {pk: _cache_entry(first_day, rows[pk]) for pk in missing}
+        cache.set_many(
+            {availability_cache_key(pk): entry
+             for pk, entry in entries.items()},
+            _cache_timeout()
+        )
+        taken.update(
+            (pk, entry['taken']) for pk, entry in entries.items()
+        )
+    return taken
+
+
+class _TableFit:
+    """
+    Seats parties, as :meth:`booking.Booking.save` would, at the active
+    :model:`restaurant.Table` of ``restaurants`` in the slots from
+    ``start`` to ``end``. Restaurants without tables seat any party
+    their online capacity allows.
+
+    The tables and the confirmed bookings of those restaurants are read
+    in two queries on creation, or one when none of them has tables.
+    """
+
+    def __init__(self, restaurants, start, end):
+        self.tables = {}
+        for restaurant_id, *table in Table.objects.filter(
+            restaurant__in=restaurants, is_active=True
+        ).order_by().values_list('restaurant_id', 'pk', 'seats',
+                                 'join_group'):
+            self.tables.setdefault(restaurant_id, []).append(tuple(table))
+        self.bookings = {}
+        self.largest = {}
+        if not self.tables:
+            return
+
+        active = {table[0] for rows in self.tables.values() for table in rows}
+        rows = Booking.objects.filter(
+            restaurant_id__in=self.tables,
+            booking_date__range=(start, end),
+            status=1,
+        ).order_by().values_list('restaurant_id', 'booking_date',
+                                 'time_slot', 'pk', 'number_of_people',
+                                 'tables')
+        for restaurant_id, day, slot, pk, party, table in rows:
+            seated = self.bookings.setdefault(
+                (restaurant_id, day, slot), {}
+            ).setdefault(pk, (party, []))[1]
+            if table in active:
+                seated.append(table)
+
+    def plan(self, restaurant, day, time_slot):
+        return SlotPlan(self.tables[restaurant.pk],
+                        self.bookings.get((restaurant.pk, day, time_slot),
+                                          {}))
+
+    def fits(self, restaurant, day, time_slot, people):
+        """Return True if a party of ``people`` can be seated."""
+        if restaurant.pk not in self.tables:
+            return True
+        return self.plan(restaurant, day, time_slot).seat(None, people)
+
+    def largest_party(self, restaurant, day, time_slot, seats_left):
+        """
+        Return the largest party of at most ``seats_left`` and
+        :const:`LARGEST_PARTY` people that can be seated, or 0.
+        """
+        most = min(seats_left, LARGEST_PARTY)
+        if restaurant.pk not in self.tables or most < 1:
+            return max(most, 0)
+        # Slots whose parties sit alike, such as empty ones, are the same.
+        layout = (restaurant.pk, most, tuple(sorted(
+            (party, tuple(sorted(ids))) for party, ids in
+            self.bookings.get((restaurant.pk, day, time_slot), {}).values()
+        )))
+        if layout not in self.largest:
+            plan = self.plan(restaurant, day, time_slot)
+            self.largest[layout] = next(
+                (people for people in range(most, 0, -1)
+                 if plan.seat(None, people)),
+                0
+            )
+        return self.largest[layout]
+
+
+def nearest_slots(restaurants, people, preferred_date, time_slot=None,
+                  limit=5, days=7):
+    """
+    Return up to ``limit`` slots with at least ``people`` seats left at
+    any of ``restaurants``, nearest to ``preferred_date`` first.
+
+    Dates up to ``days`` either side of ``preferred_date`` within the
+    booking window are searched. Slots on the same date are ordered by
+    their distance from ``time_slot`` (or by time without one), then by
+    the order of ``restaurants``. Each slot is a dict with
+    ``restaurant``, ``booking_date``, ``time_slot``, its ``label`` and
+    ``seats_left``. At restaurants with tables, only slots where the
+    party can also be seated are returned.
+
+    The seats taken come from the per-restaurant availability cache;
+    restaurants not cached are read from :model:`booking.SlotOccupancy`
+    in a single query. Tables and the bookings seated at them take one
+    more query each.
+    """
+    restaurants = list(restaurants)
+    first_day, last_day = booking_window()
+    start = max(preferred_date - timedelta(days=days), first_day)
+    end = min(preferred_date + timedelta(days=days), last_day)
+    if not restaurants or start > end:
+        return []
+
+    taken = _seats_taken_many(restaurants)
+    table_fit = _TableFit(restaurants, start, end)
+    offered = [
+        (restaurant, restaurant.get_time_slots())
+        for restaurant in restaurants
+    ]
+    found = []
+    # Dates in order of distance: the preferred date, the day before,
+    # the day after, two days before and so on.
+    for distance in range(days + 1):
+        for day in sorted({preferred_date + timedelta(days=distance),
+                           preferred_date - timedelta(days=distance)}):
+            if not start <= day <= end:
+                continue
+            candidates = []
+            for order, (restaurant, slots) in enumerate(offered):
+                booked = taken[restaurant.pk].get(day, {})
+                for slot, label in slots:
+                    left = restaurant.online_capacity - booked.get(slot, 0)
+                    if left >= people:
+                        closeness = (abs(slot - time_slot)
+                                     if time_slot is not None else slot)
+                        candidates.append(
+                            (closeness, slot, order, restaurant, label, left)
+                        )
+            candidates.sort(key=lambda candidate: candidate[:3])
+            for _, slot, _, restaurant, label, left in candidates:
+                if not table_fit.fits(restaurant, day, slot, people):
+                    continue
+                found.append({
+                    'restaurant': restaurant,
+                    'booking_date': day,
+                    'time_slot': slot,
+                    'label': label,
+                    'seats_left': left,
+                })
+                if len(found) >= limit:
+                    return found
+    return found
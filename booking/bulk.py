@@ -0,0 +1,350 @@
+import csv
+import json
+from collections import defaultdict
+from datetime import date
+from itertools import islice
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from django.utils.timezone import now
+from restaurant.models import Restaurant
+from .availability import BOOKING_WINDOW_DAYS, booking_window
+from .models import (
+    CHOICES, Booking, CapacityExceeded, SlotOccupancy, save_table_changes,
+    slot_plans
+)
+
+# Columns of an import or export file. ``user`` is the username,
+# ``restaurant`` the restaurant slug and ``time_slot`` the slot start in
+# minutes after midnight.
+FIELDS = (
+    'user',
+    'restaurant',
+    'booking_date',
+    'time_slot',
+    'number_of_people',
+    'status',
+    'special_requests',
+)
+FORMATS = ('csv', 'jsonl')
+
+# Number of error messages kept by an import; later errors are counted.
+MAX_REPORTED_ERRORS = 100
+
+# Errors that stop reading a file part-way: bytes that are not UTF-8, or
+# CSV that cannot be parsed, such as a NUL byte or an unclosed quote.
+READ_ERRORS = (UnicodeDecodeError, csv.Error)
+
+
+class ImportResult:
+    """
+    Outcome of :func:`import_bookings`: the number of bookings created
+    and the ``(line, message)`` pairs of the rejected rows.
+    """
+    def __init__(self):
+        self.created = 0
+        self.rejected = 0
+        self.errors = []
+
+    def reject(self, line, message):
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, str(message)))
+
+
+def format_for(filename):
+    """
+    Return the file format implied by a file name's extension, or None.
+    """
+    extension = filename.rsplit('.', 1)[-1].lower()
+    return extension if extension in FORMATS else None
+
+
+def read_error_message(error, dry_run=False):
+    """
+    Describe one of :const:`READ_ERRORS` for the person importing. The
+    batches read before the error have already been imported.
+    """
+    if isinstance(error, UnicodeDecodeError):
+        message = "The file is not UTF-8 text."
+    else:
+        message = f"The file is not valid CSV: {error}."
+    if not dry_run:
+        message += " Rows before the error may already be imported."
+    return message
+
+
+def read_rows(stream, fmt):
+    """
+    Yield ``(line, row)`` for every record of a CSV or JSONL text stream,
+    one record at a time. ``row`` is a dict, or None if the line is not
+    valid JSON.
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for line, text in enumerate(stream, start=1):
+        if not text.strip():
+            continue
+        try:
+            row = json.loads(text)
+        except ValueError:
+            row = None
+        yield line, row if isinstance(row, dict) else None
+
+
+def parse_row(row, restaurants):
+    """
+    Return the booking field values of one row, with the restaurant
+    looked up in ``restaurants`` (a dict by slug). Raises ``ValueError``
+    with a readable message if the row breaks a booking rule.
+    """
+    if row is None:
+        raise ValueError("Not a JSON object.")
+    missing = [
+        field for field in FIELDS[:5] if row.get(field) in (None, '')
+    ]
+    if missing:
+        raise ValueError(f"Missing {', '.join(missing)}.")
+
+    restaurant = restaurants.get(str(row['restaurant']).strip())
+    if restaurant is None:
+        raise ValueError(f"Unknown restaurant '{row['restaurant']}'.")
+    try:
+        booking_date = date.fromisoformat(str(row['booking_date']).strip())
+    except ValueError:
+        raise ValueError("booking_date must be a YYYY-MM-DD date.")
+    try:
+        time_slot = int(row['time_slot'])
+        number_of_people = int(row['number_of_people'])
+        status = int(row.get('status') or 1)
+    except (TypeError, ValueError):
+        raise ValueError(
+            "time_slot, number_of_people and status must be whole numbers."
+        )
+
+    if time_slot not in dict(restaurant.get_time_slots()):
+        raise ValueError(
+            f"{restaurant} does not offer time slot {time_slot}."
+        )
+    if not 1 <= number_of_people <= 6:
+        raise ValueError("number_of_people must be between 1 and 6.")
+    if status not in dict(CHOICES):
+        raise ValueError(f"Unknown status {status}.")
+    first_day, last_day = booking_window()
+    if status == 1 and not first_day <= booking_date <= last_day:
+        raise ValueError(
+            "Confirmed bookings must be from tomorrow up to "
+            f"{BOOKING_WINDOW_DAYS} days ahead."
+        )
+    if status == 3 and booking_date > now().date():
+        raise ValueError("Completed bookings cannot be in the future.")
+
+    return {
+        'user': str(row['user']).strip(),
+        'restaurant': restaurant,
+        'booking_date': booking_date,
+        'time_slot': time_slot,
+        'number_of_people': number_of_people,
+        'status': status,
+        'special_requests': row.get('special_requests') or '',
+    }
+
+
+def import_bookings(rows, batch_size=1000, dry_run=False):
+    """
+    Create bookings from ``(line, row)`` pairs such as those yielded by
+    :func:`read_rows` and return an :class:`ImportResult`.
+
+    Rows are consumed ``batch_size`` at a time, so memory use does not
+    depend on the size of the file. Each batch is checked with a fixed
+    number of queries: users, existing bookings for the unique booking
+    constraint and :model:`booking.SlotOccupancy` for capacity. Valid
+    rows are inserted with one ``bulk_create`` and their seats added to
+    the ledger in the same transaction. With ``dry_run`` nothing is
+    written and ``created`` counts the bookings that would be created.
+    """
+    result = ImportResult()
+    restaurants = {r.slug: r for r in Restaurant.objects.all()}
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            return result
+        _import_batch(batch, restaurants, result, dry_run)
+
+
+def _import_batch(batch, restaurants, result, dry_run):
+    rejected = []
+    created = _create_valid(batch, restaurants, rejected, dry_run)
+    result.created += created
+    for line, message in sorted(rejected):
+        result.reject(line, message)
+
+
+def _create_valid(batch, restaurants, rejected, dry_run):
+    """
+    Create the valid bookings of one batch and return how many were (or,
+    with ``dry_run``, would be) created; append ``(line, message)`` to
+    ``rejected`` for the others.
+    """
+    def reject(line, message):
+        rejected.append((line, str(message)))
+
+    parsed = []
+    for line, row in batch:
+        try:
+            parsed.append((line, parse_row(row, restaurants)))
+        except ValueError as error:
+            reject(line, error)
+
+    users = dict(User.objects.filter(
+        username__in={values['user'] for _, values in parsed}
+    ).values_list('username', 'pk'))
+
+    candidates = []
+    for line, values in parsed:
+        username = values.pop('user')
+        if username not in users:
+            reject(line, f"Unknown user '{username}'.")
+            continue
+        candidates.append((line, Booking(user_id=users[username], **values)))
+
+    existing = _existing_keys([booking for _, booking in candidates])
+    seen = set()
+    unique = []
+    for line, booking in candidates:
+        key = _unique_key(booking)
+        if booking.status in (1, 3):
+            if key in existing:
+                reject(line, "The user already has this booking.")
+                continue
+            if key in seen:
+                reject(line, "Duplicate of an earlier row.")
+                continue
+            seen.add(key)
+        unique.append((line, booking))
+
+    accepted = []
+    try:
+        with transaction.atomic():
+            seats = SlotOccupancy.seats_for(
+                [booking for _, booking in unique if booking.status == 1]
+            )
+            added = defaultdict(int)
+            for line, booking in unique:
+                entry = booking._ledger_entry()
+                if entry:
+                    key, people = entry
+                    taken = seats.get(key, 0) + added[key]
+                    if taken + people > booking.restaurant.online_capacity:
+                        reject(line, "The time slot is fully booked.")
+                        continue
+                    added[key] += people
+                accepted.append((line, booking))
+
+            if not dry_run:
+                plans = slot_plans(added)
+                Booking.objects.bulk_create(
+                    [booking for _, booking in accepted]
+                )
+                capacity = {r.pk: r.online_capacity
+                            for r in restaurants.values()}
+                for key, people in added.items():
+                    SlotOccupancy.adjust(
+                        *key, people, capacity=capacity[key[0]]
+                    )
+                _seat([booking for _, booking in accepted], plans)
+    except (CapacityExceeded, IntegrityError):
+        # Bookings made while this batch was checked took the seats or
+        # the slot; nothing from the batch was saved.
+        for line, _ in accepted:
+            reject(
+                line, "Conflicts with a booking made during the import."
+            )
+        return 0
+    return len(accepted)
+
+
+def _seat(bookings, plans):
+    """
+    Seat the confirmed ``bookings`` just created at the tables of their
+    slots' ``plans`` (see :func:`booking.models.slot_plans`) and store
+    the tables. As with bookings saved without a capacity check, a
+    party no table can seat is left for staff to seat.
+    """
+    changes = {}
+    for booking in bookings:
+        entry = booking._ledger_entry()
+        plan = plans.get(entry[0]) if entry else None
+        if plan is not None:
+            plan.seat(booking.pk, booking.number_of_people)
+    for plan in plans.values():
+        if plan is not None:
+            changes.update(plan.changes())
+    save_table_changes(changes, {})
+
+
+def _unique_key(booking):
+    return (booking.user_id, booking.restaurant_id,
+            booking.booking_date, booking.time_slot)
+
+
+def _existing_keys(bookings):
+    """
+    Return the unique booking keys among ``bookings`` that are already
+    taken by a Confirmed or Completed booking, read in one query.
+    """
+    keys = {_unique_key(booking) for booking in bookings}
+    if not keys:
+        return set()
+    rows = Booking.objects.filter(
+        status__in=[1, 3],
+        user_id__in={key[0] for key in keys},
+        restaurant_id__in={key[1] for key in keys},
+        booking_date__in={key[2] for key in keys},
+    ).values_list('user_id', 'restaurant_id', 'booking_date', 'time_slot')
+    return keys.intersection(rows)
+
+
+class _Echo:
+    """File-like object whose ``write`` returns the text written."""
+    def write(self, value):
+        return value
+
+
+def export_bookings(queryset, fmt='csv', chunk_size=2000):
+    """
+    Yield the bookings of ``queryset`` as CSV (with a header row) or
+    JSONL text, in chunks of ``chunk_size`` rows.
+
+    Rows are read with ``iterator()``, so only one chunk is held in
+    memory; pass the generator to a ``StreamingHttpResponse`` or write
+    it out piece by piece. The columns match :func:`import_bookings`.
+    """
+    rows = queryset.order_by('pk').values_list(
+        'user__username',
+        'restaurant__slug',
+        'booking_date',
+        'time_slot',
+        'number_of_people',
+        'status',
+        'special_requests',
+    ).iterator(chunk_size=chunk_size)
+
+    if fmt == 'csv':
+        writer = csv.writer(_Echo())
+        yield writer.writerow(FIELDS)
+        encode = writer.writerow
+    else:
+        def encode(row):
+            values = dict(zip(FIELDS, row))
+            values['booking_date'] = values['booking_date'].isoformat()
+            return json.dumps(values) + '\n'
+
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield ''.join(encode(row) for row in chunk)
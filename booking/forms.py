@@ -1,6 +1,8 @@
 from django import forms
 from datetime import date, timedelta
-from .models import Booking
+from restaurant.models import DEFAULT_TIME_SLOTS, Restaurant, slot_label
+from .bulk import format_for
+from .models import Booking, TIME_SLOTS
 
 
 class BookingForm(forms.ModelForm):
@@ -12,11 +14,16 @@ class BookingForm(forms.ModelForm):
     - booking_date
         Date of the booking; uses a flatpickr date picker.
     - time_slot
-        Selected time slot for the booking.
+        Selected time slot for the booking; the choices are the slots
+        offered by the ``restaurant`` passed to the form, or
+        :const:`booking.models.TIME_SLOTS` without one.
     - number_of_people
         Number of people for the booking; selectable from 1 to 6.
     - special_requests
         Optional text area for any special requests.
+    - join_waitlist
+        Whether to join the :model:`booking.WaitlistEntry` queue when
+        the time slot is full; see :attr:`waitlist_entry`.
 
     **Validates:**
 
@@ -50,6 +57,25 @@ class BookingForm(forms.ModelForm):
             }),
         }
 
+    join_waitlist = forms.BooleanField(
+        required=False,
+        label="If this time is full, put me on the waitlist",
+    )
+
+    # The waitlist entry made instead of the booking, if any.
+    waitlist_entry = None
+    # The nearest free slots offered when the chosen one is full.
+    alternatives = ()
+
+    def __init__(self, *args, restaurant=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['time_slot'] = forms.TypedChoiceField(
+            label='Time slot',
+            coerce=int,
+            choices=(restaurant.get_time_slots() if restaurant
+                     else TIME_SLOTS),
+        )
+
     def clean_booking_date(self):
         booking_date = self.cleaned_data.get('booking_date')
         today = date.today()
@@ -119,3 +145,159 @@ class EditBookingForm(forms.ModelForm):
                 "You must book at least 1 people."
             )
         return number
+
+
+class BookingAdminForm(forms.ModelForm):
+    """
+    Form used by :class:`booking.admin.BookingAdmin`.
+
+    **Fields:**
+
+    - time_slot
+        Selectable from the slots of every restaurant.
+
+    **Validates:**
+
+    - `time_slot` must be one of the slots offered by the selected
+      restaurant.
+    """
+    class Meta:
+        model = Booking
+        # Tables are assigned when the booking is saved.
+        exclude = ('tables',)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        starts = set(DEFAULT_TIME_SLOTS)
+        for slots in Restaurant.objects.values_list('time_slots', flat=True):
+            starts.update(slots or [])
+        self.fields['time_slot'] = forms.TypedChoiceField(
+            label='Time slot',
+            coerce=int,
+            choices=[(start, slot_label(start)) for start in sorted(starts)],
+            initial=self.instance.time_slot,
+        )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        restaurant = cleaned_data.get('restaurant')
+        time_slot = cleaned_data.get('time_slot')
+        if (restaurant and time_slot is not None
+                and time_slot not in dict(restaurant.get_time_slots())):
+            self.add_error(
+                'time_slot',
+                f"{restaurant} does not offer this time slot."
+            )
+        return cleaned_data
+
+
+class SlotSearchForm(forms.Form):
+    """
+    Query parameters of :view:`booking.views.find_table`.
+
+    **Fields:**
+
+    - restaurant
+        Slug of the :model:`restaurant.Restaurant` to search.
+    - city
+        Search every restaurant in this city instead; with
+        ``restaurant`` as well, that restaurant's slots come first on
+        each date.
+    - people
+        Party size, from 1 to 6.
+    - date
+        Preferred date; defaults to the first bookable day.
+    - time
+        Optional preferred time slot, in minutes after midnight.
+    - limit
+        Number of slots to return, from 1 to 20 (default 5).
+    - days
+        Dates searched either side of ``date``, up to 30 (default 7).
+
+    **Validates:**
+
+    - `restaurant` or `city` is given and matches a restaurant; the
+      restaurants searched are set as ``cleaned_data['restaurants']``.
+    """
+    restaurant = forms.SlugField(required=False)
+    city = forms.CharField(required=False, max_length=50)
+    people = forms.IntegerField(min_value=1, max_value=6)
+    date = forms.DateField(required=False)
+    time = forms.IntegerField(required=False, min_value=0,
+                              max_value=24 * 60 - 1)
+    limit = forms.IntegerField(required=False, min_value=1, max_value=20)
+    days = forms.IntegerField(required=False, min_value=0, max_value=30)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        slug = cleaned_data.get('restaurant')
+        city = cleaned_data.get('city')
+        if not slug and not city:
+            raise forms.ValidationError("Give a restaurant or a city.")
+
+        restaurants = []
+        if slug:
+            restaurants = list(Restaurant.objects.filter(slug=slug))
+            if not restaurants:
+                self.add_error('restaurant', "No such restaurant.")
+        if city:
+            restaurants += Restaurant.objects.filter(
+                city__iexact=city
+            ).exclude(slug=slug).order_by('name')
+            if not restaurants:
+                self.add_error('city', "No restaurants in this city.")
+        cleaned_data['restaurants'] = restaurants
+        return cleaned_data
+
+
+class BookingImportForm(forms.Form):
+    """
+    Upload form for the booking import admin view.
+
+    **Validates:**
+
+    - `file` must have a ``.csv`` or ``.jsonl`` extension.
+    """
+    file = forms.FileField(help_text="A .csv or .jsonl file.")
+    dry_run = forms.BooleanField(
+        required=False,
+        help_text="Only validate the rows; nothing is saved."
+    )
+
+    def clean_file(self):
+        upload = self.cleaned_data['file']
+        if format_for(upload.name) is None:
+            raise forms.ValidationError(
+                "Upload a .csv or .jsonl file."
+            )
+        return upload
+
+
+class OccupancyDashboardForm(forms.Form):
+    """
+    Filters of the occupancy dashboard in the bookings admin.
+
+    **Validates:**
+
+    - `start` is not after `end`, and the range is at most
+      :const:`MAX_DAYS` days.
+    """
+    MAX_DAYS = 5 * 366
+
+    restaurant = forms.ModelChoiceField(
+        queryset=Restaurant.objects.order_by('name')
+    )
+    start = forms.DateField(widget=forms.DateInput(attrs={'type': 'date'}))
+    end = forms.DateField(widget=forms.DateInput(attrs={'type': 'date'}))
+
+    def clean(self):
+        cleaned_data = super().clean()
+        start, end = cleaned_data.get('start'), cleaned_data.get('end')
+        if start and end:
+            if start > end:
+                self.add_error('end', "The end cannot be before the start.")
+            elif (end - start).days >= self.MAX_DAYS:
+                self.add_error(
+                    'end', f"Choose at most {self.MAX_DAYS} days."
+                )
+        return cleaned_data
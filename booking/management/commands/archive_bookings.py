@@ -0,0 +1,103 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.timezone import now
+from booking.archive import (
+    ARCHIVE_AFTER_DAYS, archivable, archive_bookings, create_partitions,
+    detach_partitions, detached_partitions, is_partitioned
+)
+
+
+class Command(BaseCommand):
+    """
+    Move cancelled and completed :model:`booking.Booking` older than
+    ``--days`` into :model:`booking.BookingArchive`, keeping the booking
+    table small.
+
+    Intended to run from a scheduler after ``complete_bookings``, e.g.
+    once a week.
+
+    **Behaviour:**
+
+    - Moves bookings in chunks of ``--batch-size`` rows, each chunk in
+      its own transaction; see :func:`booking.archive.archive_bookings`.
+    - On PostgreSQL, creates the yearly archive partitions for the years
+      moved and the next ``--years-ahead`` years, and with
+      ``--detach-before YEAR`` detaches the partitions of earlier years
+      so they can be dumped and dropped.
+    - With ``--dry-run`` only reports how many bookings would be moved.
+    """
+    help = "Move long-past bookings into the partitioned booking archive."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=ARCHIVE_AFTER_DAYS,
+            help="Archive bookings dated more than this many days ago.",
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help="Number of bookings moved per transaction.",
+        )
+        parser.add_argument(
+            '--years-ahead',
+            type=int,
+            default=1,
+            help="Archive partitions created after the current year.",
+        )
+        parser.add_argument(
+            '--detach-before',
+            type=int,
+            metavar='YEAR',
+            help="Detach the archive partitions of years before YEAR.",
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help="Report the bookings to archive without moving them.",
+        )
+
+    def handle(self, *args, **options):
+        if options['days'] < 1:
+            raise CommandError("--days must be at least 1.")
+        today = now().date()
+        before = today - timedelta(days=options['days'])
+
+        if options['dry_run']:
+            self.stdout.write(
+                f"Would archive {archivable(before).count()} bookings "
+                f"dated before {before}."
+            )
+            return
+
+        moved = archive_bookings(before, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {moved} bookings dated before {before}."
+        ))
+
+        if not is_partitioned():
+            if options['detach_before']:
+                self.stdout.write(self.style.WARNING(
+                    "The archive is only partitioned on PostgreSQL; "
+                    "nothing to detach."
+                ))
+            return
+
+        created = create_partitions(
+            range(today.year, today.year + options['years_ahead'] + 1)
+        )
+        for name in created:
+            self.stdout.write(f"Created partition {name}.")
+        if options['detach_before']:
+            for name in detach_partitions(options['detach_before']):
+                self.stdout.write(
+                    f"Detached partition {name}; dump and drop it once "
+                    f"no longer needed."
+                )
+        for year, name in sorted(detached_partitions().items()):
+            self.stdout.write(self.style.WARNING(
+                f"The partition of {year} is detached as {name}; its "
+                f"bookings are not archived until the table is dropped."
+            ))
@@ -0,0 +1,99 @@
+import copy
+import json
+import statistics
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.utils import ConnectionHandler
+
+# Connection settings compared by the benchmark, applied on top of the
+# default database's settings.
+MODES = {
+    'new_connection': {
+        'ENGINE': 'django.db.backends.postgresql',
+        'CONN_MAX_AGE': 0,
+    },
+    'persistent': {
+        'ENGINE': 'django.db.backends.postgresql',
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+    },
+    'pooled': {
+        'ENGINE': 'kode_restaurant.db_pool',
+        'CONN_MAX_AGE': 0,
+        'CONN_HEALTH_CHECKS': True,
+        'POOL': {'min_size': 1, 'max_size': 4},
+    },
+}
+
+
+class Command(BaseCommand):
+    """
+    Measure the database time of a request with a new connection per
+    request, with persistent connections and with the connection pool.
+
+    **Behaviour:**
+
+    - For each mode, simulates ``--requests`` requests that each run
+      ``--queries`` small queries, opening and closing the connection
+      the way Django does at the start and end of a request.
+    - Prints median/p95 timings per request and, with ``--output``,
+      writes them to a JSON file.
+
+    Needs PostgreSQL; use the same server as production, since the cost
+    of a new connection depends mostly on the network and TLS.
+    """
+    help = "Compare per-request latency of the database connection modes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--queries', type=int, default=3)
+        parser.add_argument('--output', help="Write results to this file.")
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError("The connection benchmark needs PostgreSQL.")
+
+        results = {}
+        for mode, overrides in MODES.items():
+            settings_dict = copy.deepcopy(connection.settings_dict)
+            settings_dict.pop('POOL', None)
+            settings_dict.update(overrides)
+            handler = ConnectionHandler({'default': settings_dict})
+            try:
+                results[mode] = self.measure(
+                    handler['default'], options['requests'],
+                    options['queries']
+                )
+            finally:
+                handler.close_all()
+            self.stdout.write(
+                f"{mode}: median {results[mode]['median_ms']} ms, "
+                f"p95 {results[mode]['p95_ms']} ms"
+            )
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+
+    def measure(self, database, requests, queries):
+        """
+        Return median/p95 milliseconds of ``requests`` simulated requests.
+        """
+        timings = []
+        for _ in range(requests):
+            started = time.perf_counter()
+            # As the request_started and request_finished signals do.
+            database.close_if_unusable_or_obsolete()
+            with database.cursor() as cursor:
+                for _ in range(queries):
+                    cursor.execute('SELECT 1')
+                    cursor.fetchone()
+            database.close_if_unusable_or_obsolete()
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        return {
+            'median_ms': round(statistics.median(timings), 3),
+            'p95_ms': round(timings[int(len(timings) * 0.95) - 1], 3),
+        }
@@ -0,0 +1,261 @@
+import json
+import statistics
+import time
+from datetime import timedelta
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from restaurant.models import DEFAULT_TIME_SLOTS, Restaurant
+from booking.availability import BOOKING_WINDOW_DAYS, booking_window
+from booking.models import Booking
+from booking.seeding import seed_bookings
+
+
+def percentile(timings, fraction):
+    """Return the ``fraction`` percentile of sorted ``timings``."""
+    return timings[max(int(len(timings) * fraction) - 1, 0)]
+
+
+def compare(results, baseline, tolerance):
+    """
+    Return a message for every endpoint of ``results`` that answers with
+    other status codes or runs more queries than in ``baseline``, or
+    whose p95 latency is more than ``tolerance`` (e.g. 0.25 for 25%)
+    above it.
+    """
+    failures = []
+    for name, measured in results['endpoints'].items():
+        expected = baseline['endpoints'].get(name)
+        if expected is None:
+            continue
+        if measured['status'] != expected['status']:
+            failures.append(
+                f"{name}: status {measured['status']}, baseline "
+                f"{expected['status']}"
+            )
+        if measured['queries'] > expected['queries']:
+            failures.append(
+                f"{name}: {measured['queries']} queries, baseline "
+                f"{expected['queries']}"
+            )
+        limit = expected['p95_ms'] * (1 + tolerance)
+        if measured['p95_ms'] > limit:
+            failures.append(
+                f"{name}: p95 {measured['p95_ms']} ms, baseline "
+                f"{expected['p95_ms']} ms (limit {round(limit, 3)} ms)"
+            )
+    return failures
+
+
+class Command(BaseCommand):
+    """
+    Measure the latency and query count of the booking flow's pages
+    against the seeded benchmark data.
+
+    **Behaviour:**
+
+    - Optionally seeds the database first (``--seed-bookings``,
+      ``--restaurants`` and ``--users``); see :mod:`booking.seeding`.
+    - Requests each page ``--repeat`` times through the test client, as
+      the busiest seeded user, a staff user or an anonymous visitor, and
+      records median/p95/p99 timings and the number of queries. Fails
+      if a page answers with another status than expected, e.g. a
+      booking refused instead of redirected to My Bookings.
+    - New bookings are made at a restaurant created for the run, so
+      capacity limits of the seeded data do not interfere. Everything
+      runs in a transaction that is rolled back at the end.
+    - With ``--output``, writes the results to a JSON file. With
+      ``--baseline``, compares them with an earlier file and fails if
+      any page answers with other status codes, runs more queries, or is
+      more than ``--tolerance`` slower at p95.
+
+    Only run this against a benchmark database and cache.
+    """
+    help = "Benchmark the booking pages and compare with a baseline."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seed-bookings',
+            type=int,
+            default=0,
+            help="Seed this many bookings before measuring.",
+        )
+        parser.add_argument('--restaurants', type=int, default=10)
+        parser.add_argument('--users', type=int, default=100000)
+        parser.add_argument('--repeat', type=int, default=50)
+        parser.add_argument('--output', help="Write results to this file.")
+        parser.add_argument(
+            '--baseline',
+            help="Fail if results are worse than this results file.",
+        )
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=0.25,
+            help="Allowed p95 slowdown against the baseline (0.25 = 25%%).",
+        )
+
+    def handle(self, *args, **options):
+        if options['seed_bookings']:
+            self.stdout.write(
+                f"Seeding {options['seed_bookings']} bookings..."
+            )
+            seed_bookings(
+                options['seed_bookings'],
+                restaurants=options['restaurants'],
+                users=options['users'],
+            )
+
+        results = {
+            'vendor': connection.vendor,
+            'bookings': Booking.objects.count(),
+            'users': User.objects.count(),
+            'restaurants': Restaurant.objects.count(),
+            'repeat': options['repeat'],
+        }
+        with override_settings(ALLOWED_HOSTS=['testserver']):
+            with transaction.atomic():
+                results['endpoints'] = self.measure_endpoints(
+                    options['repeat']
+                )
+                transaction.set_rollback(True)
+
+        for name, measured in results['endpoints'].items():
+            self.stdout.write(
+                f"{name}: median {measured['median_ms']} ms, "
+                f"p95 {measured['p95_ms']} ms, p99 {measured['p99_ms']} "
+                f"ms, {measured['queries']} queries"
+            )
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+
+        if options['baseline']:
+            with open(options['baseline']) as baseline:
+                failures = compare(
+                    results, json.load(baseline), options['tolerance']
+                )
+            if failures:
+                raise CommandError(
+                    "Worse than the baseline:\n" + "\n".join(failures)
+                )
+            self.stdout.write(self.style.SUCCESS("Within the baseline."))
+
+    def measure_endpoints(self, repeat):
+        """
+        Return the timings and query counts of every page, keyed by name.
+        """
+        restaurant = Restaurant.objects.filter(
+            slug__startswith='bench-restaurant-'
+        ).order_by('pk').first()
+        busiest = Booking.objects.values('user_id').annotate(
+            total=Count('pk')
+        ).order_by('-total').first()
+        if restaurant is None or busiest is None:
+            raise CommandError(
+                "No bookings to measure; use --seed-bookings."
+            )
+
+        flow = Restaurant.objects.create(
+            name="Benchmark Flow",
+            slug="bench-flow",
+            address="1 Benchmark Street",
+            city="Benchville",
+            phone_number="bench-flow",
+            description="Created for a benchmark run.",
+        )
+        diner = User.objects.create_user(username="bench-flow-diner")
+        first_day = booking_window()[0]
+        edited = Booking.objects.create(
+            user=diner,
+            restaurant=flow,
+            booking_date=first_day,
+            time_slot=DEFAULT_TIME_SLOTS[0],
+            number_of_people=2,
+        )
+        staff = User.objects.create_superuser(username="bench-flow-admin")
+
+        anonymous, regular, new_diner, admin = (
+            Client(), Client(), Client(), Client()
+        )
+        regular.force_login(User.objects.get(pk=busiest['user_id']))
+        new_diner.force_login(diner)
+        admin.force_login(staff)
+
+        detail = reverse('restaurant_detail', args=[restaurant.slug])
+        book = reverse('create_booking', args=[flow.slug])
+
+        def create_booking(i):
+            # A new date and slot each time, after the edited booking's.
+            slots = BOOKING_WINDOW_DAYS * len(DEFAULT_TIME_SLOTS)
+            day, slot = divmod(1 + i % (slots - 1), len(DEFAULT_TIME_SLOTS))
+            return new_diner.post(book, {
+                'booking_date': first_day + timedelta(days=day),
+                'time_slot': DEFAULT_TIME_SLOTS[slot],
+                'number_of_people': 1,
+            })
+
+        # Each page with the status code it answers with when it works.
+        endpoints = {
+            'restaurant_detail_anonymous': (
+                lambda i: anonymous.get(detail), 200
+            ),
+            'restaurant_detail': (lambda i: regular.get(detail), 200),
+            'create_booking_form': (lambda i: new_diner.get(book), 200),
+            'create_booking': (create_booking, 302),
+            'my_bookings': (
+                lambda i: regular.get(reverse('my_bookings')), 200
+            ),
+            'edit_booking': (
+                lambda i: new_diner.post(
+                    reverse('edit_booking', args=[edited.pk]),
+                    {'number_of_people': 2 + i % 2},
+                ),
+                302,
+            ),
+            'admin_changelist': (
+                lambda i: admin.get(
+                    reverse('admin:booking_booking_changelist')
+                ),
+                200,
+            ),
+        }
+        return {
+            name: self.measure(name, request, status, repeat)
+            for name, (request, status) in endpoints.items()
+        }
+
+    def measure(self, name, request, status, repeat):
+        """
+        Return median/p95/p99 milliseconds, the highest query count and
+        the response status codes of ``repeat`` calls of ``request``.
+        Raises ``CommandError`` if a response's status is not ``status``,
+        as the timings of a failing page mean nothing.
+        """
+        timings, queries, statuses = [], 0, set()
+        for i in range(repeat):
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = request(i)
+                timings.append((time.perf_counter() - started) * 1000)
+            queries = max(queries, len(captured))
+            statuses.add(response.status_code)
+            if response.status_code != status:
+                raise CommandError(
+                    f"{name}: status {response.status_code} on request "
+                    f"{i + 1}, expected {status}."
+                )
+        timings.sort()
+        return {
+            'median_ms': round(statistics.median(timings), 3),
+            'p95_ms': round(percentile(timings, 0.95), 3),
+            'p99_ms': round(percentile(timings, 0.99), 3),
+            'queries': queries,
+            'status': sorted(statuses),
+        }
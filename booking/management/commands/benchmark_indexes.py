@@ -0,0 +1,145 @@
+import json
+import statistics
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count, Sum
+from django.utils.timezone import now
+from booking.models import Booking, SlotOccupancy
+from booking.seeding import seed_bookings
+
+
+class Command(BaseCommand):
+    """
+    Record query plans and timings of the booking hot-path queries with
+    and without the indexes declared on :model:`booking.Booking`.
+
+    **Behaviour:**
+
+    - Optionally seeds the database first (``--seed-bookings``).
+    - Runs each query ``--repeat`` times with the indexes in place, then
+      drops them inside a transaction, runs the queries again and rolls
+      the transaction back, leaving the indexes untouched.
+    - Prints the EXPLAIN output and median/p95 timings and, with
+      ``--output``, writes them to a JSON file.
+
+    Dropping the indexes locks the booking table until the comparison is
+    finished, so only run this against a benchmark database.
+    """
+    help = "Compare EXPLAIN plans and timings with and without indexes."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seed-bookings',
+            type=int,
+            default=0,
+            help="Seed this many bookings before measuring.",
+        )
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--output', help="Write results to this file.")
+
+    def handle(self, *args, **options):
+        if options['seed_bookings']:
+            self.stdout.write(
+                f"Seeding {options['seed_bookings']} bookings..."
+            )
+            seed_bookings(options['seed_bookings'], users=100000)
+
+        queries = self.hot_queries()
+        results = {
+            'vendor': connection.vendor,
+            'bookings': Booking.objects.count(),
+            'with_indexes': self.measure(queries, options['repeat']),
+        }
+
+        # Start the second phase on a fresh connection so no statement
+        # prepared against the indexes is reused.
+        if not connection.in_atomic_block:
+            connection.close()
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                for index in Booking._meta.indexes:
+                    cursor.execute(
+                        f"DROP INDEX {connection.ops.quote_name(index.name)}"
+                    )
+            results['without_indexes'] = self.measure(
+                queries, options['repeat']
+            )
+            transaction.set_rollback(True)
+
+        for name in queries:
+            self.report(name, results)
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+
+    def hot_queries(self):
+        """
+        Return the querysets to measure, using the busiest slot and the
+        user with the most bookings as parameters.
+        """
+        slot = SlotOccupancy.objects.order_by('-seats').first()
+        user = (
+            Booking.objects.values('user_id')
+            .annotate(total=Count('pk'))
+            .order_by('-total')
+            .first()
+        )
+        if slot is None or user is None:
+            raise CommandError(
+                "No bookings to measure; use --seed-bookings."
+            )
+        return {
+            'slot_occupancy_sum': Booking.objects.filter(
+                restaurant_id=slot.restaurant_id,
+                booking_date=slot.booking_date,
+                time_slot=slot.time_slot,
+                status=1,
+            ).values('restaurant_id').annotate(
+                seats=Sum('number_of_people')
+            ).order_by(),
+            'my_bookings': Booking.objects.filter(
+                user_id=user['user_id']
+            ).order_by('-booking_date', 'time_slot'),
+            'pending_completion': Booking.objects.filter(
+                status=1, booking_date__lt=now().date()
+            ).order_by('booking_date', 'pk').values_list(
+                'pk', flat=True
+            )[:1000],
+        }
+
+    def measure(self, queries, repeat):
+        """
+        Return the EXPLAIN output and timings in milliseconds per query.
+        """
+        explain_options = (
+            {'analyze': True, 'buffers': True}
+            if connection.vendor == 'postgresql' else {}
+        )
+        measured = {}
+        for name, queryset in queries.items():
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                list(queryset.all())
+                timings.append((time.perf_counter() - started) * 1000)
+            timings.sort()
+            measured[name] = {
+                'plan': queryset.explain(**explain_options),
+                'median_ms': round(statistics.median(timings), 3),
+                'p95_ms': round(timings[int(len(timings) * 0.95) - 1], 3),
+            }
+        return measured
+
+    def report(self, name, results):
+        self.stdout.write(self.style.MIGRATE_HEADING(name))
+        for phase in ('without_indexes', 'with_indexes'):
+            measured = results[phase][name]
+            self.stdout.write(
+                f"  {phase}: median {measured['median_ms']} ms, "
+                f"p95 {measured['p95_ms']} ms"
+            )
+            for line in measured['plan'].splitlines():
+                self.stdout.write(f"    {line}")
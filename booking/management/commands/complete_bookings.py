@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand
+from django.utils.timezone import now
+from booking.models import Booking, SlotOccupancy
+
+
+class Command(BaseCommand):
+    """
+    Mark every confirmed :model:`booking.Booking` whose date has passed
+    as 'Completed', for all users at once.
+
+    Intended to run once a day from a scheduler (Heroku Scheduler or cron).
+
+    **Behaviour:**
+
+    - Reads the past confirmed bookings through the partial index on
+      confirmed booking dates and updates them in chunks of
+      ``--batch-size`` rows, each chunk in its own short transaction, so
+      no single statement locks a large part of the table.
+    - Removes :model:`booking.SlotOccupancy` rows for past dates, which no
+      longer hold any confirmed seats.
+    """
+    help = "Mark past confirmed bookings as Completed in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help="Number of bookings updated per statement.",
+        )
+
+    def handle(self, *args, **options):
+        today = now().date()
+        batch_size = options['batch_size']
+        pending = Booking.objects.filter(status=1, booking_date__lt=today)
+
+        completed = 0
+        while True:
+            # Completed rows drop out of the partial index on confirmed
+            # bookings, so each pass reads the next chunk from its start.
+            batch = list(
+                pending.order_by('booking_date', 'pk')
+                .values_list('pk', flat=True)[:batch_size]
+            )
+            if not batch:
+                break
+            completed += Booking.objects.filter(
+                pk__in=batch, status=1
+            ).update(status=3)
+
+        pruned, _ = SlotOccupancy.objects.filter(
+            booking_date__lt=today
+        ).delete()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Marked {completed} bookings as completed and pruned "
+            f"{pruned} past slots from the occupancy ledger."
+        ))
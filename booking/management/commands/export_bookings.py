@@ -0,0 +1,57 @@
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from booking.bulk import FORMATS, export_bookings, format_for
+from booking.models import Booking
+
+
+class Command(BaseCommand):
+    """
+    Export :model:`booking.Booking` rows to a CSV or JSONL file in the
+    format read by ``import_bookings``.
+
+    Bookings are streamed from the database in chunks, so a whole year
+    of data is never held in memory.
+    """
+    help = "Export bookings to CSV or JSONL (stdout by default)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help="File to write to.")
+        parser.add_argument(
+            '--format',
+            choices=FORMATS,
+            help="File format; defaults to the output extension or csv.",
+        )
+        parser.add_argument('--restaurant', help="Restaurant slug.")
+        parser.add_argument('--from', dest='start', type=date.fromisoformat,
+                            help="First booking date, YYYY-MM-DD.")
+        parser.add_argument('--to', dest='end', type=date.fromisoformat,
+                            help="Last booking date, YYYY-MM-DD.")
+
+    def handle(self, *args, **options):
+        output = options['output']
+        fmt = (options['format']
+               or (format_for(output) if output else None)
+               or 'csv')
+
+        bookings = Booking.objects.all()
+        if options['restaurant']:
+            bookings = bookings.filter(
+                restaurant__slug=options['restaurant']
+            )
+        if options['start']:
+            bookings = bookings.filter(booking_date__gte=options['start'])
+        if options['end']:
+            bookings = bookings.filter(booking_date__lte=options['end'])
+
+        if not output:
+            for chunk in export_bookings(bookings, fmt):
+                self.stdout.write(chunk, ending='')
+            return
+        try:
+            with open(output, 'w', newline='', encoding='utf-8') as stream:
+                stream.writelines(export_bookings(bookings, fmt))
+        except OSError as error:
+            raise CommandError(error)
+        self.stdout.write(self.style.SUCCESS(
+            f"Bookings written to {output}"
+        ))
@@ -0,0 +1,74 @@
+import sys
+from django.core.management.base import BaseCommand, CommandError
+from booking.bulk import (
+    FORMATS, READ_ERRORS, format_for, import_bookings, read_error_message,
+    read_rows
+)
+
+
+class Command(BaseCommand):
+    """
+    Import :model:`booking.Booking` rows from a CSV or JSONL file, such as
+    a phone-desk spreadsheet or a partner system export.
+
+    **Behaviour:**
+
+    - Reads the file one row at a time and validates ``--batch-size``
+      rows at once against the booking rules, the unique booking
+      constraint and each slot's online capacity.
+    - Inserts the valid rows of each batch with ``bulk_create`` and keeps
+      :model:`booking.SlotOccupancy` in step; rejected rows are listed
+      with their line number.
+    - ``--dry-run`` validates without writing anything.
+    - Stops with an error if the file is not UTF-8 text or not
+      well-formed CSV.
+
+    The columns are those of :const:`booking.bulk.FIELDS`.
+    """
+    help = "Import bookings from a CSV or JSONL file ('-' for stdin)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument(
+            '--format',
+            choices=FORMATS,
+            help="File format; defaults to the file extension.",
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or format_for(path)
+        if fmt is None:
+            raise CommandError("Use --format to give the file format.")
+
+        try:
+            if path == '-':
+                result = self.run(sys.stdin, fmt, options)
+            else:
+                with open(path, newline='', encoding='utf-8-sig') as stream:
+                    result = self.run(stream, fmt, options)
+        except OSError as error:
+            raise CommandError(error)
+        except READ_ERRORS as error:
+            raise CommandError(read_error_message(error, options['dry_run']))
+
+        for line, message in result.errors:
+            self.stderr.write(f"Line {line}: {message}")
+        if result.rejected > len(result.errors):
+            self.stderr.write(
+                f"... and {result.rejected - len(result.errors)} more."
+            )
+        verb = "Would import" if options['dry_run'] else "Imported"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {result.created} bookings; "
+            f"rejected {result.rejected} rows."
+        ))
+
+    def run(self, stream, fmt, options):
+        return import_bookings(
+            read_rows(stream, fmt),
+            batch_size=options['batch_size'],
+            dry_run=options['dry_run'],
+        )
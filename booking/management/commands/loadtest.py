@@ -0,0 +1,94 @@
+import json
+import statistics
+import threading
+import time
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    """
+    Measure how many concurrent requests a running server handles, to
+    compare the WSGI (gunicorn) and ASGI (uvicorn) deployment modes.
+
+    **Behaviour:**
+
+    - Starts ``--concurrency`` client threads that request ``url`` back
+      to back for ``--duration`` seconds.
+    - Prints the throughput, latency percentiles and errors and, with
+      ``--output``, writes them to a JSON file.
+
+    Run it against the same database and worker count for each mode,
+    on a page that is not cached, e.g. :view:`booking.my_bookings` with
+    ``--cookie``, so both modes do the same database work; see the
+    Deployment section of the README for measured numbers.
+    """
+    help = "Load-test a running server and report throughput and latency."
+
+    def add_arguments(self, parser):
+        parser.add_argument('url')
+        parser.add_argument('--concurrency', type=int, default=50)
+        parser.add_argument('--duration', type=float, default=10)
+        parser.add_argument(
+            '--cookie',
+            help="Cookie header to send, e.g. 'sessionid=...' for pages "
+                 "that need a login.",
+        )
+        parser.add_argument('--label', default='', help="Name of the run.")
+        parser.add_argument('--output', help="Write results to this file.")
+
+    def handle(self, *args, **options):
+        headers = {'Cookie': options['cookie']} if options['cookie'] else {}
+        deadline = time.monotonic() + options['duration']
+        timings, errors = [], []
+        lock = threading.Lock()
+
+        def client():
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                try:
+                    with urlopen(Request(options['url'], headers=headers),
+                                 timeout=30) as response:
+                        response.read()
+                except (HTTPError, URLError, OSError) as error:
+                    with lock:
+                        errors.append(str(error))
+                    continue
+                with lock:
+                    timings.append((time.perf_counter() - started) * 1000)
+
+        threads = [threading.Thread(target=client)
+                   for _ in range(options['concurrency'])]
+        started = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - started
+
+        timings.sort()
+        results = {
+            'label': options['label'],
+            'url': options['url'],
+            'concurrency': options['concurrency'],
+            'seconds': round(elapsed, 2),
+            'requests': len(timings),
+            'errors': len(errors),
+            'requests_per_second': round(len(timings) / elapsed, 1),
+        }
+        if timings:
+            results.update({
+                'median_ms': round(statistics.median(timings), 1),
+                'p95_ms': round(timings[int(len(timings) * 0.95) - 1], 1),
+                'p99_ms': round(timings[int(len(timings) * 0.99) - 1], 1),
+            })
+
+        for name, value in results.items():
+            self.stdout.write(f"{name}: {value}")
+        if errors:
+            self.stdout.write(f"first error: {errors[0]}")
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
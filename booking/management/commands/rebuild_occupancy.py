@@ -0,0 +1,70 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Sum
+from booking.models import Booking, SlotOccupancy, invalidate_availability
+
+
+class Command(BaseCommand):
+    """
+    Rebuild :model:`booking.SlotOccupancy` from the confirmed bookings in
+    :model:`booking.Booking`.
+
+    **Behaviour:**
+
+    - Creates ledger rows for slots that have confirmed bookings but no row.
+    - Corrects rows whose seat count differs from the booking table.
+    - Deletes rows for slots that no longer hold any confirmed bookings.
+    - With ``--dry-run`` only reports what would change.
+    """
+    help = "Rebuild and reconcile the slot occupancy ledger from bookings."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help="Report differences without changing the ledger.",
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            ledger = {
+                (slot.restaurant_id, slot.booking_date, slot.time_slot): slot
+                for slot in SlotOccupancy.objects.select_for_update()
+            }
+            totals = (
+                Booking.objects.filter(status=1)
+                .values('restaurant_id', 'booking_date', 'time_slot')
+                .annotate(seats=Sum('number_of_people'))
+                .order_by()
+            )
+
+            missing, changed = [], []
+            for row in totals:
+                key = (row['restaurant_id'],
+                       row['booking_date'],
+                       row['time_slot'])
+                slot = ledger.pop(key, None)
+                if slot is None:
+                    missing.append(SlotOccupancy(**row))
+                elif slot.seats != row['seats']:
+                    slot.seats = row['seats']
+                    changed.append(slot)
+            stale = [slot.pk for slot in ledger.values()]
+
+            if not options['dry_run']:
+                SlotOccupancy.objects.bulk_create(missing, batch_size=1000)
+                SlotOccupancy.objects.bulk_update(
+                    changed, ['seats'], batch_size=1000
+                )
+                SlotOccupancy.objects.filter(pk__in=stale).delete()
+                for restaurant_id in {
+                    slot.restaurant_id
+                    for slot in missing + changed + list(ledger.values())
+                }:
+                    invalidate_availability(restaurant_id)
+
+        prefix = "Would reconcile" if options['dry_run'] else "Reconciled"
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix} slot occupancy: {len(missing)} created, "
+            f"{len(changed)} corrected, {len(stale)} removed."
+        ))
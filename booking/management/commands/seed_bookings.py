@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from booking.seeding import seed_bookings
+
+
+class Command(BaseCommand):
+    """
+    Fill the database with reproducible random bookings for benchmarks.
+
+    Never run this against the production database.
+    """
+    help = "Bulk-create benchmark restaurants, users and bookings."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bookings', type=int, default=100000)
+        parser.add_argument('--restaurants', type=int, default=10)
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        def progress(done):
+            self.stdout.write(f"  {done}/{options['bookings']} bookings")
+
+        seed_bookings(
+            options['bookings'],
+            restaurants=options['restaurants'],
+            users=options['users'],
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+            progress=progress if options['verbosity'] > 1 else None,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded up to {options['bookings']} bookings for "
+            f"{options['restaurants']} restaurants and "
+            f"{options['users']} users."
+        ))
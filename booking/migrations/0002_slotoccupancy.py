@@ -0,0 +1,49 @@
+# Generated by Django 4.2.23 on 2026-10-18 08:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def build_occupancy(apps, schema_editor):
+    db = schema_editor.connection.alias
+    Booking = apps.get_model('booking', 'Booking')
+    SlotOccupancy = apps.get_model('booking', 'SlotOccupancy')
+    totals = (
+        Booking.objects.using(db).filter(status=1)
+        .values('restaurant_id', 'booking_date', 'time_slot')
+        .annotate(seats=models.Sum('number_of_people'))
+        .order_by()
+    )
+    SlotOccupancy.objects.using(db).bulk_create(
+        [SlotOccupancy(**row) for row in totals.iterator()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0001_initial'),
+        ('booking', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlotOccupancy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('booking_date', models.DateField()),
+                ('time_slot', models.CharField(choices=[('12:00 PM - 1:30 PM', '12:00 PM - 1:30 PM'), ('1.30 PM - 3:00 PM', '1:30 PM - 3:00 PM'), ('3:00 PM - 4:30 PM', '3:00 PM - 4:30 PM'), ('6:00 PM - 7:30 PM', '6:00 PM - 7:30 PM'), ('7:30 PM - 9:00 PM', '7:30 PM - 9:00 PM'), ('9:00 PM - 10:30 PM', '9:00 PM - 10:30 PM')], max_length=20)),
+                ('seats', models.PositiveIntegerField(default=0)),
+                ('restaurant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='slot_occupancy', to='restaurant.restaurant')),
+            ],
+            options={
+                'verbose_name_plural': 'slot occupancy',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='slotoccupancy',
+            constraint=models.UniqueConstraint(fields=('restaurant', 'booking_date', 'time_slot'), name='unique_slot_occupancy'),
+        ),
+        migrations.RunPython(build_occupancy, migrations.RunPython.noop),
+    ]
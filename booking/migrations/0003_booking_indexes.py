@@ -0,0 +1,29 @@
+# Generated by Django 4.2.23 on 2026-10-18 08:47
+
+from django.db import migrations, models
+from booking.operations import AddIndexConcurrentlyIfPostgres
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction.
+    atomic = False
+
+    dependencies = [
+        ('booking', '0002_slotoccupancy'),
+    ]
+
+    operations = [
+        AddIndexConcurrentlyIfPostgres(
+            model_name='booking',
+            index=models.Index(condition=models.Q(('status', 1)), fields=['restaurant', 'booking_date', 'time_slot', 'number_of_people'], name='booking_slot_confirmed_idx'),
+        ),
+        AddIndexConcurrentlyIfPostgres(
+            model_name='booking',
+            index=models.Index(fields=['user', '-booking_date', 'time_slot'], name='booking_user_date_idx'),
+        ),
+        AddIndexConcurrentlyIfPostgres(
+            model_name='booking',
+            index=models.Index(condition=models.Q(('status', 1)), fields=['booking_date', 'id'], name='booking_confirmed_date_idx'),
+        ),
+    ]
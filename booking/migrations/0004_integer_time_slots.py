@@ -0,0 +1,127 @@
+# Generated by Django 4.2.23 on 2026-10-18 08:51
+
+from django.db import migrations, models
+
+# Old free-text slot values and the start of each slot in minutes after
+# midnight, which is what Booking.time_slot stores from now on.
+SLOT_STARTS = {
+    '12:00 PM - 1:30 PM': 720,
+    '1.30 PM - 3:00 PM': 810,
+    '3:00 PM - 4:30 PM': 900,
+    '6:00 PM - 7:30 PM': 1080,
+    '7:30 PM - 9:00 PM': 1170,
+    '9:00 PM - 10:30 PM': 1260,
+}
+
+
+def clear_occupancy(apps, schema_editor):
+    db = schema_editor.connection.alias
+    apps.get_model('booking', 'SlotOccupancy').objects.using(db).delete()
+
+
+def build_occupancy(apps, schema_editor):
+    db = schema_editor.connection.alias
+    Booking = apps.get_model('booking', 'Booking')
+    SlotOccupancy = apps.get_model('booking', 'SlotOccupancy')
+    totals = (
+        Booking.objects.using(db).filter(status=1)
+        .values('restaurant_id', 'booking_date', 'time_slot')
+        .annotate(seats=models.Sum('number_of_people'))
+        .order_by()
+    )
+    SlotOccupancy.objects.using(db).bulk_create(
+        [SlotOccupancy(**row) for row in totals.iterator()],
+        batch_size=1000,
+    )
+
+
+def slots_to_minutes(apps, schema_editor):
+    db = schema_editor.connection.alias
+    bookings = apps.get_model('booking', 'Booking').objects.using(db)
+    for label, start in SLOT_STARTS.items():
+        bookings.filter(time_slot=label).update(slot_start=start)
+
+    # A booking left without a start would otherwise be moved to 12:00 by
+    # the default of the new field; stop so its slot can be fixed first.
+    unmapped = bookings.filter(slot_start__isnull=True)
+    if unmapped.exists():
+        rows = ', '.join(
+            f"{pk} ({label!r})"
+            for pk, label in unmapped.order_by('pk').values_list(
+                'pk', 'time_slot'
+            )
+        )
+        raise ValueError(
+            f"Bookings with a time slot not in SLOT_STARTS: {rows}. "
+            f"Change them to one of {list(SLOT_STARTS)} and migrate again."
+        )
+
+
+def minutes_to_slots(apps, schema_editor):
+    db = schema_editor.connection.alias
+    bookings = apps.get_model('booking', 'Booking').objects.using(db)
+    for label, start in SLOT_STARTS.items():
+        bookings.filter(slot_start=start).update(time_slot=label)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0003_booking_indexes'),
+    ]
+
+    operations = [
+        # The ledger is derived data: empty it, change its key and rebuild
+        # it from the converted bookings at the end.
+        migrations.RunPython(clear_occupancy, build_occupancy),
+        migrations.RemoveConstraint(
+            model_name='slotoccupancy',
+            name='unique_slot_occupancy',
+        ),
+        migrations.AlterField(
+            model_name='slotoccupancy',
+            name='time_slot',
+            field=models.PositiveSmallIntegerField(),
+        ),
+        migrations.RemoveIndex(
+            model_name='booking',
+            name='booking_slot_confirmed_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='booking',
+            name='booking_user_date_idx',
+        ),
+        migrations.RemoveConstraint(
+            model_name='booking',
+            name='unique_booking',
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='slot_start',
+            field=models.PositiveSmallIntegerField(null=True),
+        ),
+        migrations.RunPython(slots_to_minutes, minutes_to_slots),
+        migrations.RemoveField(
+            model_name='booking',
+            name='time_slot',
+        ),
+        migrations.RenameField(
+            model_name='booking',
+            old_name='slot_start',
+            new_name='time_slot',
+        ),
+        migrations.AlterField(
+            model_name='booking',
+            name='time_slot',
+            field=models.PositiveSmallIntegerField(default=720),
+        ),
+        migrations.AddConstraint(
+            model_name='booking',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', [1, 3])), fields=('user', 'restaurant', 'booking_date', 'time_slot'), name='unique_booking'),
+        ),
+        migrations.AddConstraint(
+            model_name='slotoccupancy',
+            constraint=models.UniqueConstraint(fields=('restaurant', 'booking_date', 'time_slot'), name='unique_slot_occupancy'),
+        ),
+        migrations.RunPython(build_occupancy, clear_occupancy),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.23 on 2026-10-18 09:28
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0002_restaurant_time_slots'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('booking', '0005_integer_time_slot_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WaitlistEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('booking_date', models.DateField()),
+                ('time_slot', models.PositiveSmallIntegerField()),
+                ('number_of_people', models.PositiveIntegerField()),
+                ('special_requests', models.TextField(blank=True)),
+                ('status', models.IntegerField(choices=[(1, 'Waiting'), (2, 'Promoted'), (3, 'Withdrawn')], default=1)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('promoted_at', models.DateTimeField(blank=True, null=True)),
+                ('booking', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='waitlist_entry', to='booking.booking')),
+                ('restaurant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='waitlist_entries', to='restaurant.restaurant')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='waitlist_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'waitlist entries',
+                'ordering': ['created_at', 'id'],
+                'indexes': [models.Index(condition=models.Q(('status', 1)), fields=['restaurant', 'booking_date', 'time_slot', 'created_at', 'id'], name='waitlist_queue_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='waitlistentry',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 1)), fields=('user', 'restaurant', 'booking_date', 'time_slot'), name='unique_waitlist_entry'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.23 on 2026-10-18 09:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0003_table'),
+        ('booking', '0006_waitlistentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='tables',
+            field=models.ManyToManyField(blank=True, related_name='bookings', to='restaurant.table'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.23 on 2026-10-18 09:48
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from booking.operations import PartitionByRangeIfPostgres
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0003_table'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('booking', '0007_booking_tables'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookingArchive',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('booking_date', models.DateField()),
+                ('time_slot', models.PositiveSmallIntegerField()),
+                ('number_of_people', models.PositiveIntegerField()),
+                ('special_requests', models.TextField(blank=True)),
+                ('status', models.IntegerField(choices=[(1, 'Confirmed'), (2, 'Cancelled'), (3, 'Completed')])),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('restaurant', models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='archived_bookings', to='restaurant.restaurant')),
+                ('user', models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='archived_bookings', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-booking_date', 'time_slot'],
+                'indexes': [models.Index(fields=['user', '-booking_date', 'time_slot'], name='archive_user_date_idx'), models.Index(fields=['restaurant', 'booking_date', 'time_slot'], name='archive_restaurant_date_idx')],
+            },
+        ),
+        PartitionByRangeIfPostgres(
+            model_name='bookingarchive',
+            field_name='booking_date',
+        ),
+    ]
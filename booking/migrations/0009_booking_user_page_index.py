@@ -0,0 +1,27 @@
+# Generated by Django 4.2.23 on 2026-10-18 10:30
+
+from django.db import migrations, models
+from booking.operations import AddIndexConcurrentlyIfPostgres
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction.
+    atomic = False
+
+    dependencies = [
+        ('booking', '0008_bookingarchive'),
+    ]
+
+    # The new index is built before the old one is dropped, so My Bookings
+    # stays indexed while the migration runs.
+    operations = [
+        AddIndexConcurrentlyIfPostgres(
+            model_name='booking',
+            index=models.Index(fields=['user', 'booking_date', 'time_slot', 'id'], name='booking_user_page_idx'),
+        ),
+        migrations.RemoveIndex(
+            model_name='booking',
+            name='booking_user_date_idx',
+        ),
+    ]
@@ -1,8 +1,19 @@
-from django.db import models
-from django.db.models import Q
+import logging
+from functools import partial
+from django.core.cache import cache
+from django.db import IntegrityError, models, transaction
+from django.db.models import F, Q
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_delete, pre_delete
+from django.dispatch import receiver
 from django.contrib.auth.models import User
-from restaurant.models import Restaurant
+from django.utils.timezone import now
+from restaurant.models import (
+    DEFAULT_TIME_SLOTS, Restaurant, Table, slot_label
+)
+from .tables import SlotPlan
 
+logger = logging.getLogger(__name__)
 
 CHOICES = (
     (1, 'Confirmed'),
@@ -10,17 +21,182 @@ CHOICES = (
     (3, 'Completed'),
 )
 
-TIME_SLOTS = (
-    ('12:00 PM - 1:30 PM', '12:00 PM - 1:30 PM'),
-    ('1.30 PM - 3:00 PM', '1:30 PM - 3:00 PM'),
-    ('3:00 PM - 4:30 PM', '3:00 PM - 4:30 PM'),
-    ('6:00 PM - 7:30 PM', '6:00 PM - 7:30 PM'),
-    ('7:30 PM - 9:00 PM', '7:30 PM - 9:00 PM'),
-    ('9:00 PM - 10:30 PM', '9:00 PM - 10:30 PM'),
+WAITLIST_CHOICES = (
+    (1, 'Waiting'),
+    (2, 'Promoted'),
+    (3, 'Withdrawn'),
+)
+
+# Times a promotion is tried when it clashes with a booking made at the
+# same time by a waiting user.
+PROMOTE_ATTEMPTS = 2
+
+# Default slots as (start, label) pairs; the start is stored in
+# Booking.time_slot as minutes after midnight. Restaurants can offer
+# their own slots, see Restaurant.get_time_slots().
+TIME_SLOTS = tuple(
+    (start, slot_label(start)) for start in DEFAULT_TIME_SLOTS
 )
 
 
+def availability_cache_key(restaurant_id):
+    """
+    Return the cache key holding the seats taken per slot for a restaurant.
+    """
+    return f"booking:availability:{restaurant_id}"
+
+
+# Cache key of the booking facts behind the occupancy dashboard; see
+# booking.analytics.
+BOOKING_FACTS_CACHE_KEY = "booking:analytics:facts"
+
+
+def invalidate_availability(restaurant_id):
+    """
+    Drop the cached availability of a restaurant now and again once the
+    current transaction commits, so a concurrent reader cannot re-cache
+    the state from before the change.
+    """
+    key = availability_cache_key(restaurant_id)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+class CapacityExceeded(Exception):
+    """
+    Raised when saving a booking would take a time slot past the
+    capacity it was reserved against.
+    """
+
+
+class TablesUnavailable(CapacityExceeded):
+    """
+    Raised when no free table, or group of joinable tables, can seat the
+    party of a booking reserved against the capacity.
+    """
+
+
 # Create your models here.
+class SlotOccupancy(models.Model):
+    """
+    Stores the number of seats held by confirmed bookings for one
+    :model:`restaurant.Restaurant` at one date and time slot.
+
+    The ledger is maintained by :model:`booking.Booking` whenever a booking
+    is created, edited, cancelled or deleted, so capacity checks read a
+    single row instead of summing every booking in the slot.
+    Run ``manage.py rebuild_occupancy`` to reconcile it with the
+    booking table.
+
+    **Fields:**
+
+    - restaurant
+        The restaurant the slot belongs to.
+    - booking_date
+        Date of the slot.
+    - time_slot
+        Start of the time slot in minutes after midnight.
+    - seats
+        Total number of people in confirmed bookings for the slot.
+    """
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE,
+                                   related_name='slot_occupancy')
+    booking_date = models.DateField()
+    time_slot = models.PositiveSmallIntegerField()
+    seats = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = 'slot occupancy'
+        constraints = [
+            models.UniqueConstraint(
+                fields=["restaurant",
+                        "booking_date",
+                        "time_slot"],
+                name="unique_slot_occupancy"
+            )
+        ]
+
+    def __str__(self):
+        return (
+            f"{self.restaurant} on {self.booking_date} "
+            f"at {slot_label(self.time_slot)}: {self.seats} seats taken."
+        )
+
+    @classmethod
+    def seats_for(cls, bookings):
+        """
+        Return ``{(restaurant_id, booking_date, time_slot): seats}`` for
+        the slots of all given bookings, read in a single query.
+        """
+        keys = {
+            (b.restaurant_id, b.booking_date, b.time_slot) for b in bookings
+        }
+        if not keys:
+            return {}
+        rows = cls.objects.filter(
+            restaurant_id__in={key[0] for key in keys},
+            booking_date__in={key[1] for key in keys},
+            time_slot__in={key[2] for key in keys},
+        ).values_list('restaurant_id', 'booking_date', 'time_slot', 'seats')
+        return {
+            (restaurant_id, booking_date, time_slot): seats
+            for restaurant_id, booking_date, time_slot, seats in rows
+            if (restaurant_id, booking_date, time_slot) in keys
+        }
+
+    @classmethod
+    def adjust(cls, restaurant_id, booking_date, time_slot, delta,
+               capacity=None):
+        """
+        Atomically add ``delta`` seats (which may be negative) to a slot.
+
+        The ledger row is created on the first booking for the slot;
+        releasing seats never creates a row. When ``capacity`` is given,
+        seats are only added if the slot stays within it: the check and
+        the increment are a single conditional ``UPDATE``, so concurrent
+        requests cannot both claim the last seats. Raises
+        :exc:`CapacityExceeded` otherwise.
+        """
+        if not delta:
+            return
+        if delta > 0:
+            cls.objects.get_or_create(
+                restaurant_id=restaurant_id,
+                booking_date=booking_date,
+                time_slot=time_slot,
+            )
+        slot = cls.objects.filter(
+            restaurant_id=restaurant_id,
+            booking_date=booking_date,
+            time_slot=time_slot,
+        )
+        if delta > 0 and capacity is not None:
+            slot = slot.filter(seats__lte=capacity - delta)
+        updated = slot.update(seats=Greatest(F('seats') + delta, 0))
+        if updated:
+            invalidate_availability(restaurant_id)
+        if delta > 0 and capacity is not None and not updated:
+            raise CapacityExceeded(
+                f"Slot {booking_date} {slot_label(time_slot)} cannot take "
+                f"{delta} more people."
+            )
+
+    @classmethod
+    def transfer(cls, previous, current, capacity=None):
+        """
+        Move seats held by a booking from its ``previous`` ledger entry to
+        its ``current`` one; each is a ``(key, seats)`` pair or ``None``.
+        """
+        if previous and current and previous[0] == current[0]:
+            cls.adjust(*current[0], current[1] - previous[1],
+                       capacity=capacity)
+            return
+        if previous:
+            cls.adjust(*previous[0], -previous[1])
+        if current:
+            cls.adjust(*current[0], current[1], capacity=capacity)
+
+
 class Booking(models.Model):
     """
     Stores information about a restaurant booking.
@@ -37,14 +213,21 @@ class Booking(models.Model):
     - booking_date
         Date of the booking.
     - time_slot
-        Time slot for the booking; choices are defined in :const:`TIME_SLOTS`.
+        Start of the booked time slot in minutes after midnight, one of the
+        restaurant's :meth:`restaurant.Restaurant.get_time_slots`; use
+        :attr:`time_slot_label` to display it.
     - number_of_people
         Number of people for the booking.
     - special_requests
         Optional special requests from the user.
+    - tables
+        The :model:`restaurant.Table` (or joined tables) the party is
+        seated at, while confirmed; see :meth:`save`.
     - status
         Current status of the booking; choices are :const:`CHOICES`.
-        Defaults to 'Confirmed'.
+        Defaults to 'Confirmed'. Past confirmed bookings are marked
+        'Completed' by the ``complete_bookings`` management command;
+        use :attr:`current_status` to read the status in the meantime.
     - created_at
         Timestamp when the booking was created.
     - updated_at
@@ -53,6 +236,11 @@ class Booking(models.Model):
     **Meta:**
 
     - Bookings are ordered by `-booking_date` then `time_slot`.
+    - Indexes cover the hot queries: confirmed bookings per slot
+      (partial on 'Confirmed'), a user's bookings in the keyset order of
+      :func:`booking.pagination.bookings_page` (scanned forwards for
+      upcoming and backwards for past bookings), and past confirmed
+      bookings awaiting completion.
     - Unique constraint prevents a user from double-booking the same restaurant
       at the same date and time slot (applies only to
       Confirmed and Completed bookings).
@@ -69,16 +257,36 @@ class Booking(models.Model):
     restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE,
                                    related_name='bookings_received')
     booking_date = models.DateField()
-    time_slot = models.CharField(max_length=20, choices=TIME_SLOTS,
-                                 default='12:00 PM - 1:30 PM')
+    time_slot = models.PositiveSmallIntegerField(
+        default=DEFAULT_TIME_SLOTS[0]
+    )
     number_of_people = models.PositiveIntegerField()
     special_requests = models.TextField(blank=True)
+    tables = models.ManyToManyField(Table, blank=True,
+                                    related_name='bookings')
     status = models.IntegerField(choices=CHOICES, default=1)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-booking_date', 'time_slot']
+        indexes = [
+            models.Index(
+                fields=["restaurant", "booking_date", "time_slot",
+                        "number_of_people"],
+                condition=Q(status=1),
+                name="booking_slot_confirmed_idx"
+            ),
+            models.Index(
+                fields=["user", "booking_date", "time_slot", "id"],
+                name="booking_user_page_idx"
+            ),
+            models.Index(
+                fields=["booking_date", "id"],
+                condition=Q(status=1),
+                name="booking_confirmed_date_idx"
+            ),
+        ]
         constraints = [
             models.UniqueConstraint(
                 fields=["user",
@@ -90,8 +298,543 @@ class Booking(models.Model):
             )
         ]
 
+    @property
+    def time_slot_label(self):
+        """
+        Return the time slot as displayed, e.g. '12:00 PM - 1:30 PM'.
+        """
+        return slot_label(self.time_slot)
+
+    @property
+    def current_status(self):
+        """
+        Return the status as of today: a confirmed booking whose date
+        has passed counts as 'Completed' even before the batch job
+        has updated it.
+        """
+        if self.status == 1 and self.booking_date < now().date():
+            return 3
+        return self.status
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._held = instance._ledger_entry()
+        return instance
+
+    def _ledger_entry(self):
+        """
+        Return the ``(key, seats)`` this booking contributes to
+        :model:`booking.SlotOccupancy`, or ``None`` if it holds no seats.
+        """
+        if self.status != 1:
+            return None
+        return (
+            (self.restaurant_id, self.booking_date, self.time_slot),
+            self.number_of_people,
+        )
+
+    def held_seats(self):
+        """
+        Return the ledger entry as stored in the database, ignoring any
+        unsaved changes made to this instance.
+
+        The entry is remembered from when the instance was loaded, which
+        is good enough for display; :meth:`save` reads it again with the
+        row locked.
+        """
+        if self._state.adding:
+            return None
+        if not hasattr(self, '_held'):
+            stored = Booking.objects.get(pk=self.pk)
+            self._held = stored._held
+        return self._held
+
+    def _lock_held_seats(self, using=None):
+        """
+        Lock the stored row of this booking until the end of the current
+        transaction and return its ledger entry, or None if it holds no
+        seats or no longer exists.
+
+        Another instance of the same booking may have been saved since
+        this one was loaded; reading the entry under the lock keeps two
+        such saves from both releasing the seats.
+        """
+        stored = (
+            Booking.objects.db_manager(using).select_for_update()
+            .filter(pk=self.pk)
+            .values_list('restaurant_id', 'booking_date', 'time_slot',
+                         'number_of_people', 'status')
+            .first()
+        )
+        if stored is None or stored[4] != 1:
+            return None
+        return (stored[:3], stored[3])
+
+    def save(self, *args, capacity=None, **kwargs):
+        """
+        Save the booking and keep :model:`booking.SlotOccupancy` in step,
+        both inside one transaction.
+
+        Pass ``capacity`` to reserve the seats against that limit; if the
+        slot is full :exc:`CapacityExceeded` is raised and nothing is saved.
+
+        At restaurants with tables, a confirmed party is also seated at a
+        table or joined tables, moving other parties of the slot if that
+        makes room (see :class:`booking.tables.SlotPlan`). If it cannot
+        be seated, :exc:`TablesUnavailable` is raised when ``capacity``
+        was given; otherwise the booking is saved without tables for
+        staff to seat.
+        """
+        with transaction.atomic(using=kwargs.get('using')):
+            previous = (
+                None if self._state.adding
+                else self._lock_held_seats(kwargs.get('using'))
+            )
+            current = self._ledger_entry()
+            SlotOccupancy.transfer(previous, current, capacity=capacity)
+            changes = self._seat_at_tables(previous, current,
+                                           strict=capacity is not None)
+            super().save(*args, **kwargs)
+            save_table_changes(changes, {None: self.pk})
+            WaitlistEntry.promote_released(previous, current)
+        self._held = current
+
+    def _seat_at_tables(self, previous, current, strict):
+        """
+        Return the table changes, as :meth:`SlotPlan.changes`, of moving
+        this booking from ledger entry ``previous`` to ``current``. An
+        unsaved booking has the key None.
+        """
+        if current == previous:
+            return {}
+        key = None if self._state.adding else self.pk
+        if current is None:
+            return {} if key is None else {key: ()}
+        moved = previous is not None and previous[0] != current[0]
+        plan = slot_plan(*current[0])
+        if plan is None:
+            return {key: ()} if moved else {}
+        if not plan.seat(key, current[1]) and strict:
+            raise TablesUnavailable(
+                f"No table can seat {current[1]} people on "
+                f"{self.booking_date} at {self.time_slot_label}."
+            )
+        changes = plan.changes()
+        if moved and key not in changes:
+            changes[key] = ()
+        return changes
+
     def __str__(self):
         return (
             f"Booking for {self.user.username} on {self.booking_date} "
-            f"at {self.time_slot} for {self.number_of_people} people."
+            f"at {self.time_slot_label} for {self.number_of_people} people."
+        )
+
+
+def slot_plan(restaurant_id, booking_date, time_slot):
+    """
+    Return the :class:`booking.tables.SlotPlan` of the confirmed bookings
+    of a slot, keyed by booking id, or None if the restaurant has no
+    active :model:`restaurant.Table`.
+    """
+    key = (restaurant_id, booking_date, time_slot)
+    return slot_plans([key])[key]
+
+
+def slot_plans(slots):
+    """
+    Return ``{slot: plan}`` like :func:`slot_plan` for several
+    ``(restaurant_id, booking_date, time_slot)`` slots, reading the
+    tables in one query and the bookings in another.
+    """
+    slots = set(slots)
+    tables = {}
+    for restaurant_id, *table in Table.objects.filter(
+        restaurant_id__in={slot[0] for slot in slots}, is_active=True
+    ).values_list('restaurant_id', 'pk', 'seats', 'join_group'):
+        tables.setdefault(restaurant_id, []).append(tuple(table))
+    seated_slots = {slot for slot in slots if slot[0] in tables}
+    if not seated_slots:
+        return dict.fromkeys(slots)
+
+    active = {table[0] for rows in tables.values() for table in rows}
+    bookings = {slot: {} for slot in seated_slots}
+    for *slot, pk, people, table in Booking.objects.filter(
+        restaurant_id__in={slot[0] for slot in seated_slots},
+        booking_date__in={slot[1] for slot in seated_slots},
+        time_slot__in={slot[2] for slot in seated_slots},
+        status=1,
+    ).values_list('restaurant_id', 'booking_date', 'time_slot', 'pk',
+                  'number_of_people', 'tables'):
+        slot = tuple(slot)
+        if slot not in bookings:
+            continue
+        seated = bookings[slot].setdefault(pk, (people, []))[1]
+        if table in active:
+            seated.append(table)
+    return {
+        slot: SlotPlan(tables[slot[0]], bookings[slot])
+        if slot in seated_slots else None
+        for slot in slots
+    }
+
+
+def save_table_changes(changes, keys):
+    """
+    Store the tables of the bookings in ``changes`` (``{key: ids}``),
+    with plan keys translated to booking ids through ``keys``.
+    """
+    if not changes:
+        return
+    changes = {keys.get(key, key): ids for key, ids in changes.items()}
+    seated = Booking.tables.through
+    seated.objects.filter(booking_id__in=changes).delete()
+    seated.objects.bulk_create([
+        seated(booking_id=booking_id, table_id=table_id)
+        for booking_id, ids in changes.items() for table_id in ids
+    ])
+
+
+@receiver(post_delete, sender=Booking)
+def release_deleted_booking(sender, instance, **kwargs):
+    """
+    Release the seats of a deleted booking, including bookings removed by
+    a cascade from their user or restaurant.
+    """
+    held = getattr(instance, '_held', None)
+    SlotOccupancy.transfer(held, None)
+    WaitlistEntry.promote_released(held, None)
+
+
+@receiver(pre_delete, sender=Booking)
+def lock_deleted_booking(sender, instance, using, **kwargs):
+    """
+    Re-read, with the row locked, the seats a booking about to be deleted
+    holds, so a stale instance of a booking already cancelled or deleted
+    does not release them a second time. Bookings loaded without seats
+    are not read again.
+    """
+    if getattr(instance, '_held', None) is not None:
+        instance._held = instance._lock_held_seats(using)
+
+
+@receiver(post_delete, sender=Booking)
+def forget_booking_facts(sender, instance, **kwargs):
+    """
+    Drop the cached booking facts of the occupancy dashboard, which are
+    otherwise only refreshed from bookings saved since they were read.
+    """
+    cache.delete(BOOKING_FACTS_CACHE_KEY)
+
+
+class WaitlistEntry(models.Model):
+    """
+    Stores a request for a table at a full time slot, queued until seats
+    free up.
+
+    Entries of a :model:`restaurant.Restaurant`, date and time slot form
+    a first-in, first-out queue. When a :model:`booking.Booking` in the
+    slot is cancelled, made smaller, moved or deleted, :meth:`promote`
+    books the waiting parties that fit into the freed seats.
+
+    **Fields:**
+
+    - user
+        The user waiting for a table.
+    - restaurant, booking_date, time_slot, number_of_people,
+      special_requests
+        The booking requested, as on :model:`booking.Booking`.
+    - status
+        'Waiting', 'Promoted' once booked or 'Withdrawn' if the user
+        booked the slot another way; choices are
+        :const:`WAITLIST_CHOICES`.
+    - booking
+        The booking made on promotion.
+    - created_at
+        When the user joined the queue; the queue is served in this
+        order.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE,
+                             related_name='waitlist_entries')
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE,
+                                   related_name='waitlist_entries')
+    booking_date = models.DateField()
+    time_slot = models.PositiveSmallIntegerField()
+    number_of_people = models.PositiveIntegerField()
+    special_requests = models.TextField(blank=True)
+    status = models.IntegerField(choices=WAITLIST_CHOICES, default=1)
+    booking = models.OneToOneField(Booking, on_delete=models.SET_NULL,
+                                   null=True, blank=True,
+                                   related_name='waitlist_entry')
+    created_at = models.DateTimeField(auto_now_add=True)
+    promoted_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name_plural = 'waitlist entries'
+        ordering = ['created_at', 'id']
+        indexes = [
+            models.Index(
+                fields=["restaurant", "booking_date", "time_slot",
+                        "created_at", "id"],
+                condition=Q(status=1),
+                name="waitlist_queue_idx"
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user",
+                        "restaurant",
+                        "booking_date",
+                        "time_slot"],
+                condition=Q(status=1),
+                name="unique_waitlist_entry"
+            )
+        ]
+
+    def __str__(self):
+        return (
+            f"{self.user.username} waiting for {self.restaurant} on "
+            f"{self.booking_date} at {slot_label(self.time_slot)} for "
+            f"{self.number_of_people} people."
+        )
+
+    @classmethod
+    def join(cls, user, restaurant, booking_date, time_slot,
+             number_of_people, special_requests=''):
+        """
+        Add a user to the queue of a slot, or update the party of the
+        entry they already have there, and return the entry.
+        """
+        entry, _ = cls.objects.update_or_create(
+            user=user,
+            restaurant=restaurant,
+            booking_date=booking_date,
+            time_slot=time_slot,
+            status=1,
+            defaults={
+                'number_of_people': number_of_people,
+                'special_requests': special_requests,
+            },
+        )
+        return entry
+
+    @classmethod
+    def promote_released(cls, previous, current):
+        """
+        Schedule :meth:`promote` for the slot of ``previous`` once the
+        current transaction commits, if a booking moving from ledger
+        entry ``previous`` to ``current`` released seats there.
+        """
+        if not previous:
+            return
+        if current and current[0] == previous[0] and (
+            current[1] >= previous[1]
+        ):
+            return
+        transaction.on_commit(partial(cls._promote_after_commit,
+                                      *previous[0]))
+
+    @classmethod
+    def _promote_after_commit(cls, restaurant_id, booking_date, time_slot):
+        for attempt in range(PROMOTE_ATTEMPTS):
+            try:
+                cls.promote(restaurant_id, booking_date, time_slot)
+            except CapacityExceeded:
+                # Another request took the seats first, or is promoting
+                # the same queue; nothing was booked.
+                return
+            except IntegrityError:
+                # A waiting user booked the slot after the queue was
+                # checked (unique_booking); nothing was booked, and the
+                # next attempt withdraws their entry and books the rest.
+                logger.warning(
+                    "Waitlist promotion at restaurant %s on %s at %s "
+                    "clashed with a new booking (attempt %d of %d).",
+                    restaurant_id, booking_date, slot_label(time_slot),
+                    attempt + 1, PROMOTE_ATTEMPTS,
+                )
+            else:
+                return
+
+    @classmethod
+    def promote(cls, restaurant_id, booking_date, time_slot,
+                batch_size=100):
+        """
+        Book waiting parties into the free seats of one slot and return
+        the promoted entries.
+
+        The queue is walked in the order users joined it and every party
+        that still fits is booked (first fit), so a large party at the
+        front does not hold back smaller ones behind it. Only entries of
+        this slot small enough for the seats left are read, ``batch_size``
+        at a time; each batch is booked with one ``bulk_create`` and one
+        capacity-checked :model:`booking.SlotOccupancy` update, all in one
+        transaction. At restaurants with tables, a party is only booked if
+        it can be seated too. Users who booked the slot since joining are
+        withdrawn from the queue.
+        """
+        if booking_date <= now().date():
+            return []
+        promoted = []
+        with transaction.atomic():
+            capacity = Restaurant.objects.values_list(
+                'online_capacity', flat=True
+            ).get(pk=restaurant_id)
+            seats = SlotOccupancy.objects.select_for_update().filter(
+                restaurant_id=restaurant_id,
+                booking_date=booking_date,
+                time_slot=time_slot,
+            ).values_list('seats', flat=True).first() or 0
+            free = capacity - seats
+            plan = slot_plan(restaurant_id, booking_date, time_slot)
+            booking_ids = {}
+            queue = cls.objects.filter(
+                status=1,
+                restaurant_id=restaurant_id,
+                booking_date=booking_date,
+                time_slot=time_slot,
+            ).order_by('created_at', 'id')
+
+            last = None
+            while free > 0:
+                candidates = queue.filter(number_of_people__lte=free)
+                if last:
+                    candidates = candidates.filter(
+                        Q(created_at__gt=last.created_at)
+                        | Q(created_at=last.created_at, id__gt=last.id)
+                    )
+                batch = list(candidates[:batch_size])
+                if not batch:
+                    break
+                last = batch[-1]
+                free -= cls._book_batch(batch, free, capacity, promoted,
+                                        plan, booking_ids)
+            if plan is not None:
+                save_table_changes(plan.changes(), booking_ids)
+        return promoted
+
+    @classmethod
+    def _book_batch(cls, batch, free, capacity, promoted, plan,
+                    booking_ids):
+        """
+        Book the entries of ``batch`` that fit into ``free`` seats and can
+        be seated in ``plan`` (if any), append them to ``promoted`` and
+        return the number of seats taken. The booking id of each entry's
+        plan key is added to ``booking_ids``.
+        """
+        first = batch[0]
+        booked = set(Booking.objects.filter(
+            restaurant_id=first.restaurant_id,
+            booking_date=first.booking_date,
+            time_slot=first.time_slot,
+            status__in=[1, 3],
+            user_id__in={entry.user_id for entry in batch},
+        ).values_list('user_id', flat=True))
+
+        chosen, withdrawn, taken = [], [], 0
+        for entry in batch:
+            if entry.user_id in booked:
+                withdrawn.append(entry.pk)
+            elif entry.number_of_people <= free - taken and (
+                plan is None
+                or plan.seat(('waitlist', entry.pk), entry.number_of_people)
+            ):
+                chosen.append(entry)
+                taken += entry.number_of_people
+        if withdrawn:
+            cls.objects.filter(pk__in=withdrawn).update(status=3)
+        if not chosen:
+            return 0
+
+        bookings = Booking.objects.bulk_create([
+            Booking(
+                user_id=entry.user_id,
+                restaurant_id=entry.restaurant_id,
+                booking_date=entry.booking_date,
+                time_slot=entry.time_slot,
+                number_of_people=entry.number_of_people,
+                special_requests=entry.special_requests,
+            )
+            for entry in chosen
+        ])
+        SlotOccupancy.adjust(first.restaurant_id, first.booking_date,
+                             first.time_slot, taken, capacity=capacity)
+        promoted_at = now()
+        for entry, booking in zip(chosen, bookings):
+            booking_ids['waitlist', entry.pk] = booking.pk
+            entry.status = 2
+            entry.booking = booking
+            entry.promoted_at = promoted_at
+        cls.objects.bulk_update(chosen, ['status', 'booking', 'promoted_at'])
+        promoted.extend(chosen)
+        return taken
+
+
+class BookingArchive(models.Model):
+    """
+    Stores a :model:`booking.Booking` moved out of the booking table once
+    it is long past, so the table read by the booking pages and the
+    admin holds recent bookings only.
+
+    Cancelled and completed bookings are moved here in batches by the
+    ``archive_bookings`` management command (see :mod:`booking.archive`)
+    and are not changed afterwards. On PostgreSQL the table is
+    range-partitioned by ``booking_date``, one partition per year, so
+    queries for a date range only read the years it covers and old years
+    can be detached from the table as a whole.
+
+    **Fields:**
+
+    - id
+        The id the booking had, which is never reused.
+    - user, restaurant, booking_date, time_slot, number_of_people,
+      special_requests, status, created_at, updated_at
+        As on :model:`booking.Booking`. The foreign keys have no database
+        constraint, which the partitioned table does not carry over;
+        deleting a user or restaurant still deletes its archived
+        bookings.
+    - archived_at
+        When the booking was moved here.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE,
+                             related_name='archived_bookings',
+                             db_constraint=False, db_index=False)
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE,
+                                   related_name='archived_bookings',
+                                   db_constraint=False, db_index=False)
+    booking_date = models.DateField()
+    time_slot = models.PositiveSmallIntegerField()
+    number_of_people = models.PositiveIntegerField()
+    special_requests = models.TextField(blank=True)
+    status = models.IntegerField(choices=CHOICES)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-booking_date', 'time_slot']
+        indexes = [
+            models.Index(
+                fields=["user", "-booking_date", "time_slot"],
+                name="archive_user_date_idx"
+            ),
+            models.Index(
+                fields=["restaurant", "booking_date", "time_slot"],
+                name="archive_restaurant_date_idx"
+            ),
+        ]
+
+    @property
+    def time_slot_label(self):
+        """
+        Return the time slot as displayed, e.g. '12:00 PM - 1:30 PM'.
+        """
+        return slot_label(self.time_slot)
+
+    def __str__(self):
+        return (
+            f"Archived booking for {self.user.username} on "
+            f"{self.booking_date} at {self.time_slot_label}."
         )
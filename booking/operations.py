@@ -0,0 +1,115 @@
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db.backends.ddl_references import Statement
+from django.db.migrations.operations import AddIndex
+from django.db.migrations.operations.base import Operation
+
+
+class AddIndexConcurrentlyIfPostgres(AddIndexConcurrently):
+    """
+    Migration operation that builds an index with
+    ``CREATE INDEX CONCURRENTLY`` on Postgres, so a large production
+    table stays writable while the index is built.
+
+    Other databases (SQLite in development and tests) get a plain
+    ``CREATE INDEX``. Migrations using it must set ``atomic = False``.
+    """
+    def database_forwards(self, app_label, schema_editor, from_state,
+                          to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            return super().database_forwards(
+                app_label, schema_editor, from_state, to_state
+            )
+        return AddIndex.database_forwards(
+            self, app_label, schema_editor, from_state, to_state
+        )
+
+    def database_backwards(self, app_label, schema_editor, from_state,
+                           to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            return super().database_backwards(
+                app_label, schema_editor, from_state, to_state
+            )
+        return AddIndex.database_backwards(
+            self, app_label, schema_editor, from_state, to_state
+        )
+
+
+class PartitionByRangeIfPostgres(Operation):
+    """
+    Migration operation that turns the empty table of a model into a
+    table range-partitioned by one of its date fields on Postgres, with a
+    default partition catching rows no other partition covers.
+
+    The table is rebuilt with ``CREATE TABLE ... (LIKE ...)``, so it
+    keeps its columns, defaults and check constraints; the primary key
+    is extended with the partition column, as Postgres requires, and the
+    model's ``Meta.indexes`` are created again on the partitioned table.
+    Foreign keys pointing to the table, and foreign key constraints and
+    field indexes on it, are not carried over. Partitions for date ranges
+    are added later; see :func:`booking.archive.create_partitions`.
+
+    Other databases keep the plain table.
+    """
+    reversible = True
+
+    def __init__(self, model_name, field_name):
+        self.model_name = model_name
+        self.field_name = field_name
+
+    def deconstruct(self):
+        return (
+            self.__class__.__qualname__,
+            [],
+            {'model_name': self.model_name, 'field_name': self.field_name},
+        )
+
+    def state_forwards(self, app_label, state):
+        pass
+
+    def database_forwards(self, app_label, schema_editor, from_state,
+                          to_state):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        model = to_state.apps.get_model(app_label, self.model_name)
+        table = model._meta.db_table
+        column = model._meta.get_field(self.field_name).column
+        quote = schema_editor.quote_name
+        rebuilt = f"{table}_partitioned"
+
+        # Create the indexes still pending from CreateModel now, as the
+        # table they are for is about to be dropped.
+        for sql in list(schema_editor.deferred_sql):
+            if isinstance(sql, Statement) and sql.references_table(table):
+                schema_editor.execute(sql)
+                schema_editor.deferred_sql.remove(sql)
+
+        schema_editor.execute(
+            f"CREATE TABLE {quote(rebuilt)} (LIKE {quote(table)} "
+            f"INCLUDING DEFAULTS INCLUDING CONSTRAINTS) "
+            f"PARTITION BY RANGE ({quote(column)})"
+        )
+        schema_editor.execute(
+            f"ALTER TABLE {quote(rebuilt)} ADD PRIMARY KEY "
+            f"({quote(model._meta.pk.column)}, {quote(column)})"
+        )
+        schema_editor.execute(f"DROP TABLE {quote(table)}")
+        schema_editor.execute(
+            f"ALTER TABLE {quote(rebuilt)} RENAME TO {quote(table)}"
+        )
+        schema_editor.execute(
+            f"CREATE TABLE {quote(table + '_default')} "
+            f"PARTITION OF {quote(table)} DEFAULT"
+        )
+        for index in model._meta.indexes:
+            schema_editor.add_index(model, index)
+
+    def database_backwards(self, app_label, schema_editor, from_state,
+                           to_state):
+        # Dropping the model's table drops its partitions too.
+        pass
+
+    def describe(self):
+        return (
+            f"Partition {self.model_name} by range of {self.field_name} "
+            f"on Postgres"
+        )
@@ -0,0 +1,106 @@
+from datetime import date
+from django.conf import settings
+from django.db.models import Field, Func, Value
+from django.db.models.lookups import GreaterThan, LessThan
+from django.utils.timezone import now
+from .models import Booking
+
+UPCOMING = 'upcoming'
+PAST = 'past'
+SECTIONS = (UPCOMING, PAST)
+
+
+def page_size():
+    return getattr(settings, 'MY_BOOKINGS_PAGE_SIZE', 10)
+
+
+def encode_cursor(booking):
+    """
+    Return the cursor pointing just after ``booking``, in the form
+    ``'2025-06-01.720.42'`` (date, slot start and id).
+    """
+    return (
+        f"{booking.booking_date.isoformat()}.{booking.time_slot}.{booking.pk}"
+    )
+
+
+def decode_cursor(cursor):
+    """
+    Return the ``(booking_date, time_slot, id)`` of a cursor made by
+    :func:`encode_cursor`. Raises ``ValueError`` for a malformed cursor.
+    """
+    booking_date, time_slot, pk = cursor.split('.')
+    return date.fromisoformat(booking_date), int(time_slot), int(pk)
+
+
+class _Row(Func):
+    """
+    A row value, e.g. ``(booking_date, time_slot, id)``. Comparing two
+    rows orders them column by column, which the database can answer
+    with a range scan of an index on the same columns.
+    """
+    function = ''
+    output_field = Field()
+
+
+def page_queryset(user, section, cursor=None, size=None):
+    """
+    Return the queryset of one page of a user's bookings, with one extra
+    row to tell whether another page follows; see :func:`bookings_page`.
+    """
+    size = size or page_size()
+    today = now().date()
+    bookings = Booking.objects.filter(user=user).select_related('restaurant')
+
+    if section == UPCOMING:
+        bookings = bookings.filter(booking_date__gte=today).order_by(
+            'booking_date', 'time_slot', 'pk'
+        )
+    else:
+        bookings = bookings.filter(booking_date__lt=today).order_by(
+            '-booking_date', '-time_slot', '-pk'
+        )
+
+    if cursor:
+        after = LessThan if section == PAST else GreaterThan
+        bookings = bookings.filter(after(
+            _Row('booking_date', 'time_slot', 'pk'),
+            _Row(*map(Value, decode_cursor(cursor))),
+        ))
+    return bookings[:size + 1]
+
+
+def split_page(rows, size=None):
+    """
+    Return the rows of a page fetched by :func:`page_queryset` and the
+    cursor of the next page, or None if it is the last one.
+    """
+    size = size or page_size()
+    if len(rows) > size:
+        return rows[:size], encode_cursor(rows[size - 1])
+    return rows, None
+
+
+def bookings_page(user, section, cursor=None, size=None):
+    """
+    Return one page of a user's bookings and the cursor of the next page,
+    or None if it is the last one.
+
+    ``upcoming`` bookings (today onwards) are listed soonest first and
+    ``past`` bookings most recent first, both ordered by
+    ``(booking_date, time_slot, id)``. Pages are found by keyset rather
+    than offset: the cursor is a row comparison on the columns of the
+    ``booking_user_page_idx`` index, so every page is one joined range
+    scan of the index however deep into the history it is.
+    """
+    rows = list(page_queryset(user, section, cursor, size))
+    return split_page(rows, size)
+
+
+async def abookings_page(user, section, cursor=None, size=None):
+    """Async version of :func:`bookings_page`."""
+    rows = [
+        booking
+        async for booking in page_queryset(user, section, cursor, size)
+    ]
+    return split_page(rows, size)
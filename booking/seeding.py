@@ -0,0 +1,90 @@
+import random
+from io import StringIO
+from datetime import timedelta
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.utils.timezone import now
+from restaurant.models import Restaurant
+from .models import Booking, TIME_SLOTS
+
+
+def seed_restaurants(count):
+    """
+    Create (or reuse) ``count`` benchmark restaurants and return them.
+    """
+    restaurants = []
+    for i in range(count):
+        restaurant, _ = Restaurant.objects.get_or_create(
+            slug=f"bench-restaurant-{i}",
+            defaults={
+                'name': f"Bench Restaurant {i}",
+                'address': f"{i} Benchmark Street",
+                'city': f"Benchville {i % 3}",
+                'phone_number': f"bench-{i}",
+                'description': "Seeded for benchmarks.",
+            }
+        )
+        restaurants.append(restaurant)
+    return restaurants
+
+
+def seed_users(count, batch_size=5000):
+    """
+    Bulk-create ``count`` benchmark users without usable passwords and
+    return their primary keys.
+    """
+    password = make_password(None)
+    for start in range(0, count, batch_size):
+        User.objects.bulk_create(
+            [User(username=f"bench-user-{i}", password=password)
+             for i in range(start, min(start + batch_size, count))],
+            ignore_conflicts=True,
+        )
+    return list(
+        User.objects.filter(username__startswith="bench-user-")
+        .order_by('pk')
+        .values_list('pk', flat=True)[:count]
+    )
+
+
+def seed_bookings(bookings, restaurants=10, users=10000, seed=0,
+                  batch_size=5000, progress=None):
+    """
+    Bulk-insert ``bookings`` random bookings spread over a year of history
+    and the 180-day booking window, then rebuild the occupancy ledger.
+
+    The data is reproducible for a given ``seed``. Rows that would break
+    the unique booking constraint are skipped, so slightly fewer than
+    ``bookings`` rows may be created. ``progress`` is called with the
+    number of rows attempted after each batch.
+    """
+    rng = random.Random(seed)
+    restaurant_ids = [r.pk for r in seed_restaurants(restaurants)]
+    user_ids = seed_users(users, batch_size)
+    slots = [value for value, _ in TIME_SLOTS]
+    today = now().date()
+
+    for start in range(0, bookings, batch_size):
+        batch = []
+        for _ in range(min(batch_size, bookings - start)):
+            booking_date = today + timedelta(days=rng.randint(-365, 180))
+            if rng.random() < 0.1:
+                status = 2
+            elif booking_date < today:
+                status = 3
+            else:
+                status = 1
+            batch.append(Booking(
+                user_id=rng.choice(user_ids),
+                restaurant_id=rng.choice(restaurant_ids),
+                booking_date=booking_date,
+                time_slot=rng.choice(slots),
+                number_of_people=rng.randint(1, 6),
+                status=status,
+            ))
+        Booking.objects.bulk_create(batch, ignore_conflicts=True)
+        if progress:
+            progress(start + len(batch))
+
+    call_command('rebuild_occupancy', stdout=StringIO())
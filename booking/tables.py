@@ -0,0 +1,269 @@
+"""
+Seat bookings at the physical tables of a restaurant.
+
+A party sits at one table, or at up to :const:`MAX_JOINED` tables of the
+same join group pushed together. :class:`SlotPlan` holds the tables
+every booking of one time slot sits at and seats new parties: first at
+the best-fitting free tables, and if none are left by re-seating the
+whole slot with a backtracking search, so two parties of 5 are never
+promised ten seats spread over tables of 2.
+
+Tables with the same seats and join group are interchangeable, so
+seatings are worked out per kind of table rather than per table, which
+keeps a check of a full evening to a few milliseconds.
+"""
+from itertools import combinations_with_replacement
+
+# Most tables one party can be seated at.
+MAX_JOINED = 3
+
+# Placements tried by one search before giving up on the slot.
+SEARCH_LIMIT = 2000
+
+
+def seatings(kinds, max_joined=MAX_JOINED):
+    """
+    Return every way of seating one party as ``(seats, counts)`` pairs,
+    smallest first, where ``counts`` are ``(kind, number)`` pairs of the
+    tables used: each kind of table on its own and up to ``max_joined``
+    tables of one join group.
+
+    ``kinds`` are ``(seats, join_group, number)`` tuples, one per kind of
+    table; a kind is referred to by its position.
+    """
+    options = [(seats, ((kind, 1),))
+               for kind, (seats, _, _) in enumerate(kinds)]
+    groups = {}
+    for kind, (_, group, _) in enumerate(kinds):
+        if group:
+            groups.setdefault(group, []).append(kind)
+    for group in groups.values():
+        for size in range(2, max_joined + 1):
+            for joined in combinations_with_replacement(group, size):
+                counts = tuple(
+                    (kind, joined.count(kind)) for kind in sorted(set(joined))
+                )
+                if all(kinds[kind][2] >= count for kind, count in counts):
+                    options.append(
+                        (sum(kinds[kind][0] for kind in joined), counts)
+                    )
+    options.sort(key=lambda option: (
+        option[0], sum(count for _, count in option[1])
+    ))
+    return options
+
+
+class SlotPlan:
+    """
+    The tables of a restaurant and the tables each booking of one time
+    slot sits at.
+
+    ``tables`` are ``(id, seats, join_group)`` tuples and ``bookings``
+    maps each booking's key to its number of people and the ids of the
+    tables it sits at (empty if none). :meth:`seat` changes the plan;
+    :meth:`changes` returns the bookings whose tables changed since.
+    """
+
+    def __init__(self, tables, bookings):
+        self.seats = {pk: seats for pk, seats, _ in tables}
+        by_kind = {}
+        for pk, seats, group in tables:
+            by_kind.setdefault((seats, group), []).append(pk)
+        self.tables = list(by_kind.values())
+        self.kind_of = {
+            pk: kind for kind, ids in enumerate(self.tables) for pk in ids
+        }
+        self.kinds = [
+            (seats, group, len(ids))
+            for (seats, group), ids in by_kind.items()
+        ]
+        self.options = seatings(self.kinds)
+        self.fits = {}
+        self.people = {key: people for key, (people, _) in bookings.items()}
+        self.seated = {
+            key: tuple(sorted(ids))
+            for key, (_, ids) in bookings.items() if ids
+        }
+        self.initial = dict(self.seated)
+
+    def seat(self, key, people):
+        """
+        Seat the party of booking ``key`` and return True, moving other
+        parties to different tables if needed; return False and leave
+        the plan unchanged if the party cannot be seated.
+
+        A party keeps its tables while they still seat it.
+        """
+        previous = self.people.get(key)
+        self.people[key] = people
+        current = self.seated.pop(key, ())
+        if current and sum(self.seats[pk] for pk in current) >= people:
+            self.seated[key] = current
+            return True
+
+        if len(self.seated) == len(self.people) - 1:
+            free = self._free()
+            for _, counts in self._fitting(people):
+                if all(len(free[kind]) >= count for kind, count in counts):
+                    self.seated[key] = tuple(sorted(
+                        pk for kind, count in counts
+                        for pk in free[kind][:count]
+                    ))
+                    return True
+
+        # Re-seat every party, or failing that every party already seated
+        # (others were booked without a table, e.g. by staff).
+        everyone = self.people
+        seated = {k: p for k, p in everyone.items()
+                  if k in self.seated or k == key}
+        for parties in (everyone, seated):
+            plan = self.solve(parties)
+            if plan is not None:
+                self.seated = plan
+                return True
+            if len(seated) == len(everyone):
+                break
+
+        if previous is None:
+            del self.people[key]
+        else:
+            self.people[key] = previous
+        if current:
+            self.seated[key] = current
+        return False
+
+    def remove(self, key):
+        """Take the party of booking ``key`` off its tables."""
+        self.people.pop(key, None)
+        self.seated.pop(key, None)
+
+    def solve(self, parties):
+        """
+        Return ``{key: ids}`` seating every party of ``{key: people}`` at
+        its own tables, or None if no way was found within
+        :const:`SEARCH_LIMIT` placements.
+
+        The search counts the free tables of each kind. Parties are
+        placed largest first, each at the smallest seating that fits;
+        equal parties take seatings in order, dead ends are remembered,
+        and a branch is abandoned when the free seats or tables cannot
+        hold the parties left.
+        """
+        order = sorted(parties.items(), key=lambda item: -item[1])
+        fits = {people: self._fitting(people) for _, people in order}
+        if not all(fits.values()):
+            return None
+        # The fewest seats the parties from each position on can take.
+        left = [0] * (len(order) + 1)
+        for i in range(len(order) - 1, -1, -1):
+            left[i] = left[i + 1] + fits[order[i][1]][0][0]
+        failed = set()
+        steps = [0]
+
+        def place(i, free, first, seats_free):
+            if i == len(order):
+                return []
+            if (seats_free < left[i] or sum(free) < len(order) - i
+                    or (i, free, first) in failed):
+                return None
+            people = order[i][1]
+            options = fits[people]
+            for n in range(first, len(options)):
+                seats, counts = options[n]
+                if any(free[kind] < count for kind, count in counts):
+                    continue
+                steps[0] += 1
+                if steps[0] > SEARCH_LIMIT:
+                    raise _GiveUp
+                taken = list(free)
+                for kind, count in counts:
+                    taken[kind] -= count
+                same = i + 1 < len(order) and order[i + 1][1] == people
+                rest = place(i + 1, tuple(taken), n if same else 0,
+                             seats_free - seats)
+                if rest is not None:
+                    rest.append(counts)
+                    return rest
+            failed.add((i, free, first))
+            return None
+
+        try:
+            chosen = place(0, tuple(number for _, _, number in self.kinds),
+                           0, sum(self.seats.values()))
+        except _GiveUp:
+            return None
+        if chosen is None:
+            return None
+        return self._tables_for(
+            {key: counts for (key, _), counts in zip(order, chosen[::-1])}
+        )
+
+    def changes(self):
+        """
+        Return ``{key: ids}`` for every booking whose tables changed
+        since the plan was made, with empty ids for bookings removed.
+        """
+        changed = {
+            key: ids for key, ids in self.seated.items()
+            if self.initial.get(key) != ids
+        }
+        changed.update(
+            (key, ()) for key in self.initial if key not in self.seated
+        )
+        return changed
+
+    def _fitting(self, people):
+        """
+        Return the seatings that fit ``people`` without a table to
+        spare; seating a party at more tables than it needs never helps
+        to seat the others.
+        """
+        if people not in self.fits:
+            self.fits[people] = [
+                (seats, counts) for seats, counts in self.options
+                if seats >= people and all(
+                    seats - self.kinds[kind][0] < people
+                    for kind, _ in counts
+                )
+            ]
+        return self.fits[people]
+
+    def _free(self):
+        """Return the ids of the free tables of each kind."""
+        used = {pk for ids in self.seated.values() for pk in ids}
+        return [[pk for pk in ids if pk not in used] for ids in self.tables]
+
+    def _tables_for(self, kinds):
+        """
+        Turn ``{key: counts}`` of table kinds into ``{key: ids}``,
+        keeping a party at its current tables when they are of the kinds
+        chosen for it.
+        """
+        pools = [list(ids) for ids in self.tables]
+        plan, rest = {}, []
+        for key, counts in kinds.items():
+            current = self.seated.get(key, ())
+            if current and self._counts(current) == counts:
+                plan[key] = current
+                for pk in current:
+                    pools[self.kind_of[pk]].remove(pk)
+            else:
+                rest.append((key, counts))
+        for key, counts in rest:
+            ids = []
+            for kind, count in counts:
+                ids += pools[kind][:count]
+                del pools[kind][:count]
+            plan[key] = tuple(sorted(ids))
+        return plan
+
+    def _counts(self, ids):
+        counts = {}
+        for pk in ids:
+            kind = self.kind_of[pk]
+            counts[kind] = counts.get(kind, 0) + 1
+        return tuple(sorted(counts.items()))
+
+
+class _GiveUp(Exception):
+    pass
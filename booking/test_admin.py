@@ -0,0 +1,74 @@
+from django.test import TestCase
+from django.urls import reverse
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth.models import User
+from restaurant.models import Restaurant
+from .models import Booking
+from datetime import date, timedelta
+
+
+class TestBookingAdminChangelist(TestCase):
+    """ Tests for the BookingAdmin changelist page. """
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser(
+            username="admin",
+            password="password"
+        )
+        self.client.force_login(self.admin)
+        self.restaurant = Restaurant.objects.create(
+            name="Test Bistro",
+            slug="test-bistro",
+            address="123 Street",
+            city="Town",
+            phone_number="123456789",
+            online_capacity=20,
+        )
+        self.other_restaurant = Restaurant.objects.create(
+            name="Other Bistro",
+            slug="other-bistro",
+            address="456 Street",
+            city="Village",
+            phone_number="987654321",
+            online_capacity=30,
+        )
+        self.url = reverse('admin:booking_booking_changelist')
+
+    def add_bookings(self, count):
+        """Create ``count`` bookings spread over restaurants and dates."""
+        start = Booking.objects.count()
+        for i in range(start, start + count):
+            user = User.objects.create_user(username=f"diner{i}")
+            Booking.objects.create(
+                user=user,
+                restaurant=(self.restaurant if i % 2
+                            else self.other_restaurant),
+                booking_date=date.today() + timedelta(days=1 + i % 3),
+                time_slot=720,
+                number_of_people=2,
+            )
+
+    def count_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_query_count_does_not_grow_with_rows(self):
+        """The changelist runs the same number of queries for 3 or 30 rows."""
+        self.add_bookings(3)
+        few = self.count_queries()
+        self.add_bookings(27)
+        many = self.count_queries()
+        self.assertEqual(few, many)
+
+    def test_spots_left_and_city_columns(self):
+        """Spots left and city are shown from the batched page data."""
+        self.add_bookings(2)
+        response = self.client.get(self.url)
+        self.assertContains(response, '<td class="field-spots_left">18</td>',
+                            html=True)
+        self.assertContains(response, '<td class="field-spots_left">28</td>',
+                            html=True)
+        self.assertContains(response, "Village")
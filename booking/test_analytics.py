@@ -0,0 +1,117 @@
+from django.test import TestCase
+from django.urls import reverse
+from django.core.cache import cache
+from django.contrib.auth.models import User
+from restaurant.models import Restaurant
+from .analytics import CACHE_KEY, booking_facts, occupancy_report
+from .models import Booking
+from datetime import date, timedelta
+
+
+class TestOccupancyAnalytics(TestCase):
+    """ Tests for the occupancy figures and the cached booking facts. """
+
+    def setUp(self):
+        cache.clear()
+        self.restaurant = Restaurant.objects.create(
+            name="Test Bistro",
+            slug="test-bistro",
+            address="123 Street",
+            city="Town",
+            phone_number="123456789",
+            online_capacity=10,
+        )
+        self.user = User.objects.create_user(username="diner")
+        today = date.today()
+        # A week from Monday to Sunday, at least a week ahead.
+        self.monday = today + timedelta(days=7 + (7 - today.weekday()) % 7)
+        self.sunday = self.monday + timedelta(days=6)
+
+    def book(self, day, time_slot, people, status=1):
+        return Booking.objects.create(
+            user=User.objects.create_user(
+                username=f"diner{Booking.objects.count()}"
+            ),
+            restaurant=self.restaurant,
+            booking_date=self.monday + timedelta(days=day),
+            time_slot=time_slot,
+            number_of_people=people,
+            status=status,
+        )
+
+    def test_report_by_weekday_and_slot(self):
+        """ Utilisation, cancellations and lead times are aggregated. """
+        self.book(0, 720, 4)
+        self.book(0, 720, 2, status=2)
+        self.book(1, 810, 5)
+        report = occupancy_report(booking_facts(), self.restaurant,
+                                  self.monday, self.sunday)
+
+        self.assertEqual(report['utilisation'][0][0], 0.4)
+        self.assertEqual(report['utilisation'][1][1], 0.5)
+        self.assertEqual(report['utilisation'][2][0], 0)
+        self.assertAlmostEqual(report['cancelled'][0][0], 1 / 3)
+        self.assertEqual(report['weekdays'][1][1][1], (0.5, 0.0))
+        self.assertIsNone(report['weekdays'][2][1][0][1])
+        self.assertEqual(report['cube'].shape, (7, 6))
+        self.assertEqual((report['bookings'], report['seats']), (2, 9))
+        self.assertAlmostEqual(report['cancelled_share'], 2 / 11)
+        lead_times = {label: count
+                      for label, count, _ in report['lead_times']}
+        self.assertEqual(sum(lead_times.values()), 2)
+        self.assertEqual(lead_times['60+ days'], 0)
+
+    def test_utilisation_averages_over_dates(self):
+        """ Two Mondays in the range halve a single Monday's share. """
+        self.book(0, 720, 4)
+        report = occupancy_report(booking_facts(), self.restaurant,
+                                  self.monday,
+                                  self.monday + timedelta(days=7))
+        self.assertEqual(report['utilisation'][0][0], 0.2)
+
+    def test_facts_refresh_from_changed_bookings(self):
+        """ Only bookings saved since the last build are read again. """
+        first = self.book(0, 720, 4)
+        self.assertEqual(list(booking_facts()['people']), [4])
+
+        first.number_of_people = 3
+        first.save()
+        second = self.book(1, 810, 2)
+        with self.assertNumQueries(1):
+            facts = booking_facts()
+        self.assertEqual(list(facts['id']), [first.pk, second.pk])
+        self.assertEqual(list(facts['people']), [3, 2])
+
+    def test_deleting_a_booking_drops_the_facts(self):
+        """ Deleted bookings are left out by rebuilding the facts. """
+        booking = self.book(0, 720, 4)
+        booking_facts()
+        booking.delete()
+        self.assertIsNone(cache.get(CACHE_KEY))
+        self.assertEqual(len(booking_facts()['id']), 0)
+
+    def test_dashboard_page(self):
+        """ Staff see the heatmaps for the chosen restaurant and dates. """
+        self.book(0, 720, 4)
+        self.client.force_login(
+            User.objects.create_superuser(username="admin")
+        )
+        url = reverse('admin:booking_booking_dashboard')
+        response = self.client.get(url, {
+            'restaurant': self.restaurant.pk,
+            'start': self.monday,
+            'end': self.sunday,
+        })
+        self.assertContains(response, "Utilisation of the online capacity")
+        self.assertContains(response, "40%")
+
+        response = self.client.get(url)
+        self.assertContains(response, "Lead time of bookings")
+
+        response = self.client.get(url, {
+            'restaurant': self.restaurant.pk,
+            'start': self.sunday,
+            'end': self.monday,
+        })
+        self.assertContains(response, "cannot be before the start")
+        self.assertIsNone(response.context['report'])
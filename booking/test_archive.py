@@ -0,0 +1,140 @@
+from io import StringIO
+from django.test import TestCase
+from django.urls import reverse
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.contrib.auth.models import User
+from restaurant.models import Restaurant
+from .analytics import booking_facts
+from .archive import (
+    archive_bookings, create_partitions, detach_partitions,
+    detached_partitions
+)
+from .models import Booking, BookingArchive, WaitlistEntry
+from datetime import date, timedelta
+
+
+class TestArchiveBookings(TestCase):
+    """ Tests for moving old bookings into the booking archive. """
+
+    def setUp(self):
+        cache.clear()
+        self.restaurant = Restaurant.objects.create(
+            name="Test Bistro",
+            slug="test-bistro",
+            address="123 Street",
+            city="Town",
+            phone_number="123456789",
+        )
+        self.user = User.objects.create_user(username="diner")
+        self.old_date = date.today() - timedelta(days=400)
+
+    def book(self, booking_date, status, time_slot=720):
+        return Booking.objects.create(
+            user=self.user,
+            restaurant=self.restaurant,
+            booking_date=booking_date,
+            time_slot=time_slot,
+            number_of_people=2,
+            status=status,
+        )
+
+    def test_moves_old_cancelled_and_completed_bookings(self):
+        """
+        Old bookings are moved with their ids and fields in batches;
+        recent and still confirmed bookings stay.
+        """
+        completed = self.book(self.old_date, 3)
+        cancelled = self.book(self.old_date, 2, time_slot=810)
+        self.book(self.old_date - timedelta(days=1), 3)
+        confirmed = self.book(self.old_date, 1, time_slot=1080)
+        recent = self.book(date.today() - timedelta(days=10), 3)
+        entry = WaitlistEntry.objects.create(
+            user=self.user,
+            restaurant=self.restaurant,
+            booking_date=self.old_date,
+            time_slot=720,
+            number_of_people=2,
+            status=2,
+            booking=completed,
+        )
+
+        moved = archive_bookings(date.today() - timedelta(days=365),
+                                 batch_size=2)
+
+        self.assertEqual(moved, 3)
+        self.assertEqual(
+            set(Booking.objects.values_list('pk', flat=True)),
+            {confirmed.pk, recent.pk},
+        )
+        archived = BookingArchive.objects.get(pk=cancelled.pk)
+        self.assertEqual(archived.status, 2)
+        self.assertEqual(archived.time_slot, 810)
+        self.assertEqual(archived.created_at, cancelled.created_at)
+        self.assertEqual(archived.user, self.user)
+        entry.refresh_from_db()
+        self.assertIsNone(entry.booking)
+
+    def test_dashboard_facts_include_archived_bookings(self):
+        """ Archived bookings still count in the occupancy figures. """
+        archived = self.book(self.old_date, 3)
+        kept = self.book(date.today(), 1)
+        booking_facts()
+        archive_bookings(date.today() - timedelta(days=365))
+
+        with self.assertNumQueries(1):
+            facts = booking_facts()
+        self.assertEqual(sorted(facts['id']), [archived.pk, kept.pk])
+
+    def test_command(self):
+        """ The command reports what it moves, or would move. """
+        self.book(self.old_date, 3)
+        out = StringIO()
+        call_command('archive_bookings', '--dry-run', stdout=out)
+        self.assertIn("Would archive 1 bookings", out.getvalue())
+        self.assertEqual(BookingArchive.objects.count(), 0)
+
+        out = StringIO()
+        call_command('archive_bookings', '--days', '500', stdout=out)
+        self.assertIn("Archived 0 bookings", out.getvalue())
+
+        out = StringIO()
+        call_command('archive_bookings', '--detach-before', '2020',
+                     stdout=out)
+        self.assertIn("Archived 1 bookings", out.getvalue())
+        self.assertIn("only partitioned on PostgreSQL", out.getvalue())
+        self.assertFalse(Booking.objects.exists())
+
+        with self.assertRaises(CommandError):
+            call_command('archive_bookings', '--days', '0',
+                         stdout=StringIO())
+
+    def test_partitions_need_postgresql(self):
+        """ Without PostgreSQL the archive is one plain table. """
+        self.assertEqual(create_partitions([2024, 2025]), [])
+        self.assertEqual(detach_partitions(2025), [])
+        self.assertEqual(detached_partitions(), {})
+
+    def test_admin_is_read_only(self):
+        """ Staff can browse archived bookings but not change them. """
+        archived = self.book(self.old_date, 3)
+        archive_bookings(date.today() - timedelta(days=365))
+        self.client.force_login(
+            User.objects.create_superuser(username="admin")
+        )
+        response = self.client.get(
+            reverse('admin:booking_bookingarchive_changelist'),
+            {'booking_date__gte': self.old_date,
+             'booking_date__lt': self.old_date + timedelta(days=1)},
+        )
+        self.assertContains(response, "12:00 PM")
+        response = self.client.get(
+            reverse('admin:booking_bookingarchive_change',
+                    args=[archived.pk])
+        )
+        self.assertNotContains(response, 'name="_save"')
+        response = self.client.get(
+            reverse('admin:booking_bookingarchive_add')
+        )
+        self.assertEqual(response.status_code, 403)
@@ -0,0 +1,155 @@
+from django.test import AsyncClient, TestCase, override_settings
+from django.urls import include, path, reverse
+from django.contrib.auth.models import User
+from restaurant import async_views as restaurant_views
+from restaurant.cache import page_cache
+from restaurant.models import Restaurant
+from . import async_views, views
+from .availability import slot_availability
+from .models import Booking, SlotOccupancy
+from datetime import date, timedelta
+
+# URLs of the site with ASYNC_VIEWS enabled.
+urlpatterns = [
+    path("accounts/", include("allauth.urls")),
+    path('booking/<slug:slug>/book/', async_views.create_booking,
+         name='create_booking'),
+    path('booking/<slug:slug>/availability/', async_views.availability,
+         name='availability'),
+    path('booking/my-bookings/', async_views.my_bookings,
+         name='my_bookings'),
+    path('booking/my-bookings/more/', async_views.more_bookings,
+         name='more_bookings'),
+    path('booking/edit-booking/<int:pk>/', views.edit_booking,
+         name='edit_booking'),
+    path('booking/cancel-booking/<int:pk>/', views.cancel_booking,
+         name='cancel_booking'),
+    path('', restaurant_views.home, name='home'),
+    path('<slug:slug>/', restaurant_views.restaurant_detail,
+         name='restaurant_detail'),
+]
+
+
+@override_settings(ROOT_URLCONF=__name__, MY_BOOKINGS_PAGE_SIZE=1)
+class TestAsyncViews(TestCase):
+    """ Tests for the async versions of the booking and restaurant views. """
+
+    def setUp(self):
+        page_cache().clear()
+        self.user = User.objects.create_user(
+            username="testuser",
+            password="password"
+        )
+        self.restaurant = Restaurant.objects.create(
+            name="Test Bistro",
+            slug="test-bistro",
+            address="123 Street",
+            city="Town",
+            phone_number="123456789",
+            description="Test place",
+            online_capacity=4,
+        )
+        self.booking_date = date.today() + timedelta(days=2)
+        self.client.force_login(self.user)
+        self.async_client.force_login(self.user)
+
+    async def test_create_booking(self):
+        """ A valid booking is saved with its seats reserved. """
+        response = await self.async_client.post(
+            reverse('create_booking', args=['test-bistro']),
+            {
+                'booking_date': self.booking_date,
+                'time_slot': 720,
+                'number_of_people': 3,
+            }
+        )
+        self.assertRedirects(response, reverse('my_bookings'),
+                             fetch_redirect_response=False)
+        self.assertTrue(await Booking.objects.filter(
+            user=self.user, number_of_people=3
+        ).aexists())
+        slot = await SlotOccupancy.objects.aget(time_slot=720)
+        self.assertEqual(slot.seats, 3)
+
+    async def test_create_booking_over_capacity(self):
+        """ A booking over capacity is rejected with a form error. """
+        response = await self.async_client.post(
+            reverse('create_booking', args=['test-bistro']),
+            {
+                'booking_date': self.booking_date,
+                'time_slot': 720,
+                'number_of_people': 5,
+            }
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "capacity limits")
+        self.assertFalse(await Booking.objects.aexists())
+
+    async def test_login_required(self):
+        """ Anonymous users are sent to the login page. """
+        response = await AsyncClient().get(reverse('my_bookings'))
+        self.assertEqual(response.status_code, 302)
+        self.assertIn('/accounts/login/', response['Location'])
+
+    def test_my_bookings_and_load_more(self):
+        """ My Bookings lists the first page and loads the next one. """
+        for days in (1, 2):
+            Booking.objects.create(
+                user=self.user,
+                restaurant=self.restaurant,
+                booking_date=date.today() + timedelta(days=days),
+                time_slot=720,
+                number_of_people=1,
+            )
+        response = self.client.get(reverse('my_bookings'))
+        self.assertEqual(len(response.context['upcoming']), 1)
+        page = self.client.get(reverse('more_bookings'), {
+            'section': 'upcoming',
+            'after': response.context['upcoming_next'],
+        }).json()
+        self.assertIn("Town", page['rows'])
+        self.assertIsNone(page['next'])
+
+    def test_availability_matches_sync_view(self):
+        """ The async availability lookup returns the same seats. """
+        Booking.objects.create(
+            user=self.user,
+            restaurant=self.restaurant,
+            booking_date=self.booking_date,
+            time_slot=810,
+            number_of_people=3,
+        )
+        data = self.client.get(
+            reverse('availability', args=['test-bistro'])
+        ).json()
+        remaining, largest = slot_availability(
+            self.restaurant, self.booking_date, self.booking_date
+        )
+        day = self.booking_date.isoformat()
+        self.assertEqual(
+            data['availability'][day],
+            {str(slot): seats
+             for slot, seats in remaining[self.booking_date].items()}
+        )
+        self.assertEqual(
+            data['largest_party'][day],
+            {str(slot): people
+             for slot, people in largest[self.booking_date].items()}
+        )
+
+    def test_restaurant_detail(self):
+        """ Restaurant pages render and are cached for anonymous users. """
+        response = self.client.get(
+            reverse('restaurant_detail', args=['test-bistro'])
+        )
+        self.assertContains(response, "Logout")
+        self.client.logout()
+        self.client.get(reverse('restaurant_detail', args=['test-bistro']))
+        with self.assertNumQueries(0):
+            response = self.client.get(
+                reverse('restaurant_detail', args=['test-bistro'])
+            )
+        self.assertContains(response, "Test place")
+        self.assertEqual(self.client.get(
+            reverse('restaurant_detail', args=['nowhere'])
+        ).status_code, 404)
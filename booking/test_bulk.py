@@ -0,0 +1,248 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from django.test import TestCase
+from django.urls import reverse
+from django.db import connection
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth.models import User
+from restaurant.models import Restaurant, Table
+from .bulk import export_bookings, import_bookings, read_rows
+from .models import Booking, SlotOccupancy
+from datetime import date, timedelta
+
+
+class TestBookingImport(TestCase):
+    """ Tests for importing bookings in batches. """
+
+    def setUp(self):
+        self.restaurant = Restaurant.objects.create(
+            name="Test Bistro",
+            slug="test-bistro",
+            address="123 Street",
+            city="Town",
+            phone_number="123456789",
+            online_capacity=6,
+        )
+        self.users = [
+            User.objects.create_user(username=f"diner{i}") for i in range(6)
+        ]
+        self.day = (date.today() + timedelta(days=3)).isoformat()
+
+    def csv(self, *rows):
+        lines = ["user,restaurant,booking_date,time_slot,number_of_people,"
+                 "status,special_requests"]
+        lines += [",".join(str(value) for value in row) for row in rows]
+        return list(read_rows(StringIO("\n".join(lines) + "\n"), 'csv'))
+
+    def test_valid_rows_are_created_with_ledger(self):
+        """ Valid rows are inserted and their seats added to the ledger. """
+        result = import_bookings(self.csv(
+            ("diner0", "test-bistro", self.day, 720, 2, 1, "Window"),
+            ("diner1", "test-bistro", self.day, 720, 3, "", ""),
+            ("diner2", "test-bistro", self.day, 810, 2, 2, ""),
+        ))
+        self.assertEqual(result.created, 3)
+        self.assertEqual(result.rejected, 0)
+        self.assertEqual(Booking.objects.count(), 3)
+        slot = SlotOccupancy.objects.get(time_slot=720)
+        self.assertEqual(slot.seats, 5)
+        self.assertFalse(SlotOccupancy.objects.filter(time_slot=810).exists())
+
+    def test_invalid_rows_are_rejected_with_line_numbers(self):
+        """ Rows breaking a booking rule are reported, the rest imported. """
+        past = (date.today() - timedelta(days=1)).isoformat()
+        Booking.objects.create(
+            user=self.users[3], restaurant=self.restaurant,
+            booking_date=date.fromisoformat(self.day), time_slot=1080,
+            number_of_people=1,
+        )
+        result = import_bookings(self.csv(
+            ("diner0", "test-bistro", self.day, 720, 2, 1, ""),
+            ("nobody", "test-bistro", self.day, 720, 2, 1, ""),
+            ("diner1", "nowhere", self.day, 720, 2, 1, ""),
+            ("diner1", "test-bistro", past, 720, 2, 1, ""),
+            ("diner1", "test-bistro", self.day, 725, 2, 1, ""),
+            ("diner1", "test-bistro", self.day, 720, 9, 1, ""),
+            ("diner0", "test-bistro", self.day, 720, 1, 1, ""),
+            ("diner3", "test-bistro", self.day, 1080, 1, 1, ""),
+        ))
+        self.assertEqual(result.created, 1)
+        self.assertEqual(
+            [line for line, _ in result.errors], [3, 4, 5, 6, 7, 8, 9]
+        )
+        self.assertIn("Unknown user", result.errors[0][1])
+        self.assertIn("Duplicate", result.errors[5][1])
+        self.assertIn("already has", result.errors[6][1])
+
+    def test_capacity_is_checked_across_batches(self):
+        """ Rows that would overfill a slot are rejected in any batch. """
+        rows = self.csv(*[
+            (f"diner{i}", "test-bistro", self.day, 720, 2, 1, "")
+            for i in range(5)
+        ])
+        result = import_bookings(rows, batch_size=2)
+        self.assertEqual(result.created, 3)
+        self.assertEqual(result.rejected, 2)
+        self.assertEqual(SlotOccupancy.objects.get(time_slot=720).seats, 6)
+
+    def test_dry_run_saves_nothing(self):
+        """ A dry run counts the valid rows without writing them. """
+        result = import_bookings(self.csv(
+            ("diner0", "test-bistro", self.day, 720, 2, 1, ""),
+        ), dry_run=True)
+        self.assertEqual(result.created, 1)
+        self.assertFalse(Booking.objects.exists())
+        self.assertFalse(SlotOccupancy.objects.exists())
+
+    def test_query_count_does_not_grow_with_rows(self):
+        """ A batch runs the same number of queries for 1 or 5 rows. """
+        counts = []
+        for slot, users in ((900, self.users[:1]), (1080, self.users[1:])):
+            rows = self.csv(*[
+                (user.username, "test-bistro", self.day, slot, 1, 1, "")
+                for user in users
+            ])
+            with CaptureQueriesContext(connection) as queries:
+                import_bookings(rows)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_imported_bookings_are_seated(self):
+        """
+        Imported confirmed bookings are seated at free tables, as saved
+        bookings are; a party no table fits is left for staff.
+        """
+        for name, seats in (('A', 4), ('B', 2)):
+            Table.objects.create(restaurant=self.restaurant, name=name,
+                                 seats=seats)
+        result = import_bookings(self.csv(
+            ("diner0", "test-bistro", self.day, 720, 3, 1, ""),
+            ("diner1", "test-bistro", self.day, 720, 2, 1, ""),
+            ("diner2", "test-bistro", self.day, 810, 6, 1, ""),
+        ))
+        self.assertEqual(result.created, 3)
+        seated = {
+            booking.user.username: {t.name for t in booking.tables.all()}
+            for booking in Booking.objects.all()
+        }
+        self.assertEqual(seated, {'diner0': {'A'}, 'diner1': {'B'},
+                                  'diner2': set()})
+
+    def test_jsonl_rows(self):
+        """ JSONL lines are read one object per line. """
+        stream = StringIO(
+            json.dumps({"user": "diner0", "restaurant": "test-bistro",
+                        "booking_date": self.day, "time_slot": 720,
+                        "number_of_people": 2}) + "\n\nnot json\n"
+        )
+        result = import_bookings(read_rows(stream, 'jsonl'))
+        self.assertEqual(result.created, 1)
+        self.assertEqual(result.errors, [(3, "Not a JSON object.")])
+
+    def test_import_command(self):
+        """ The command imports a file and reports rejected rows. """
+        with tempfile.NamedTemporaryFile(
+            'w', suffix='.csv', delete=False
+        ) as handle:
+            handle.write(
+                "user,restaurant,booking_date,time_slot,number_of_people\n"
+                f"diner0,test-bistro,{self.day},720,2\n"
+                f"nobody,test-bistro,{self.day},720,2\n"
+            )
+        self.addCleanup(os.remove, handle.name)
+        out, err = StringIO(), StringIO()
+        call_command('import_bookings', handle.name, stdout=out, stderr=err)
+        self.assertIn("Imported 1 bookings; rejected 1 rows.", out.getvalue())
+        self.assertIn("Line 3: Unknown user 'nobody'.", err.getvalue())
+
+    def test_unreadable_file_is_reported(self):
+        """
+        A file that is not UTF-8 stops the command with an error and is
+        refused by the admin import page.
+        """
+        content = (
+            "user,restaurant,booking_date,time_slot,number_of_people\n"
+            f"Andr\xe9,test-bistro,{self.day},720,2\n"
+        ).encode('latin-1')
+        with tempfile.NamedTemporaryFile(
+            suffix='.csv', delete=False
+        ) as handle:
+            handle.write(content)
+        self.addCleanup(os.remove, handle.name)
+        with self.assertRaisesMessage(CommandError, "not UTF-8 text"):
+            call_command('import_bookings', handle.name, '--dry-run',
+                         stdout=StringIO())
+
+        self.client.force_login(
+            User.objects.create_superuser(username="admin")
+        )
+        response = self.client.post(
+            reverse('admin:booking_booking_import'),
+            {'file': SimpleUploadedFile("bookings.csv", content)},
+        )
+        self.assertContains(response, "The file is not UTF-8 text.")
+
+
+class TestBookingExport(TestCase):
+    """ Tests for streaming bookings out of the database. """
+
+    def setUp(self):
+        self.restaurant = Restaurant.objects.create(
+            name="Test Bistro",
+            slug="test-bistro",
+            address="123 Street",
+            city="Town",
+            phone_number="123456789",
+        )
+        self.user = User.objects.create_user(username="diner")
+        self.day = date.today() + timedelta(days=3)
+        Booking.objects.create(
+            user=self.user, restaurant=self.restaurant,
+            booking_date=self.day, time_slot=720, number_of_people=2,
+            special_requests="Window, please",
+        )
+
+    def test_csv_export_can_be_imported(self):
+        """ Exported CSV has the import columns and round-trips. """
+        text = "".join(export_bookings(Booking.objects.all(), 'csv'))
+        self.assertEqual(text.splitlines()[1],
+                         f'diner,test-bistro,{self.day},720,2,1,'
+                         f'"Window, please"')
+        Booking.objects.all().delete()
+        result = import_bookings(read_rows(StringIO(text), 'csv'))
+        self.assertEqual(result.created, 1)
+        self.assertEqual(Booking.objects.get().special_requests,
+                         "Window, please")
+
+    def test_jsonl_export(self):
+        """ JSONL export writes one object per booking. """
+        text = "".join(export_bookings(Booking.objects.all(), 'jsonl'))
+        self.assertEqual(json.loads(text)["booking_date"],
+                         self.day.isoformat())
+
+    def test_admin_export_and_import(self):
+        """ The admin action streams CSV and the import page reads it. """
+        admin = User.objects.create_superuser(username="admin",
+                                              password="password")
+        self.client.force_login(admin)
+        url = reverse('admin:booking_booking_changelist')
+        response = self.client.post(url, {
+            'action': 'export_csv',
+            '_selected_action': Booking.objects.values_list('pk', flat=True),
+        })
+        self.assertTrue(response.streaming)
+        content = b"".join(response.streaming_content)
+        self.assertIn(b"diner,test-bistro", content)
+
+        Booking.objects.all().delete()
+        response = self.client.post(
+            reverse('admin:booking_booking_import'),
+            {'file': SimpleUploadedFile("bookings.csv", content)},
+        )
+        self.assertRedirects(response, url)
+        self.assertEqual(Booking.objects.count(), 1)
@@ -0,0 +1,166 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from django.test import TestCase
+from django.db import connection
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.contrib.auth.models import User
+from django.http import HttpResponse
+from restaurant.models import Restaurant
+from .management.commands import benchmark_flow
+from .models import Booking, SlotOccupancy
+from datetime import date, timedelta
+
+
+class TestCompleteBookingsCommand(TestCase):
+    """ Tests for the complete_bookings management command. """
+
+    def setUp(self):
+        self.restaurant = Restaurant.objects.create(
+            name="Test Bistro",
+            slug="test-bistro",
+            address="123 Street",
+            city="Town",
+            phone_number="123456789",
+        )
+        self.past_date = date.today() - timedelta(days=1)
+        self.future_date = date.today() + timedelta(days=1)
+
+        self.past_bookings = []
+        for i in range(5):
+            user = User.objects.create_user(username=f"diner{i}")
+            self.past_bookings.append(Booking.objects.create(
+                user=user,
+                restaurant=self.restaurant,
+                booking_date=self.past_date,
+                time_slot=720,
+                number_of_people=2,
+            ))
+        self.future_booking = Booking.objects.create(
+            user=user,
+            restaurant=self.restaurant,
+            booking_date=self.future_date,
+            time_slot=720,
+            number_of_people=2,
+        )
+        self.cancelled_booking = Booking.objects.create(
+            user=user,
+            restaurant=self.restaurant,
+            booking_date=self.past_date,
+            time_slot=1080,
+            number_of_people=2,
+            status=2,
+        )
+
+    def test_marks_past_confirmed_bookings_completed(self):
+        """
+        Past confirmed bookings of every user are completed in batches;
+        future and cancelled bookings are left alone.
+        """
+        out = StringIO()
+        call_command('complete_bookings', '--batch-size', '2', stdout=out)
+
+        self.assertIn("Marked 5 bookings as completed", out.getvalue())
+        for booking in self.past_bookings:
+            booking.refresh_from_db()
+            self.assertEqual(booking.status, 3)
+        self.future_booking.refresh_from_db()
+        self.assertEqual(self.future_booking.status, 1)
+        self.cancelled_booking.refresh_from_db()
+        self.assertEqual(self.cancelled_booking.status, 2)
+
+    def test_prunes_past_slots_from_ledger(self):
+        """Ledger rows for past dates are removed, future ones kept."""
+        call_command('complete_bookings', stdout=StringIO())
+
+        self.assertFalse(SlotOccupancy.objects.filter(
+            booking_date=self.past_date
+        ).exists())
+        self.assertEqual(SlotOccupancy.objects.get(
+            booking_date=self.future_date
+        ).seats, 2)
+
+
+class TestBenchmarkCommands(TestCase):
+    """ Tests for the seed_bookings and benchmark_indexes commands. """
+
+    def test_seed_and_benchmark_indexes(self):
+        """
+        Seeded bookings can be benchmarked with and without indexes, and
+        the indexes are still in place afterwards.
+        """
+        call_command('seed_bookings', '--bookings', '300',
+                     '--restaurants', '2', '--users', '20',
+                     stdout=StringIO())
+        self.assertGreater(Booking.objects.count(), 250)
+        self.assertTrue(SlotOccupancy.objects.exists())
+
+        out = StringIO()
+        call_command('benchmark_indexes', '--repeat', '2', stdout=out)
+        self.assertIn("slot_occupancy_sum", out.getvalue())
+        self.assertIn("without_indexes", out.getvalue())
+
+        with connection.cursor() as cursor:
+            indexes = connection.introspection.get_constraints(
+                cursor, Booking._meta.db_table
+            )
+        self.assertIn("booking_slot_confirmed_idx", indexes)
+
+    def test_benchmark_connections_needs_postgresql(self):
+        """ The connection benchmark refuses to run without PostgreSQL. """
+        with self.assertRaises(CommandError):
+            call_command('benchmark_connections', stdout=StringIO())
+
+    def test_benchmark_flow_and_baseline(self):
+        """
+        The booking pages are measured, nothing is left behind, and a
+        baseline with fewer queries fails the check.
+        """
+        call_command('seed_bookings', '--bookings', '100',
+                     '--restaurants', '2', '--users', '10',
+                     stdout=StringIO())
+        bookings = Booking.objects.count()
+        handle, output = tempfile.mkstemp(suffix='.json')
+        os.close(handle)
+        self.addCleanup(os.remove, output)
+
+        call_command('benchmark_flow', '--repeat', '3', '--output', output,
+                     stdout=StringIO())
+        with open(output) as file:
+            results = json.load(file)
+        self.assertEqual(Booking.objects.count(), bookings)
+        self.assertFalse(Restaurant.objects.filter(slug='bench-flow'))
+        for name, measured in results['endpoints'].items():
+            self.assertLess(measured['status'][0], 400, name)
+            self.assertGreater(measured['queries'], 0, name)
+        self.assertEqual(results['endpoints']['create_booking']['status'],
+                         [302])
+
+        call_command('benchmark_flow', '--repeat', '3', '--baseline',
+                     output, '--tolerance', '100', stdout=StringIO())
+        results['endpoints']['my_bookings']['queries'] = 1
+        with open(output, 'w') as file:
+            json.dump(results, file)
+        with self.assertRaisesMessage(CommandError, "my_bookings"):
+            call_command('benchmark_flow', '--repeat', '3', '--baseline',
+                         output, stdout=StringIO())
+
+        results['endpoints']['create_booking']['status'] = [200]
+        with open(output, 'w') as file:
+            json.dump(results, file)
+        with self.assertRaisesMessage(CommandError,
+                                      "create_booking: status [302]"):
+            call_command('benchmark_flow', '--repeat', '3', '--baseline',
+                         output, '--tolerance', '100', stdout=StringIO())
+
+    def test_benchmark_flow_fails_on_unexpected_status(self):
+        """ A page answering with another status fails the benchmark. """
+        with self.assertRaisesMessage(
+            CommandError, "my_bookings: status 500 on request 2"
+        ):
+            benchmark_flow.Command().measure(
+                'my_bookings',
+                lambda i: HttpResponse(status=500 if i else 200), 200, 3
+            )
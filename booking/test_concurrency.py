@@ -0,0 +1,172 @@
+import os
+import threading
+from unittest import skipUnless
+from django.test import TransactionTestCase, Client
+from django.urls import reverse
+from django.db import connection
+from django.db.models import Sum
+from django.contrib.auth.models import User
+from restaurant.models import Restaurant
+from .models import Booking, SlotOccupancy
+from datetime import date, timedelta
+
+
+@skipUnless(connection.vendor == 'postgresql'
+            or os.environ.get("TEST_DATABASE_URL"),
+            "Needs PostgreSQL: set TEST_DATABASE_URL to run it.")
+class TestConcurrentBookings(TransactionTestCase):
+    """
+    Stress tests for the seat ledger: many requests book, cancel or edit
+    in the same slot at the same time.
+
+    Only run against PostgreSQL, whose row locks and concurrent writers
+    are what the ledger relies on; SQLite would serialise the requests
+    and never exercise the races. Run them with ``TEST_DATABASE_URL``
+    pointing at a PostgreSQL server, as the CI workflow does; given
+    another database there they fail instead of passing vacuously.
+    """
+    threads = 20
+    requests_per_thread = 10
+    capacity = 50
+
+    @classmethod
+    def setUpClass(cls):
+        if connection.vendor != 'postgresql':
+            raise AssertionError(
+                f"TEST_DATABASE_URL must name a PostgreSQL database, not "
+                f"{connection.vendor}."
+            )
+        super().setUpClass()
+
+    def setUp(self):
+        self.restaurant = Restaurant.objects.create(
+            name="Test Bistro",
+            slug="test-bistro",
+            address="123 Street",
+            city="Town",
+            phone_number="123456789",
+            online_capacity=self.capacity,
+        )
+        User.objects.bulk_create(
+            User(username=f"diner{i}")
+            for i in range(self.threads * self.requests_per_thread)
+        )
+        self.users = list(User.objects.order_by('pk'))
+        self.url = reverse('create_booking', args=[self.restaurant.slug])
+        self.booking_date = date.today() + timedelta(days=1)
+        self.data = {
+            'booking_date': self.booking_date,
+            'time_slot': 1170,
+            'number_of_people': 3,
+        }
+
+    def run_threads(self, target, arguments):
+        """
+        Run ``target(*arguments[i], barrier)`` in one thread per item,
+        started together, and return the exceptions they raised.
+        """
+        barrier = threading.Barrier(len(arguments))
+        errors = []
+
+        def run(*args):
+            try:
+                target(*args, barrier)
+            except Exception as error:
+                errors.append(error)
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=run, args=args)
+                   for args in arguments]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        return errors
+
+    def booked_seats(self):
+        return Booking.objects.filter(
+            restaurant=self.restaurant, status=1
+        ).aggregate(Sum('number_of_people'))['number_of_people__sum'] or 0
+
+    def ledger_seats(self):
+        return SlotOccupancy.objects.get(restaurant=self.restaurant).seats
+
+    def book(self, user, people, time_slot=1170):
+        return Booking.objects.create(
+            user=user,
+            restaurant=self.restaurant,
+            booking_date=self.booking_date,
+            time_slot=time_slot,
+            number_of_people=people,
+        )
+
+    def test_concurrent_posts_never_overbook(self):
+        """
+        Hundreds of parallel POSTs fill the slot exactly to its online
+        capacity, each getting a redirect or the form back, and the
+        ledger matches the confirmed bookings afterwards.
+        """
+        statuses = []
+
+        def submit(users, barrier):
+            client = Client()
+            barrier.wait()
+            for user in users:
+                client.force_login(user)
+                statuses.append(client.post(self.url, self.data).status_code)
+
+        errors = self.run_threads(submit, [
+            (self.users[i::self.threads],) for i in range(self.threads)
+        ])
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(statuses), len(self.users))
+        self.assertEqual(set(statuses), {200, 302})
+        party = self.data['number_of_people']
+        self.assertEqual(self.booked_seats(),
+                         self.capacity - self.capacity % party)
+        self.assertEqual(self.ledger_seats(), self.booked_seats())
+
+    def test_concurrent_cancels_release_seats_once(self):
+        """
+        Instances of one booking loaded before any of them is saved all
+        cancel it at once; its seats are released a single time.
+        """
+        booking = self.book(self.users[0], 4)
+        self.book(self.users[1], 4)
+
+        def cancel(instance, barrier):
+            barrier.wait()
+            instance.status = 2
+            instance.save()
+
+        errors = self.run_threads(cancel, [
+            (Booking.objects.get(pk=booking.pk),)
+            for _ in range(self.threads)
+        ])
+
+        self.assertEqual(errors, [])
+        self.assertEqual(self.booked_seats(), 4)
+        self.assertEqual(self.ledger_seats(), 4)
+
+    def test_concurrent_edits_keep_the_ledger(self):
+        """
+        Stale instances of one booking saved at once with different party
+        sizes leave the ledger holding the size that was stored last.
+        """
+        booking = self.book(self.users[0], 2)
+        self.book(self.users[1], 4)
+
+        def edit(instance, people, barrier):
+            barrier.wait()
+            instance.number_of_people = people
+            instance.save()
+
+        errors = self.run_threads(edit, [
+            (Booking.objects.get(pk=booking.pk), 1 + i % 6)
+            for i in range(self.threads)
+        ])
+
+        self.assertEqual(errors, [])
+        self.assertEqual(self.ledger_seats(), self.booked_seats())
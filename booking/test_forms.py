@@ -8,7 +8,7 @@ class TestBookingForm(TestCase):
         tomorrow = date.today() + timedelta(days=1)
         booking_form = BookingForm({
             'booking_date': tomorrow,
-            'time_slot': '12:00 PM - 1:30 PM',
+            'time_slot': 720,
             'number_of_people': 3,
             'special_requests': 'Birthday party'
             })
@@ -18,7 +18,7 @@ class TestBookingForm(TestCase):
         tomorrow = date.today() + timedelta(days=1)
         booking_form = BookingForm({
             'booking_date': tomorrow,
-            'time_slot': '12:00 PM - 1:30 PM',
+            'time_slot': 720,
             'number_of_people': 6,
             'special_requests': ''
         })
@@ -27,7 +27,7 @@ class TestBookingForm(TestCase):
     def test_form_is_invalid_with_past_booking_date(self):
         booking_form = BookingForm({
             'booking_date': date.today(),
-            'time_slot': '12:00 PM - 1:30 PM',
+            'time_slot': 720,
             'number_of_people': 2,
             'special_requests': ''
             })
@@ -37,7 +37,7 @@ class TestBookingForm(TestCase):
         day_after = date.today() + timedelta(days=181)
         booking_form = BookingForm({
             'booking_date': day_after,
-            'time_slot': '12:00 PM - 1:30 PM',
+            'time_slot': 720,
             'number_of_people': 4,
             'special_requests': ''
             })
@@ -47,7 +47,7 @@ class TestBookingForm(TestCase):
         last_day = date.today() + timedelta(days=180)
         booking_form = BookingForm({
             'booking_date': last_day,
-            'time_slot': '12:00 PM - 1:30 PM',
+            'time_slot': 720,
             'number_of_people': 5,
             'special_requests': ''
             })
@@ -57,7 +57,7 @@ class TestBookingForm(TestCase):
         last_day = date.today() + timedelta(days=180)
         booking_form = BookingForm({
             'booking_date': last_day,
-            'time_slot': '12:00 PM - 1:30 PM',
+            'time_slot': 720,
             'number_of_people': 0,
             'special_requests': ''
             })
@@ -67,7 +67,7 @@ class TestBookingForm(TestCase):
         last_day = date.today() + timedelta(days=180)
         booking_form = BookingForm({
             'booking_date': last_day,
-            'time_slot': '12:00 PM - 1:30 PM',
+            'time_slot': 720,
             'number_of_people': 7,
             'special_requests': ''
             })
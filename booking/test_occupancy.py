@@ -0,0 +1,197 @@
+from io import StringIO
+from django.test import TestCase
+from django.core.management import call_command
+from django.contrib.auth.models import User
+from restaurant.models import Restaurant
+from .models import Booking, CapacityExceeded, SlotOccupancy
+from .views import get_current_bookings
+from datetime import date, timedelta
+
+
+class TestSlotOccupancyLedger(TestCase):
+    """ Tests that bookings keep the SlotOccupancy ledger up to date. """
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser",
+            password="password"
+        )
+        self.restaurant = Restaurant.objects.create(
+            name="Test Bistro",
+            slug="test-bistro",
+            address="123 Street",
+            city="Town",
+            phone_number="123456789",
+            online_capacity=10,
+        )
+        self.booking_date = date.today() + timedelta(days=1)
+        self.booking = Booking.objects.create(
+            user=self.user,
+            restaurant=self.restaurant,
+            booking_date=self.booking_date,
+            time_slot=720,
+            number_of_people=3,
+        )
+
+    def seats(self, time_slot=720):
+        return get_current_bookings(
+            self.restaurant, self.booking_date, time_slot
+        )
+
+    def test_create_adds_seats(self):
+        """Creating a confirmed booking adds its party to the ledger."""
+        self.assertEqual(self.seats(), 3)
+        self.assertEqual(SlotOccupancy.objects.get().seats, 3)
+
+    def test_edit_updates_seats(self):
+        """Changing the party size adjusts the ledger by the difference."""
+        self.booking.number_of_people = 5
+        self.booking.save()
+        self.assertEqual(self.seats(), 5)
+
+    def test_cancel_releases_seats(self):
+        """Cancelling a booking releases its seats."""
+        self.booking.status = 2
+        self.booking.save()
+        self.assertEqual(self.seats(), 0)
+
+    def test_delete_releases_seats(self):
+        """Deleting a booking, directly or by cascade, releases its seats."""
+        self.booking.delete()
+        self.assertEqual(self.seats(), 0)
+
+        Booking.objects.create(
+            user=self.user,
+            restaurant=self.restaurant,
+            booking_date=self.booking_date,
+            time_slot=720,
+            number_of_people=2,
+        )
+        self.user.delete()
+        self.assertEqual(self.seats(), 0)
+
+    def test_stale_instances_release_seats_once(self):
+        """
+        Cancelling or deleting a booking through an instance loaded
+        before another one cancelled it does not release its seats
+        again.
+        """
+        other = Booking.objects.create(
+            user=User.objects.create_user(username="other"),
+            restaurant=self.restaurant,
+            booking_date=self.booking_date,
+            time_slot=720,
+            number_of_people=4,
+        )
+        first = Booking.objects.get(pk=self.booking.pk)
+        second = Booking.objects.get(pk=self.booking.pk)
+        first.status = 2
+        first.save()
+        second.status = 2
+        second.save()
+        self.assertEqual(self.seats(), 4)
+
+        stale = Booking.objects.get(pk=other.pk)
+        other.number_of_people = 2
+        other.save()
+        stale.number_of_people = 5
+        stale.save()
+        self.assertEqual(self.seats(), 5)
+
+        Booking.objects.get(pk=other.pk).delete()
+        stale.delete()
+        self.assertEqual(self.seats(), 0)
+        self.assertEqual(SlotOccupancy.objects.get().seats, 0)
+
+    def test_moving_slot_transfers_seats(self):
+        """Moving a booking to another slot moves its seats with it."""
+        self.booking.time_slot = 900
+        self.booking.save()
+        self.assertEqual(self.seats(), 0)
+        self.assertEqual(self.seats(900), 3)
+
+    def test_save_with_capacity_rejects_overbooking(self):
+        """
+        Saving against a capacity raises CapacityExceeded when the slot
+        is full and leaves both the booking and the ledger unchanged.
+        """
+        other = User.objects.create_user(username="other")
+        booking = Booking(
+            user=other,
+            restaurant=self.restaurant,
+            booking_date=self.booking_date,
+            time_slot=720,
+            number_of_people=6,
+        )
+        with self.assertRaises(CapacityExceeded):
+            booking.save(capacity=8)
+        self.assertEqual(Booking.objects.count(), 1)
+        self.assertEqual(self.seats(), 3)
+
+        booking.save(capacity=9)
+        self.assertEqual(self.seats(), 9)
+
+    def test_exclude_uses_stored_party_size(self):
+        """
+        Excluding a booking subtracts the seats it holds in the database,
+        not unsaved changes on the instance.
+        """
+        self.booking.number_of_people = 6
+        self.assertEqual(
+            get_current_bookings(self.restaurant,
+                                 self.booking_date,
+                                 720,
+                                 exclude_booking=self.booking),
+            0
+        )
+
+
+class TestRebuildOccupancyCommand(TestCase):
+    """ Tests for the rebuild_occupancy management command. """
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser",
+            password="password"
+        )
+        self.restaurant = Restaurant.objects.create(
+            name="Test Bistro",
+            slug="test-bistro",
+            address="123 Street",
+            city="Town",
+            phone_number="123456789",
+        )
+        self.booking_date = date.today() + timedelta(days=1)
+        Booking.objects.create(
+            user=self.user,
+            restaurant=self.restaurant,
+            booking_date=self.booking_date,
+            time_slot=720,
+            number_of_people=4,
+        )
+
+    def test_rebuild_reconciles_drifted_ledger(self):
+        """Wrong, missing and stale rows are corrected from bookings."""
+        SlotOccupancy.objects.all().delete()
+        SlotOccupancy.objects.create(
+            restaurant=self.restaurant,
+            booking_date=self.booking_date,
+            time_slot=1080,
+            seats=7,
+        )
+        out = StringIO()
+        call_command('rebuild_occupancy', stdout=out)
+
+        self.assertIn("1 created, 0 corrected, 1 removed", out.getvalue())
+        slot = SlotOccupancy.objects.get()
+        self.assertEqual(slot.time_slot, 720)
+        self.assertEqual(slot.seats, 4)
+
+    def test_dry_run_changes_nothing(self):
+        """--dry-run reports differences but leaves the ledger alone."""
+        SlotOccupancy.objects.update(seats=1)
+        out = StringIO()
+        call_command('rebuild_occupancy', '--dry-run', stdout=out)
+
+        self.assertIn("Would reconcile", out.getvalue())
+        self.assertEqual(SlotOccupancy.objects.get().seats, 1)
@@ -0,0 +1,224 @@
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from django.contrib.auth.models import User
+from restaurant.models import Restaurant, Table
+from .models import Booking, TablesUnavailable, WaitlistEntry
+from .tables import SlotPlan, seatings
+from datetime import date, timedelta
+
+
+class TestSlotPlan(SimpleTestCase):
+    """ Tests for seating parties at tables, without the database. """
+
+    def test_seatings_join_tables_of_a_group(self):
+        """ Only tables sharing a join group are joined, up to three. """
+        # Four tables of 2 along the wall and one table of 4.
+        options = seatings([(2, 'wall', 4), (4, '', 1)])
+        self.assertEqual(options, [
+            (2, ((0, 1),)),
+            (4, ((1, 1),)),
+            (4, ((0, 2),)),
+            (6, ((0, 3),)),
+        ])
+
+    def test_full_evening_is_seated(self):
+        """ A slot filled close to its seats is seated without overlap. """
+        tables = [(i, seats, f"g{i % 4}") for i, seats in enumerate(
+            [2] * 12 + [4] * 10 + [6] * 4, start=1
+        )]
+        parties = [6, 5, 5, 4, 4, 4, 4, 3, 3, 3, 3, 2, 2, 2, 2, 2, 2, 2,
+                   2, 2, 1, 1]
+        plan = SlotPlan(tables, {})
+        for key, people in enumerate(parties):
+            self.assertTrue(plan.seat(key, people))
+        self.assertEqual(len(plan.seated), len(parties))
+        used = [pk for ids in plan.seated.values() for pk in ids]
+        self.assertEqual(len(used), len(set(used)))
+        for key, ids in plan.seated.items():
+            self.assertGreaterEqual(
+                sum(plan.seats[pk] for pk in ids), parties[key]
+            )
+
+    def test_impossible_party_leaves_plan_unchanged(self):
+        """ A party that cannot be seated changes nothing. """
+        plan = SlotPlan([(1, 4, ''), (2, 2, '')], {7: (3, [1])})
+        self.assertFalse(plan.seat(8, 4))
+        self.assertEqual(plan.seated, {7: (1,)})
+        self.assertEqual(plan.changes(), {})
+
+
+class TestTableAllocation(TestCase):
+    """ Tests for seating bookings at the tables of a restaurant. """
+
+    def setUp(self):
+        self.restaurant = Restaurant.objects.create(
+            name="Test Bistro",
+            slug="test-bistro",
+            address="123 Street",
+            city="Town",
+            phone_number="123456789",
+            online_capacity=10,
+        )
+        self.users = [
+            User.objects.create_user(username=f"diner{i}") for i in range(3)
+        ]
+        self.booking_date = date.today() + timedelta(days=2)
+
+    def add_tables(self, *tables):
+        return [
+            Table.objects.create(restaurant=self.restaurant, name=name,
+                                 seats=seats, join_group=group)
+            for name, seats, group in tables
+        ]
+
+    def book(self, user, people):
+        booking = Booking(
+            user=user,
+            restaurant=self.restaurant,
+            booking_date=self.booking_date,
+            time_slot=720,
+            number_of_people=people,
+        )
+        booking.save(capacity=self.restaurant.online_capacity)
+        return booking
+
+    def tables_of(self, booking):
+        return {table.name for table in booking.tables.all()}
+
+    def test_parties_cannot_share_scattered_seats(self):
+        """
+        Ten free seats over tables of 2 do not take two parties of 5
+        when only three tables can be joined.
+        """
+        self.add_tables(('W1', 2, 'wall'), ('W2', 2, 'wall'),
+                        ('W3', 2, 'wall'), ('W4', 2, 'wall'), ('D', 2, ''))
+        first = self.book(self.users[0], 5)
+        self.assertEqual(self.tables_of(first), {'W1', 'W2', 'W3'})
+
+        self.client.force_login(self.users[1])
+        response = self.client.post(
+            reverse('create_booking', args=['test-bistro']),
+            {
+                'booking_date': self.booking_date,
+                'time_slot': 720,
+                'number_of_people': 5,
+            }
+        )
+        self.assertContains(response, "capacity limits")
+        self.assertEqual(Booking.objects.count(), 1)
+
+    def test_alternatives_need_a_table(self):
+        """
+        A party refused for want of a table is not offered the same slot
+        again, only slots where it can be seated.
+        """
+        self.add_tables(('A', 4, ''), ('B', 2, ''))
+        self.book(self.users[0], 4)
+        self.client.force_login(self.users[1])
+        response = self.client.post(
+            reverse('create_booking', args=['test-bistro']),
+            {
+                'booking_date': self.booking_date,
+                'time_slot': 720,
+                'number_of_people': 4,
+            }
+        )
+        offered = [
+            (slot['booking_date'], slot['time_slot'])
+            for slot in response.context['form'].alternatives
+        ]
+        self.assertTrue(offered)
+        self.assertNotIn((self.booking_date, 720), offered)
+
+    def test_availability_needs_a_table(self):
+        """
+        The calendar gives the largest party a free table can seat, and
+        no seats once no table is free, whatever the online capacity.
+        """
+        self.add_tables(('A', 4, ''), ('B', 2, ''))
+        url = reverse('availability', args=['test-bistro'])
+        params = {'from': self.booking_date, 'to': self.booking_date}
+        day = self.booking_date.isoformat()
+
+        self.book(self.users[0], 4)
+        data = self.client.get(url, params).json()
+        self.assertEqual(data['availability'][day]['720'], 6)
+        self.assertEqual(data['largest_party'][day]['720'], 2)
+        self.assertEqual(data['largest_party'][day]['810'], 4)
+
+        self.book(self.users[1], 2)
+        data = self.client.get(url, params).json()
+        self.assertEqual(data['availability'][day]['720'], 0)
+        self.assertEqual(data['largest_party'][day]['720'], 0)
+
+    def test_parties_are_moved_to_make_room(self):
+        """ A party that shrank moves to a smaller table for a larger one. """
+        self.add_tables(('A', 4, ''), ('B', 6, ''))
+        first = self.book(self.users[0], 6)
+        first.number_of_people = 2
+        first.save(capacity=10)
+        self.assertEqual(self.tables_of(first), {'B'})
+
+        second = self.book(self.users[1], 6)
+        self.assertEqual(self.tables_of(second), {'B'})
+        self.assertEqual(self.tables_of(first), {'A'})
+
+    def test_edit_without_table_is_rejected(self):
+        """ Growing a party past every free table is refused. """
+        self.add_tables(('A', 4, ''), ('B', 4, ''))
+        booking = self.book(self.users[0], 4)
+        self.book(self.users[1], 4)
+        self.client.force_login(self.users[0])
+        response = self.client.post(
+            reverse('edit_booking', args=[booking.pk]),
+            {'number_of_people': 5}, follow=True
+        )
+        self.assertContains(response, "no table free for 5 guests")
+        booking.refresh_from_db()
+        self.assertEqual(booking.number_of_people, 4)
+
+    def test_staff_bookings_are_saved_without_tables(self):
+        """
+        Without a capacity check a party that fits no table is kept, and
+        left for staff to seat when others are.
+        """
+        self.add_tables(('A', 4, ''))
+        booking = Booking.objects.create(
+            user=self.users[0],
+            restaurant=self.restaurant,
+            booking_date=self.booking_date,
+            time_slot=720,
+            number_of_people=6,
+        )
+        self.assertEqual(self.tables_of(booking), set())
+        self.assertEqual(self.tables_of(self.book(self.users[1], 2)), {'A'})
+        with self.assertRaises(TablesUnavailable):
+            self.book(self.users[2], 2)
+
+    def test_cancelling_frees_the_tables(self):
+        """ A cancelled booking no longer holds its tables. """
+        self.add_tables(('A', 4, ''))
+        booking = self.book(self.users[0], 4)
+        booking.status = 2
+        booking.save()
+        self.assertEqual(self.tables_of(booking), set())
+        self.assertEqual(self.tables_of(self.book(self.users[1], 4)), {'A'})
+
+    def test_waitlist_promotion_needs_a_table(self):
+        """ Waiting parties are only booked if a table seats them. """
+        self.add_tables(('A', 4, ''), ('B', 2, ''))
+        first = self.book(self.users[0], 4)
+        too_big = WaitlistEntry.join(self.users[1], self.restaurant,
+                                     self.booking_date, 720, 3)
+        fits = WaitlistEntry.join(self.users[2], self.restaurant,
+                                  self.booking_date, 720, 2)
+        self.assertEqual(
+            WaitlistEntry.promote(self.restaurant.pk, self.booking_date,
+                                  720),
+            [fits]
+        )
+        fits.refresh_from_db()
+        self.assertEqual(self.tables_of(fits.booking), {'B'})
+        too_big.refresh_from_db()
+        self.assertEqual(too_big.status, 1)
+        self.assertEqual(self.tables_of(first), {'A'})
@@ -1,8 +1,14 @@
-from django.test import TestCase
+import re
+from unittest import skipUnless
+from django.test import TestCase, override_settings
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.contrib.auth.models import User
 from restaurant.models import Restaurant
 from booking.models import Booking
+from booking.pagination import encode_cursor, page_queryset
 from datetime import date, timedelta
 from django.contrib.messages import get_messages
 
@@ -45,7 +51,7 @@ class TestCreateBookingView(TestCase):
         """
         data = {
             'booking_date': self.booking_date,
-            'time_slot': '12:00 PM - 1:30 PM',
+            'time_slot': 720,
             'number_of_people': 2,
             'special_requests': 'Birthday'
         }
@@ -70,12 +76,12 @@ class TestCreateBookingView(TestCase):
             user=self.user,
             restaurant=self.restaurant,
             booking_date=self.booking_date,
-            time_slot='12:00 PM - 1:30 PM',
+            time_slot=720,
             number_of_people=3
         )
         data = {
             'booking_date': self.booking_date,
-            'time_slot': '12:00 PM - 1:30 PM',
+            'time_slot': 720,
             'number_of_people': 2,
             'special_requests': ''
         }
@@ -89,18 +95,44 @@ class TestCreateBookingView(TestCase):
             response.context['form'].errors['number_of_people'][0]
         )
 
+    def test_create_booking_over_capacity_offers_alternatives(self):
+        """ A full slot offers the nearest slots with room instead. """
+        Booking.objects.create(
+            user=self.user,
+            restaurant=self.restaurant,
+            booking_date=self.booking_date,
+            time_slot=720,
+            number_of_people=3
+        )
+        response = self.client.post(
+            reverse('create_booking', args=[self.restaurant.slug]),
+            {
+                'booking_date': self.booking_date,
+                'time_slot': 720,
+                'number_of_people': 2,
+            }
+        )
+        alternatives = response.context['form'].alternatives
+        self.assertEqual(len(alternatives), 5)
+        self.assertEqual(
+            [(slot['booking_date'], slot['time_slot'])
+             for slot in alternatives[:2]],
+            [(self.booking_date, 810), (self.booking_date, 900)]
+        )
+        self.assertContains(response, "Book this", count=5)
+
     def test_create_booking_double_booking(self):
         """User cannot book same restaurant/date/time twice."""
         Booking.objects.create(
             user=self.user,
             restaurant=self.restaurant,
             booking_date=self.booking_date,
-            time_slot='12:00 PM - 1:30 PM',
+            time_slot=720,
             number_of_people=2
         )
         data = {
             'booking_date': self.booking_date,
-            'time_slot': '12:00 PM - 1:30 PM',
+            'time_slot': 720,
             'number_of_people': 1
         }
         response = self.client.post(
@@ -119,7 +151,7 @@ class TestCreateBookingView(TestCase):
         """Booking with today and past date should fail."""
         data = {
             'booking_date': date.today(),
-            'time_slot': '12:00 PM - 1:30 PM',
+            'time_slot': 720,
             'number_of_people': 2
         }
         response = self.client.post(
@@ -128,6 +160,28 @@ class TestCreateBookingView(TestCase):
         )
         self.assertFalse(response.context['form'].is_valid())
 
+    def test_create_booking_rejects_slot_not_offered(self):
+        """ Only the restaurant's own time slots can be booked. """
+        self.restaurant.time_slots = [1140]
+        self.restaurant.save()
+        data = {
+            'booking_date': self.booking_date,
+            'time_slot': 720,
+            'number_of_people': 2
+        }
+        response = self.client.post(
+            reverse('create_booking', args=[self.restaurant.slug]),
+            data
+        )
+        self.assertIn('time_slot', response.context['form'].errors)
+
+        data['time_slot'] = 1140
+        response = self.client.post(
+            reverse('create_booking', args=[self.restaurant.slug]),
+            data
+        )
+        self.assertRedirects(response, reverse('my_bookings'))
+
     def test_create_booking_not_logged_in(self):
         """Anonymous users should be redirected to login page."""
         self.client.logout()
@@ -145,7 +199,7 @@ class TestCreateBookingView(TestCase):
             user=self.user,
             restaurant=self.restaurant,
             booking_date=self.booking_date,
-            time_slot='12:00 PM - 1:30 PM',
+            time_slot=720,
             number_of_people=2,
             status=1
         )
@@ -156,7 +210,7 @@ class TestCreateBookingView(TestCase):
             reverse('create_booking', args=[self.restaurant.slug]),
             {
                 'booking_date': self.booking_date,
-                'time_slot': '12:00 PM - 1:30 PM',
+                'time_slot': 720,
                 "number_of_people": 2,
             },
             follow=True
@@ -168,7 +222,7 @@ class TestCreateBookingView(TestCase):
             user=self.user,
             restaurant=self.restaurant,
             booking_date=self.booking_date,
-            time_slot='12:00 PM - 1:30 PM',
+            time_slot=720,
             number_of_people=2,
             status=1
         ).exists()
@@ -203,7 +257,7 @@ class TestMyBookings(TestCase):
             user=self.user,
             restaurant=self.restaurant,
             booking_date=self.future_date,
-            time_slot="12:00 PM - 1:30 PM",
+            time_slot=720,
             number_of_people=2,
             status=1  # Active
         )
@@ -213,7 +267,7 @@ class TestMyBookings(TestCase):
             user=self.user,
             restaurant=self.restaurant,
             booking_date=self.past_date,
-            time_slot="12:00 PM - 1:30 PM",
+            time_slot=720,
             number_of_people=3,
             status=1  # Active initially
         )
@@ -225,13 +279,18 @@ class TestMyBookings(TestCase):
         self.assertTemplateUsed(response, "booking/my_bookings.html")
         self.assertIn("bookings", response.context)
 
-    def test_past_bookings_marked_completed(self):
+    def test_past_bookings_shown_as_completed(self):
         """
-        Past booking should be automatically marked as comleted / status=3.
+        Past booking should be shown as completed / status=3
+        without the page writing to the database.
         """
-        self.client.get(reverse('my_bookings'))
+        response = self.client.get(reverse('my_bookings'))
+        shown = next(b for b in response.context["bookings"]
+                     if b.pk == self.past_booking.pk)
+        self.assertEqual(shown.current_status, 3)
+
         self.past_booking.refresh_from_db()
-        self.assertEqual(self.past_booking.status, 3)
+        self.assertEqual(self.past_booking.status, 1)
 
     def test_future_bookings_remains_active(self):
         """ Future bookings should remain active/ status=1."""
@@ -239,6 +298,21 @@ class TestMyBookings(TestCase):
         self.future_booking.refresh_from_db()
         self.assertEqual(self.future_booking.status, 1)
 
+    def test_bookings_sorted_by_slot_time(self):
+        """ Bookings on the same day are listed in time order. """
+        Booking.objects.create(
+            user=self.user,
+            restaurant=self.restaurant,
+            booking_date=self.future_date,
+            time_slot=810,
+            number_of_people=1,
+            status=1
+        )
+        response = self.client.get(reverse('my_bookings'))
+        slots = [b.time_slot_label for b in response.context["bookings"]
+                 if b.booking_date == self.future_date]
+        self.assertEqual(slots, ["12:00 PM - 1:30 PM", "1:30 PM - 3:00 PM"])
+
     def test_user_only_sees_own_bookings(self):
         """ User should only see their own bookings on dashboard. """
         other_user = User.objects.create_user(
@@ -249,7 +323,7 @@ class TestMyBookings(TestCase):
             user=other_user,
             restaurant=self.restaurant,
             booking_date=self.future_date,
-            time_slot="12:00 PM - 1:30 PM",
+            time_slot=720,
             number_of_people=1,
             status=1
         )
@@ -259,6 +333,81 @@ class TestMyBookings(TestCase):
 
         self.assertTrue(all(b.user == self.user for b in bookings))
 
+    def test_upcoming_and_past_are_split(self):
+        """ Upcoming and past bookings are listed separately. """
+        response = self.client.get(reverse('my_bookings'))
+        self.assertEqual(response.context["upcoming"], [self.future_booking])
+        self.assertEqual(response.context["past"], [self.past_booking])
+        self.assertIsNone(response.context["past_next"])
+
+    def add_past_bookings(self, count):
+        """Create ``count`` more past bookings on earlier days."""
+        for i in range(count):
+            Booking.objects.create(
+                user=self.user,
+                restaurant=self.restaurant,
+                booking_date=self.past_date - timedelta(days=1 + i // 2),
+                time_slot=720 if i % 2 else 810,
+                number_of_people=1,
+            )
+
+    @override_settings(MY_BOOKINGS_PAGE_SIZE=2)
+    def test_load_more_pages_through_history(self):
+        """ Past bookings load page by page, newest first, each once. """
+        self.add_past_bookings(4)
+        response = self.client.get(reverse('my_bookings'))
+        seen = [b.pk for b in response.context["past"]]
+        cursor = response.context["past_next"]
+        while cursor:
+            page = self.client.get(reverse('more_bookings'), {
+                'section': 'past', 'after': cursor,
+            }).json()
+            seen += [int(pk) for pk in
+                     re.findall(r'data-booking-id="(\d+)"', page['rows'])]
+            self.assertEqual(page['cards'].count('card-body'),
+                             page['rows'].count('<tr'))
+            cursor = page['next']
+
+        expected = list(
+            Booking.objects.filter(
+                user=self.user, booking_date__lt=date.today()
+            ).order_by(
+                '-booking_date', '-time_slot', '-pk'
+            ).values_list('pk', flat=True)
+        )
+        self.assertEqual(seen, expected)
+
+    def test_page_queries_do_not_grow_with_history(self):
+        """ The page runs the same number of queries for any history. """
+        def count():
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(reverse('my_bookings'))
+            return len(queries)
+
+        few = count()
+        self.add_past_bookings(30)
+        self.assertEqual(count(), few)
+
+    @skipUnless(connection.vendor == 'sqlite', "Reads SQLite's plan.")
+    def test_later_pages_scan_the_user_index(self):
+        """ A page after a cursor is a range scan of the user's index. """
+        self.add_past_bookings(4)
+        for section, booking in (('upcoming', self.future_booking),
+                                 ('past', self.past_booking)):
+            plan = page_queryset(
+                self.user, section, encode_cursor(booking)
+            ).explain()
+            self.assertIn('booking_user_page_idx', plan)
+            self.assertNotIn('TEMP B-TREE', plan.upper())
+
+    def test_load_more_rejects_bad_parameters(self):
+        """ Unknown sections and malformed cursors are rejected. """
+        url = reverse('more_bookings')
+        self.assertEqual(self.client.get(url, {
+            'section': 'all'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {
+            'section': 'past', 'after': 'yesterday'}).status_code, 400)
+
 
 class TestEditBooking(TestCase):
 
@@ -286,7 +435,7 @@ class TestEditBooking(TestCase):
             user=self.user,
             restaurant=self.restaurant,
             booking_date=self.booking_date,
-            time_slot='12:00 PM - 1:30 PM',
+            time_slot=720,
             number_of_people=2,
             status=1
         )
@@ -328,7 +477,7 @@ class TestEditBooking(TestCase):
             user=other_user,
             restaurant=self.restaurant,
             booking_date=self.booking_date,
-            time_slot='12:00 PM - 1:30 PM',
+            time_slot=720,
             number_of_people=2,
             status=1
         )
@@ -377,7 +526,7 @@ class TestCancelBooking(TestCase):
             user=self.user,
             restaurant=self.restaurant,
             booking_date=self.booking_date,
-            time_slot='12:00 PM - 1:30 PM',
+            time_slot=720,
             number_of_people=2,
             status=1
         )
@@ -408,7 +557,7 @@ class TestCancelBooking(TestCase):
             user=self.other_user,
             restaurant=self.restaurant,
             booking_date=self.booking_date,
-            time_slot="12:00 PM - 1:30 PM",
+            time_slot=720,
             number_of_people=1,
             status=1
         )
@@ -418,3 +567,171 @@ class TestCancelBooking(TestCase):
         other_booking.refresh_from_db()
         self.assertEqual(other_booking.status, 1)
         self.assertEqual(response.status_code, 404)
+
+
+class TestAvailability(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser",
+            password="password"
+        )
+        self.restaurant = Restaurant.objects.create(
+            name="Test Bistro",
+            slug="test-bistro",
+            address="123 Street",
+            city="Town",
+            phone_number="123456789",
+            online_capacity=4
+        )
+        self.booking_date = date.today() + timedelta(days=2)
+        self.booking = Booking.objects.create(
+            user=self.user,
+            restaurant=self.restaurant,
+            booking_date=self.booking_date,
+            time_slot=720,
+            number_of_people=3,
+            status=1
+        )
+        self.url = reverse('availability', args=[self.restaurant.slug])
+        cache.clear()
+
+    def get_day(self, day):
+        response = self.client.get(self.url, {
+            'from': day.isoformat(),
+            'to': day.isoformat(),
+        })
+        self.assertEqual(response.status_code, 200)
+        return response.json()['availability'][day.isoformat()]
+
+    def test_availability_lists_every_slot(self):
+        """ Each date in range lists remaining seats for every slot. """
+        day = self.get_day(self.booking_date)
+        self.assertEqual(len(day), 6)
+        self.assertEqual(day['720'], 1)
+        self.assertEqual(day['1080'], 4)
+
+    def test_availability_defaults_to_booking_window(self):
+        """ Without a range the full 180-day window is returned. """
+        data = self.client.get(self.url).json()
+        self.assertEqual(len(data['availability']), 180)
+        self.assertEqual(
+            data['from'], (date.today() + timedelta(days=1)).isoformat()
+        )
+
+    def test_availability_is_cached(self):
+        """ A repeated lookup only reads the restaurant and its tables. """
+        self.get_day(self.booking_date)
+        with self.assertNumQueries(2):
+            self.get_day(self.booking_date)
+
+    def test_booking_change_invalidates_cache(self):
+        """ Cancelling a booking frees its seats in the next response. """
+        self.get_day(self.booking_date)
+        self.booking.status = 2
+        self.booking.save()
+        day = self.get_day(self.booking_date)
+        self.assertEqual(day['720'], 4)
+
+    def test_availability_invalid_date(self):
+        """ A malformed date returns a 400 error. """
+        response = self.client.get(self.url, {'from': 'tomorrow'})
+        self.assertEqual(response.status_code, 400)
+
+
+class TestFindTable(TestCase):
+    """ Tests for the nearest available slot search. """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="testuser")
+        self.restaurant = Restaurant.objects.create(
+            name="Test Bistro",
+            slug="test-bistro",
+            address="123 Street",
+            city="Town",
+            phone_number="123456789",
+            online_capacity=4,
+            time_slots=[720, 1080],
+        )
+        self.other = Restaurant.objects.create(
+            name="Another Bistro",
+            slug="another-bistro",
+            address="1 Street",
+            city="Town",
+            phone_number="987654321",
+            online_capacity=4,
+            time_slots=[720],
+        )
+        self.day = date.today() + timedelta(days=5)
+        self.url = reverse('find_table')
+
+    def book(self, restaurant, booking_date, time_slot, people=4):
+        Booking.objects.create(
+            user=self.user,
+            restaurant=restaurant,
+            booking_date=booking_date,
+            time_slot=time_slot,
+            number_of_people=people,
+        )
+
+    def search(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return [
+            (slot['restaurant'], slot['booking_date'], slot['time_slot'])
+            for slot in response.json()['slots']
+        ]
+
+    def test_nearest_dates_and_times_first(self):
+        """ Full slots are skipped; the nearest date and time come first. """
+        self.book(self.restaurant, self.day, 720)
+        self.book(self.restaurant, self.day, 1080, people=3)
+        slots = self.search(restaurant='test-bistro', people=2,
+                            date=self.day.isoformat(), time=720, limit=3)
+        after, before = (self.day + timedelta(days=1),
+                         self.day - timedelta(days=1))
+        self.assertEqual(slots, [
+            ('test-bistro', before.isoformat(), 720),
+            ('test-bistro', before.isoformat(), 1080),
+            ('test-bistro', after.isoformat(), 720),
+        ])
+
+    def test_search_across_city(self):
+        """ A city search includes every restaurant in it. """
+        self.book(self.restaurant, self.day, 720)
+        slots = self.search(city='town', people=2, date=self.day.isoformat(),
+                            time=720, days=0)
+        self.assertEqual(slots, [
+            ('another-bistro', self.day.isoformat(), 720),
+            ('test-bistro', self.day.isoformat(), 1080),
+        ])
+
+    def test_single_occupancy_query(self):
+        """
+        All restaurants are read in one query, then from the cache, and
+        their tables in one more.
+        """
+        with self.assertNumQueries(3):
+            self.search(city='Town', people=2)
+        with self.assertNumQueries(2):
+            self.search(city='Town', people=2)
+
+    def test_dates_stay_in_booking_window(self):
+        """ Only bookable dates are returned. """
+        slots = self.search(restaurant='another-bistro', people=1,
+                            date=date.today().isoformat(), days=2)
+        self.assertEqual([slot[1] for slot in slots], [
+            (date.today() + timedelta(days=1)).isoformat(),
+            (date.today() + timedelta(days=2)).isoformat(),
+        ])
+
+    def test_invalid_search(self):
+        """ A missing restaurant, city or party size returns a 400 error. """
+        response = self.client.get(self.url, {'people': 2})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(self.url, {'restaurant': 'nowhere',
+                                              'people': 2})
+        self.assertIn('restaurant', response.json()['errors'])
+        response = self.client.get(self.url, {'city': 'Town'})
+        self.assertIn('people', response.json()['errors'])
@@ -0,0 +1,171 @@
+from unittest import mock
+from django.db import IntegrityError
+from django.test import TestCase
+from django.urls import reverse
+from django.contrib.auth.models import User
+from django.contrib.messages import get_messages
+from restaurant.models import Restaurant
+from .models import Booking, SlotOccupancy, WaitlistEntry
+from datetime import date, timedelta
+
+
+class TestWaitlist(TestCase):
+    """ Tests for joining the waitlist and promoting waiting parties. """
+
+    def setUp(self):
+        self.restaurant = Restaurant.objects.create(
+            name="Test Bistro",
+            slug="test-bistro",
+            address="123 Street",
+            city="Town",
+            phone_number="123456789",
+            online_capacity=6,
+        )
+        self.users = [
+            User.objects.create_user(username=f"diner{i}")
+            for i in range(5)
+        ]
+        self.booking_date = date.today() + timedelta(days=2)
+        self.full = Booking.objects.create(
+            user=self.users[0],
+            restaurant=self.restaurant,
+            booking_date=self.booking_date,
+            time_slot=720,
+            number_of_people=6,
+        )
+
+    def wait(self, user, people, time_slot=720):
+        return WaitlistEntry.join(user, self.restaurant, self.booking_date,
+                                  time_slot, people)
+
+    def seats(self):
+        return SlotOccupancy.objects.get(time_slot=720).seats
+
+    def test_full_slot_joins_waitlist(self):
+        """ A guest who ticks the box joins the queue of a full slot. """
+        self.client.force_login(self.users[1])
+        response = self.client.post(
+            reverse('create_booking', args=['test-bistro']),
+            {
+                'booking_date': self.booking_date,
+                'time_slot': 720,
+                'number_of_people': 2,
+                'join_waitlist': 'on',
+            }
+        )
+        self.assertRedirects(response, reverse('my_bookings'))
+        entry = WaitlistEntry.objects.get()
+        self.assertEqual((entry.user, entry.number_of_people, entry.status),
+                         (self.users[1], 2, 1))
+        message = list(get_messages(response.wsgi_request))[0]
+        self.assertIn("waitlist", str(message))
+
+    def test_full_slot_without_waitlist(self):
+        """ Without the box ticked, the capacity error is shown. """
+        self.client.force_login(self.users[1])
+        response = self.client.post(
+            reverse('create_booking', args=['test-bistro']),
+            {
+                'booking_date': self.booking_date,
+                'time_slot': 720,
+                'number_of_people': 2,
+            }
+        )
+        self.assertContains(response, "capacity limits")
+        self.assertFalse(WaitlistEntry.objects.exists())
+
+    def test_cancellation_promotes_first_fit(self):
+        """
+        Freed seats go to waiting parties in queue order, skipping a
+        party that no longer fits for smaller ones behind it.
+        """
+        first = self.wait(self.users[1], 5)
+        too_big = self.wait(self.users[2], 2)
+        last = self.wait(self.users[3], 1)
+        self.client.force_login(self.users[0])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.get(reverse('cancel_booking', args=[self.full.pk]))
+
+        first.refresh_from_db()
+        too_big.refresh_from_db()
+        last.refresh_from_db()
+        self.assertEqual([first.status, too_big.status, last.status],
+                         [2, 1, 2])
+        self.assertEqual(first.booking.number_of_people, 5)
+        self.assertEqual(first.booking.user, self.users[1])
+        self.assertEqual(self.seats(), 6)
+
+    def test_smaller_party_promotes(self):
+        """ Reducing a party in edit_booking offers the seats given up. """
+        entry = self.wait(self.users[1], 2)
+        self.client.force_login(self.users[0])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                reverse('edit_booking', args=[self.full.pk]),
+                {'number_of_people': 4}
+            )
+        entry.refresh_from_db()
+        self.assertEqual(entry.status, 2)
+        self.assertEqual(self.seats(), 6)
+
+    def test_other_slots_are_untouched(self):
+        """ Only the queue of the slot with freed seats is served. """
+        other = self.wait(self.users[1], 1, time_slot=810)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.full.delete()
+        other.refresh_from_db()
+        self.assertEqual(other.status, 1)
+
+    def test_users_who_booked_are_withdrawn(self):
+        """ A user who booked the slot meanwhile leaves the queue. """
+        self.full.number_of_people = 4
+        self.full.save()
+        entry = self.wait(self.users[1], 2)
+        Booking.objects.create(
+            user=self.users[1],
+            restaurant=self.restaurant,
+            booking_date=self.booking_date,
+            time_slot=720,
+            number_of_people=2,
+        )
+        self.full.status = 2
+        self.full.save()
+        WaitlistEntry.promote(self.restaurant.pk, self.booking_date, 720)
+        entry.refresh_from_db()
+        self.assertEqual(entry.status, 3)
+
+    def test_booking_clash_is_retried(self):
+        """
+        A promotion clashing with a booking made by a waiting user meanwhile
+        is logged and tried again instead of failing the cancellation.
+        """
+        entry = self.wait(self.users[1], 2)
+        bulk_create = Booking.objects.bulk_create
+        clash = [IntegrityError("unique_booking"), None]
+
+        def racing_bulk_create(*args, **kwargs):
+            error = clash.pop(0)
+            if error:
+                raise error
+            return bulk_create(*args, **kwargs)
+
+        with mock.patch.object(Booking.objects, 'bulk_create',
+                               side_effect=racing_bulk_create), \
+                self.assertLogs('booking.models', 'WARNING'):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.full.delete()
+        entry.refresh_from_db()
+        self.assertEqual(entry.status, 2)
+        self.assertEqual(self.seats(), 2)
+
+    def test_promotion_in_batches(self):
+        """ Long queues are read in batches until the seats are gone. """
+        self.full.status = 2
+        self.full.save()
+        entries = [self.wait(user, 2) for user in self.users[1:]]
+        with self.assertNumQueries(17):
+            promoted = WaitlistEntry.promote(
+                self.restaurant.pk, self.booking_date, 720, batch_size=2
+            )
+        self.assertEqual(promoted, entries[:3])
+        self.assertEqual(self.seats(), 6)
@@ -1,9 +1,18 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
+
+# With ASYNC_VIEWS the busiest pages are served by their async versions.
+hot = async_views if settings.ASYNC_VIEWS else views
 
 urlpatterns = [
-    path('<slug:slug>/book/', views.create_booking, name='create_booking'),
-    path('my-bookings/', views.my_bookings, name='my_bookings'),
+    path('<slug:slug>/book/', hot.create_booking, name='create_booking'),
+    path('<slug:slug>/availability/', hot.availability,
+         name='availability'),
+    path('search/', views.find_table, name='find_table'),
+    path('my-bookings/', hot.my_bookings, name='my_bookings'),
+    path('my-bookings/more/', hot.more_bookings, name='more_bookings'),
     path('edit-booking/<int:pk>/', views.edit_booking, name='edit_booking'),
-    path('cancel-booking/<int:pk>/', views.cancel_booking, name='cancel_booking'),
-]
\ No newline at end of file
+    path('cancel-booking/<int:pk>/', views.cancel_booking,
+         name='cancel_booking'),
+]
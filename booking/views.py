@@ -1,10 +1,17 @@
 from django.shortcuts import render, get_object_or_404, redirect
+from django.http import JsonResponse
+from django.template.loader import render_to_string
+from django.utils.dateparse import parse_date
 from django.contrib.auth.decorators import login_required
-from django.db.models import Sum
-from django.utils.timezone import now
 from django.contrib import messages
-from .forms import BookingForm, EditBookingForm
-from .models import Booking
+from django.db import IntegrityError
+from kode_restaurant.replicas import primary_only
+from .availability import booking_window, nearest_slots, slot_availability
+from .forms import BookingForm, EditBookingForm, SlotSearchForm
+from .models import (
+    Booking, CapacityExceeded, SlotOccupancy, TablesUnavailable, WaitlistEntry
+)
+from .pagination import PAST, SECTIONS, UPCOMING, bookings_page
 from restaurant.models import Restaurant
 
 
@@ -19,6 +26,9 @@ def get_current_bookings(
     Helper function to calculate the total number of people already booked
     for a restaurant at a specific date and time slot.
 
+    Reads the slot's row in :model:`booking.SlotOccupancy` rather than
+    summing the bookings themselves.
+
     **Parameters:**
 
     - restaurant
@@ -35,23 +45,31 @@ def get_current_bookings(
 
     Integer representing the total number of people already booked.
     """
-    queryset = Booking.objects.filter(
-        restaurant=restaurant,
-        booking_date=booking_date,
-        time_slot=time_slot,
-        status=1
-    )
+    try:
+        seats = SlotOccupancy.objects.values_list('seats', flat=True).get(
+            restaurant=restaurant,
+            booking_date=booking_date,
+            time_slot=time_slot
+        )
+    except SlotOccupancy.DoesNotExist:
+        seats = 0
 
     if exclude_booking:
-        queryset = queryset.exclude(pk=exclude_booking.pk)
+        held = exclude_booking.held_seats()
+        if held and held[0] == (restaurant.pk, booking_date, time_slot):
+            seats -= held[1]
+
+    return max(seats, 0)
 
-    return (
-        queryset.aggregate(Sum('number_of_people'))['number_of_people__sum']
-        or 0
-    )
+
+WAITLIST_MESSAGE = (
+    "That time is fully booked, so you are on the waitlist. If seats free "
+    "up, we will book the table for you and it will appear here."
+)
 
 
 # Create booking
+@primary_only
 @login_required
 def create_booking(request, slug):
     """
@@ -68,7 +86,16 @@ def create_booking(request, slug):
 
     - Validates against double-booking by the same user.
     - Ensures that the restaurant's online capacity is not exceeded.
+      The seats are reserved on the slot's :model:`booking.SlotOccupancy`
+      row in the same transaction as the save, so concurrent requests
+      cannot overbook the slot. At restaurants with
+      :model:`restaurant.Table` rows the party must also fit a free
+      table or joined tables.
     - On success, saves the booking and redirects to :view:`my_bookings`.
+    - If the slot is full and the guest asked for it, adds them to the
+      slot's :model:`booking.WaitlistEntry` queue instead and redirects
+      to :view:`my_bookings`. Otherwise the nearest slots with room, here
+      or at other restaurants in the city, are offered on the form.
 
     **Template:**
 
@@ -77,48 +104,18 @@ def create_booking(request, slug):
     restaurant = get_object_or_404(Restaurant, slug=slug)
 
     if request.method == 'POST':
-        form = BookingForm(request.POST)
-        if form.is_valid():
-            booking = form.save(commit=False)
-            booking.user = request.user
-            booking.restaurant = restaurant
-
-            if Booking.objects.filter(
-                user=request.user,
-                restaurant=restaurant,
-                booking_date=booking.booking_date,
-                time_slot=booking.time_slot
-            ).exclude(status=2).exists():
-                form.add_error(
-                    'time_slot',
-                    "You already have a booking for this restaurant at the "
-                    "selected date and time."
-                )
-
-            current_bookings = get_current_bookings(
-                restaurant,
-                booking.booking_date,
-                booking.time_slot
-            )
-
-            if (current_bookings + booking.number_of_people
-                    > restaurant.online_capacity):
-                form.add_error(
-                    'number_of_people',
-                    "The restaurant cannot accommodate your "
-                    "booking due to capacity limits. Please choose "
-                    "a different time or reduce the number of people."
-                )
-
-            if not form.errors:
-                booking.save()
-                messages.success(request,
-                                 "Your booking has been created successfully!"
-                                 )
-                return redirect('my_bookings')
+        form = BookingForm(request.POST, restaurant=restaurant)
+        if place_booking(request, restaurant, form):
+            messages.success(request,
+                             "Your booking has been created successfully!"
+                             )
+            return redirect('my_bookings')
+        if form.waitlist_entry:
+            messages.info(request, WAITLIST_MESSAGE)
+            return redirect('my_bookings')
 
     else:
-        form = BookingForm()
+        form = BookingForm(restaurant=restaurant)
 
     return render(
         request,
@@ -130,44 +127,181 @@ def create_booking(request, slug):
     )
 
 
+def place_booking(request, restaurant, form):
+    """
+    Validate a bound :form:`booking.BookingForm` and save the booking
+    for the logged-in user, reserving its seats.
+
+    Returns True if the booking was saved; otherwise the reasons are
+    added to the form as errors. If the only problem is a full slot and
+    the guest ticked ``join_waitlist``, they join the slot's waitlist
+    and the entry is set as ``form.waitlist_entry``; if they did not,
+    the nearest free slots are set as ``form.alternatives``. Shared by
+    the WSGI and ASGI versions of :view:`create_booking`.
+    """
+    if not form.is_valid():
+        return False
+
+    booking = form.save(commit=False)
+    booking.user = request.user
+    booking.restaurant = restaurant
+
+    if Booking.objects.filter(
+        user=request.user,
+        restaurant=restaurant,
+        booking_date=booking.booking_date,
+        time_slot=booking.time_slot
+    ).exclude(status=2).exists():
+        form.add_error(
+            'time_slot',
+            "You already have a booking for this restaurant at the "
+            "selected date and time."
+        )
+
+    current_bookings = get_current_bookings(
+        restaurant,
+        booking.booking_date,
+        booking.time_slot
+    )
+
+    capacity_error = (
+        "The restaurant cannot accommodate your "
+        "booking due to capacity limits. Please choose "
+        "a different time or reduce the number of people."
+    )
+
+    if (current_bookings + booking.number_of_people
+            > restaurant.online_capacity):
+        form.add_error('number_of_people', capacity_error)
+
+    if not form.errors:
+        try:
+            booking.save(capacity=restaurant.online_capacity)
+        except CapacityExceeded:
+            form.add_error('number_of_people', capacity_error)
+        except IntegrityError:
+            form.add_error(
+                'time_slot',
+                "You already have a booking for this restaurant at "
+                "the selected date and time."
+            )
+
+    if (form.cleaned_data.get('join_waitlist')
+            and list(form.errors) == ['number_of_people']):
+        form.waitlist_entry = WaitlistEntry.join(
+            request.user,
+            restaurant,
+            booking.booking_date,
+            booking.time_slot,
+            booking.number_of_people,
+            booking.special_requests,
+        )
+    elif form.has_error('number_of_people'):
+        form.alternatives = nearest_slots(
+            [restaurant, *Restaurant.objects.filter(
+                city=restaurant.city
+            ).exclude(pk=restaurant.pk).order_by('name')],
+            booking.number_of_people,
+            booking.booking_date,
+            booking.time_slot,
+        )
+
+    return not form.errors
+
+
 # My bookings
 @login_required
 def my_bookings(request):
     """
-    Display a list of bookings made by the logged-in user.
+    Display the first page of the logged-in user's upcoming and past
+    bookings.
 
     **Context:**
 
+    ``upcoming``
+        Up to ``MY_BOOKINGS_PAGE_SIZE`` :model:`booking.Booking` from
+        today onwards, soonest first.
+    ``past``
+        Up to ``MY_BOOKINGS_PAGE_SIZE`` earlier bookings, most recent
+        first.
+    ``upcoming_next``, ``past_next``
+        Cursors for :view:`booking.views.more_bookings`, or None when
+        there are no more bookings.
     ``bookings``
-        A queryset of :model:`booking.Booking` for the current user,
-        ordered by booking date (newest first) and time slot.
+        All bookings shown, upcoming then past.
 
     **Behaviour:**
 
-    - Automatically marks past bookings as 'Completed'.
+    - Each list is one query joined with the restaurant; further pages
+      are loaded on demand from :view:`booking.views.more_bookings`.
+    - Read-only: past bookings are shown as 'Completed' through
+      :attr:`booking.Booking.current_status`; the ``complete_bookings``
+      management command updates the stored status in batches.
+    - Only the booking table is read: bookings moved to
+      :model:`booking.BookingArchive` by ``archive_bookings`` a year
+      after their date are no longer listed.
 
     **Template:**
 
     :template:`booking/my_bookings.html`
     """
-    today = now().date()
-    # Mark past bookings as 'Completed'
-    Booking.objects.filter(user=request.user,
-                           booking_date__lt=today).update(status=3)
-
-    bookings = Booking.objects.filter(
-        user=request.user
-    ).order_by('-booking_date', 'time_slot')
+    upcoming, upcoming_next = bookings_page(request.user, UPCOMING)
+    past, past_next = bookings_page(request.user, PAST)
 
     return render(
         request,
         'booking/my_bookings.html',
         {
-            'bookings': bookings
+            'upcoming': upcoming,
+            'upcoming_next': upcoming_next,
+            'past': past,
+            'past_next': past_next,
+            'bookings': upcoming + past,
         })
 
 
+@login_required
+def more_bookings(request):
+    """
+    Return the next page of the logged-in user's bookings as JSON.
+
+    **Query parameters:**
+
+    ``section``
+        ``upcoming`` or ``past``.
+    ``after``
+        The cursor returned with the previous page.
+
+    **Response:**
+
+    ``rows`` and ``cards`` hold the rendered table rows and mobile cards
+    of the page, and ``next`` the cursor of the following page or null.
+    Responds with status 400 for an unknown section or a bad cursor.
+    """
+    section = request.GET.get('section')
+    if section not in SECTIONS:
+        return JsonResponse({'error': "Unknown section."}, status=400)
+    try:
+        bookings, next_cursor = bookings_page(
+            request.user, section, request.GET.get('after')
+        )
+    except ValueError:
+        return JsonResponse({'error': "Invalid cursor."}, status=400)
+
+    context = {'bookings': bookings}
+    return JsonResponse({
+        'rows': render_to_string(
+            'booking/includes/booking_rows.html', context, request
+        ),
+        'cards': render_to_string(
+            'booking/includes/booking_cards.html', context, request
+        ),
+        'next': next_cursor,
+    })
+
+
 # Edit booking
+@primary_only
 @login_required
 def edit_booking(request, pk):
     """
@@ -182,8 +316,11 @@ def edit_booking(request, pk):
 
     **Behaviour:**
 
-    - Allows updating the number of people for a booking.
-    - Validates against the restaurant's capacity.
+    - Allows updating the number of people for a booking. Seats given
+      up go to the slot's waitlist; see :model:`booking.WaitlistEntry`.
+    - Validates against the restaurant's capacity; extra seats are
+      reserved atomically on the slot's :model:`booking.SlotOccupancy` row,
+      and at restaurants with tables the larger party must fit a table.
     - Displays success or error messages and redirects to :view:`my_bookings`.
     """
     booking = get_object_or_404(Booking, pk=pk, user=request.user)
@@ -212,13 +349,29 @@ def edit_booking(request, pk):
 
             else:
                 booking.number_of_people = new_people
-                booking.save()
-                messages.success(
-                    request,
-                    f"{booking.booking_date} at {booking.time_slot} "
-                    "has been updated successfully to "
-                    f"{booking.number_of_people} guests."
-                )
+                try:
+                    booking.save(
+                        capacity=booking.restaurant.online_capacity
+                    )
+                except TablesUnavailable:
+                    messages.error(
+                        request,
+                        "Cannot update booking: there is no table free for "
+                        f"{new_people} guests at this time."
+                    )
+                except CapacityExceeded:
+                    messages.error(
+                        request,
+                        "Cannot update booking due to capacity limits. "
+                        "The time slot has just filled up."
+                    )
+                else:
+                    messages.success(
+                        request,
+                        f"{booking.booking_date} at {booking.time_slot_label} "
+                        "has been updated successfully to "
+                        f"{booking.number_of_people} guests."
+                    )
 
         else:
             messages.error(request,
@@ -231,6 +384,7 @@ def edit_booking(request, pk):
 
 
 # Cancel booking
+@primary_only
 @login_required
 def cancel_booking(request, pk):
     """
@@ -238,7 +392,9 @@ def cancel_booking(request, pk):
 
     **Behaviour:**
 
-    - Sets the booking status to 'Cancelled'.
+    - Sets the booking status to 'Cancelled'. Once saved, the freed
+      seats are offered to the slot's waitlist; see
+      :model:`booking.WaitlistEntry`.
     - Displays a success message and redirects to :view:`my_bookings`.
     """
     booking = get_object_or_404(Booking, pk=pk, user=request.user)
@@ -246,3 +402,138 @@ def cancel_booking(request, pk):
     booking.save()
     messages.success(request, "Your booking has been cancelled.")
     return redirect('my_bookings')
+
+
+# Availability
+def availability(request, slug):
+    """
+    Return the remaining online seats of a restaurant for every date and
+    time slot in a date range, as JSON.
+
+    **Query parameters:**
+
+    ``from`` (optional)
+        First date (``YYYY-MM-DD``); defaults to tomorrow.
+    ``to`` (optional)
+        Last date (``YYYY-MM-DD``); defaults to the end of the
+        180-day booking window.
+
+    Dates outside the booking window are left out.
+
+    **Returns:**
+
+    ``slots`` lists the restaurant's time slots and ``availability``
+    maps each date to ``{time_slot: seats_left}`` for every one of them.
+    ``largest_party`` maps each date to ``{time_slot: people}``, the
+    largest party that can still book the slot, which at restaurants
+    with tables is also limited by the tables free; see
+    :func:`booking.availability.slot_availability`. Seats taken are
+    cached per restaurant; see :func:`booking.availability.seats_taken`.
+    """
+    restaurant = get_object_or_404(Restaurant, slug=slug)
+    try:
+        start, end = availability_range(request)
+    except ValueError:
+        return JsonResponse(
+            {'error': "Dates must be given as YYYY-MM-DD."}, status=400
+        )
+    remaining, largest = slot_availability(restaurant, start, end)
+    return JsonResponse(
+        availability_data(restaurant, start, end, remaining, largest)
+    )
+
+
+def find_table(request):
+    """
+    Return the nearest time slots with room for a party, at one
+    restaurant or across a city, as JSON.
+
+    **Query parameters:**
+
+    See :form:`booking.SlotSearchForm`: ``restaurant`` (slug) and/or
+    ``city``, ``people``, and optionally ``date``, ``time``, ``limit``
+    and ``days``.
+
+    **Returns:**
+
+    ``slots`` lists up to ``limit`` slots nearest to the preferred date
+    and time, each with the restaurant's slug and name, the date, time
+    slot, its label and the seats left; see
+    :func:`booking.availability.nearest_slots`. Invalid parameters
+    return a 400 error with the form's ``errors``.
+    """
+    form = SlotSearchForm(request.GET)
+    if not form.is_valid():
+        return JsonResponse({'errors': form.errors}, status=400)
+
+    search = form.cleaned_data
+    slots = nearest_slots(
+        search['restaurants'],
+        search['people'],
+        search['date'] or booking_window()[0],
+        search['time'],
+        limit=search['limit'] or 5,
+        days=7 if search['days'] is None else search['days'],
+    )
+    return JsonResponse({
+        'people': search['people'],
+        'slots': [
+            {
+                'restaurant': slot['restaurant'].slug,
+                'name': slot['restaurant'].name,
+                'booking_date': slot['booking_date'].isoformat(),
+                'time_slot': slot['time_slot'],
+                'label': slot['label'],
+                'seats_left': slot['seats_left'],
+            }
+            for slot in slots
+        ],
+    })
+
+
+def availability_range(request):
+    """
+    Return the ``from`` and ``to`` dates of an availability request,
+    limited to the booking window. Raises ``ValueError`` for malformed
+    dates.
+    """
+    first_day, last_day = booking_window()
+    start = _date_param(request, 'from', first_day)
+    end = _date_param(request, 'to', last_day)
+    return max(start, first_day), min(end, last_day)
+
+
+def availability_data(restaurant, start, end, remaining, largest):
+    """
+    Return the JSON body of :view:`availability`.
+    """
+    return {
+        'restaurant': restaurant.slug,
+        'capacity': restaurant.online_capacity,
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'slots': [
+            {'value': value, 'label': label}
+            for value, label in restaurant.get_time_slots()
+        ],
+        'availability': {
+            day.isoformat(): slots for day, slots in remaining.items()
+        },
+        'largest_party': {
+            day.isoformat(): slots for day, slots in largest.items()
+        },
+    }
+
+
+def _date_param(request, name, default):
+    """
+    Read a ``YYYY-MM-DD`` query parameter, falling back to ``default``.
+    Raises ``ValueError`` for malformed dates.
+    """
+    value = request.GET.get(name)
+    if not value:
+        return default
+    parsed = parse_date(value)
+    if parsed is None:
+        raise ValueError(value)
+    return parsed
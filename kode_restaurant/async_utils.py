@@ -0,0 +1,29 @@
+from functools import wraps
+from asgiref.sync import sync_to_async
+from django.contrib.auth.views import redirect_to_login
+
+
+async def aget_user(request):
+    """
+    Load ``request.user`` from the session in a worker thread and return
+    it, so templates and checks can then use it without database access
+    inside the event loop.
+    """
+    def load():
+        request.user.is_authenticated
+        return request.user
+    return await sync_to_async(load)()
+
+
+def async_login_required(view):
+    """
+    Async counterpart of ``login_required``: redirect anonymous users to
+    the login page, keeping the requested URL as ``next``.
+    """
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        user = await aget_user(request)
+        if not user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        return await view(request, *args, **kwargs)
+    return wrapper
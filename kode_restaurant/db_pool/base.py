@@ -0,0 +1,159 @@
+"""
+PostgreSQL backend that keeps connections open in a per-process pool.
+
+Select it with ``DB_POOL=1`` (see :mod:`kode_restaurant.settings`).
+Django still closes its connection at the end of every request, but
+closing hands the connection back to the pool instead of ending it, so
+the next request skips the TCP, TLS and authentication round trips.
+
+When all ``max_size`` connections are in use, as can happen with
+threaded or ASGI workers under load, a request waits up to
+``POOL['timeout']`` seconds for one to be handed back and then opens a
+connection of its own, closed again at the end of the request, rather
+than failing.
+
+Pools are created lazily and keyed by process id: a gunicorn worker
+forked from a master that already touched the database builds its own
+pool and never uses the sockets it inherited.
+"""
+import os
+import threading
+from time import monotonic, sleep
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.postgresql import base
+from django.db.backends.postgresql.psycopg_any import IsolationLevel
+from psycopg2 import extensions, extras, pool
+
+_pools = {}
+_lock = threading.Lock()
+
+# Seconds a request waits for a pooled connection by default, and the
+# longest pause between two attempts.
+DEFAULT_TIMEOUT = 5
+MAX_RETRY_DELAY = 0.1
+
+
+def get_pool(alias, settings_dict, conn_params):
+    """
+    Return this process's connection pool for a database alias, creating
+    it from ``settings_dict['POOL']`` (``min_size`` connections kept
+    open, at most ``max_size`` in use) on first use.
+    """
+    key = (os.getpid(), alias)
+    with _lock:
+        connection_pool = _pools.get(key)
+        if connection_pool is None:
+            options = settings_dict.get('POOL') or {}
+            connection_pool = pool.ThreadedConnectionPool(
+                options.get('min_size', 1),
+                options.get('max_size', 5),
+                **conn_params
+            )
+            _pools[key] = connection_pool
+    return connection_pool
+
+
+def close_pools():
+    """
+    Close every connection in this process's pools. Pools inherited from
+    a parent process are forgotten without touching their sockets.
+    """
+    with _lock:
+        for (pid, alias), connection_pool in list(_pools.items()):
+            if pid == os.getpid():
+                connection_pool.closeall()
+            del _pools[(pid, alias)]
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    ``django.db.backends.postgresql`` with connections taken from and
+    returned to the pool of :func:`get_pool` (psycopg2 only).
+    """
+
+    def get_new_connection(self, conn_params):
+        connection_pool = get_pool(self.alias, self.settings_dict,
+                                   conn_params)
+        connection = self.checkout(connection_pool)
+        if connection is None:
+            # The pool stayed exhausted; use a connection of our own.
+            self._pool, self._pool_pid = None, os.getpid()
+            return super().get_new_connection(conn_params)
+        self._pool, self._pool_pid = connection_pool, os.getpid()
+
+        # As in the postgresql backend, the isolation level is set before
+        # Django switches autocommit on.
+        connection.autocommit = False
+        options = self.settings_dict['OPTIONS']
+        try:
+            isolation_level_value = options['isolation_level']
+        except KeyError:
+            self.isolation_level = IsolationLevel.READ_COMMITTED
+        else:
+            try:
+                self.isolation_level = IsolationLevel(isolation_level_value)
+            except ValueError:
+                raise ImproperlyConfigured(
+                    f"Invalid transaction isolation level "
+                    f"{isolation_level_value} specified."
+                )
+            connection.isolation_level = self.isolation_level
+        extras.register_default_jsonb(
+            conn_or_curs=connection, loads=lambda x: x
+        )
+        return connection
+
+    def checkout(self, connection_pool):
+        """
+        Take a working connection from the pool, or return None if none
+        was free within ``POOL['timeout']`` seconds. Connections closed
+        by the server are dropped and, with ``CONN_HEALTH_CHECKS``, each
+        one is pinged before it is handed out.
+        """
+        options = self.settings_dict.get('POOL') or {}
+        deadline = monotonic() + options.get('timeout', DEFAULT_TIMEOUT)
+        delay = 0.005
+        while True:
+            try:
+                connection = connection_pool.getconn()
+            except pool.PoolError:
+                # Every connection is in use.
+                remaining = deadline - monotonic()
+                if remaining <= 0:
+                    return None
+                sleep(min(delay, remaining))
+                delay = min(delay * 2, MAX_RETRY_DELAY)
+                continue
+            if self.is_healthy(connection):
+                return connection
+            connection_pool.putconn(connection, close=True)
+
+    def is_healthy(self, connection):
+        if connection.closed or (
+            connection.info.transaction_status
+            == extensions.TRANSACTION_STATUS_UNKNOWN
+        ):
+            return False
+        if not self.settings_dict['CONN_HEALTH_CHECKS']:
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            connection.rollback()
+        except self.Database.Error:
+            return False
+        return True
+
+    def _close(self):
+        if self.connection is None:
+            return
+        if getattr(self, '_pool_pid', None) != os.getpid():
+            # Inherited from the parent process; leave its socket alone.
+            return
+        if self._pool is None:
+            # Opened while the pool was exhausted.
+            return super()._close()
+        with self.wrap_database_errors:
+            self._pool.putconn(
+                self.connection, close=bool(self.connection.closed)
+            )
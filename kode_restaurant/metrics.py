@@ -0,0 +1,285 @@
+import logging
+import re
+import threading
+from bisect import bisect_left
+from collections import Counter
+from contextvars import ContextVar
+from time import perf_counter
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse, HttpResponseForbidden
+from django.template import TemplateDoesNotExist
+from django.template.backends import django as django_backend
+from django.utils.crypto import constant_time_compare
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the histogram buckets.
+SECONDS_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10
+)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+# Number of query fingerprints listed in a slow request warning.
+SLOW_QUERY_FINGERPRINTS = 5
+
+# Metrics of the request being handled, shared with the threads its
+# async views run queries in.
+_current = ContextVar('request_metrics', default=None)
+
+
+class Histogram:
+    """
+    Prometheus-style histogram of observations per view, safe to update
+    from several threads.
+    """
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self._views = {}
+        self._lock = threading.Lock()
+
+    def observe(self, view, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._views.get(
+                view, ([0] * (len(self.buckets) + 1), 0)
+            )
+            counts[index] += 1
+            self._views[view] = (counts, total + value)
+
+    def snapshot(self):
+        """
+        Return ``{view: (bucket counts, sum)}``, with the last count for
+        observations above every bucket.
+        """
+        with self._lock:
+            return {
+                view: (list(counts), total)
+                for view, (counts, total) in self._views.items()
+            }
+
+    def clear(self):
+        with self._lock:
+            self._views.clear()
+
+    def exposition(self):
+        """Return the histogram in the Prometheus text format."""
+        lines = [
+            f"# HELP {self.name} {self.help_text}",
+            f"# TYPE {self.name} histogram",
+        ]
+        for view, (counts, total) in sorted(self.snapshot().items()):
+            label = view.replace('\\', '\\\\').replace('"', '\\"')
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                lines.append(
+                    f'{self.name}_bucket{{view="{label}",le="{bound}"}} '
+                    f'{cumulative}'
+                )
+            lines.append(f'{self.name}_sum{{view="{label}"}} {total:.6f}')
+            lines.append(f'{self.name}_count{{view="{label}"}} {cumulative}')
+        return "\n".join(lines)
+
+
+REQUEST_SECONDS = Histogram(
+    'kode_request_duration_seconds',
+    "Wall time of a request.",
+    SECONDS_BUCKETS,
+)
+DB_QUERIES = Histogram(
+    'kode_db_queries',
+    "Database queries run by a request.",
+    QUERY_BUCKETS,
+)
+DB_SECONDS = Histogram(
+    'kode_db_duration_seconds',
+    "Time a request spent in database queries.",
+    SECONDS_BUCKETS,
+)
+TEMPLATE_SECONDS = Histogram(
+    'kode_template_render_seconds',
+    "Time a request spent rendering templates.",
+    SECONDS_BUCKETS,
+)
+HISTOGRAMS = (REQUEST_SECONDS, DB_QUERIES, DB_SECONDS, TEMPLATE_SECONDS)
+
+
+class RequestMetrics:
+    """Queries and template time recorded while serving one request."""
+
+    def __init__(self):
+        self.started = perf_counter()
+        self.queries = []
+        self.db_time = 0.0
+        self.template_time = 0.0
+
+    def add_query(self, sql, duration):
+        self.queries.append((sql, duration))
+        self.db_time += duration
+
+
+def fingerprint(sql):
+    """
+    Return ``sql`` with literals replaced by ``?`` and lists of values
+    collapsed, so the same query with other parameters looks the same.
+    """
+    sql = re.sub(r"'(?:[^']|'')*'", "?", sql)
+    sql = re.sub(r"\b\d+(?:\.\d+)?\b", "?", sql)
+    sql = re.sub(r"%s|\?", "?", sql)
+    sql = re.sub(r"\((?:\s*\?\s*,)+\s*\?\s*\)", "(...)", sql)
+    return re.sub(r"\s+", " ", sql).strip()
+
+
+def _record_query(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.add_query(sql, perf_counter() - started)
+
+
+def install_query_recorder(connection, **kwargs):
+    """
+    Time the queries of a database connection. Added at the front of the
+    wrappers, so ``execute_wrapper()`` blocks still remove their own.
+    """
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _record_query)
+
+
+connection_created.connect(install_query_recorder)
+
+
+class Template(django_backend.Template):
+    """Django template that adds its render time to the request metrics."""
+
+    def render(self, context=None, request=None):
+        metrics = _current.get()
+        if metrics is None:
+            return super().render(context, request)
+        started = perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics.template_time += perf_counter() - started
+
+
+class DjangoTemplates(django_backend.DjangoTemplates):
+    """
+    The Django template backend, timing each template it renders; nested
+    ``{% include %}`` templates count towards the template including them.
+    """
+
+    def from_string(self, template_code):
+        return Template(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return Template(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            django_backend.reraise(exc, self)
+
+
+def slow_request_seconds():
+    return getattr(settings, 'SLOW_REQUEST_MS', 1000) / 1000
+
+
+class MetricsMiddleware:
+    """
+    Record the wall time, database queries and time, and template render
+    time of every request per view, and log slow requests.
+
+    Serves sync and async requests; queries run by async views in worker
+    threads are counted through a context variable.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        # Connections opened before this module was loaded.
+        for connection in connections.all():
+            install_query_recorder(connection)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            return self.get_response(request)
+        finally:
+            _current.reset(token)
+            self.record(request, metrics)
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            return await self.get_response(request)
+        finally:
+            _current.reset(token)
+            self.record(request, metrics)
+
+    def record(self, request, metrics):
+        elapsed = perf_counter() - metrics.started
+        match = request.resolver_match
+        view = match.view_name if match else '<unresolved>'
+        REQUEST_SECONDS.observe(view, elapsed)
+        DB_QUERIES.observe(view, len(metrics.queries))
+        DB_SECONDS.observe(view, metrics.db_time)
+        TEMPLATE_SECONDS.observe(view, metrics.template_time)
+        if elapsed >= slow_request_seconds():
+            log_slow_request(request, view, elapsed, metrics)
+
+
+def log_slow_request(request, view, elapsed, metrics):
+    """
+    Log a warning with the timings of a slow request and the queries it
+    spent most time in, grouped by fingerprint.
+    """
+    counts, times = Counter(), Counter()
+    for sql, duration in metrics.queries:
+        key = fingerprint(sql)
+        counts[key] += 1
+        times[key] += duration
+    top = "".join(
+        f"\n  {counts[key]}x {duration * 1000:.1f} ms: {key}"
+        for key, duration in times.most_common(SLOW_QUERY_FINGERPRINTS)
+    )
+    logger.warning(
+        "Slow request %s %s (%s): %.0f ms, %d queries in %.0f ms, "
+        "templates %.0f ms%s",
+        request.method, request.path, view, elapsed * 1000,
+        len(metrics.queries), metrics.db_time * 1000,
+        metrics.template_time * 1000, top,
+    )
+
+
+def metrics_view(request):
+    """
+    Return the request histograms of this process in the Prometheus text
+    format, to staff users or to requests with the header
+    ``Authorization: Bearer <METRICS_TOKEN>``.
+    """
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    header = request.headers.get('Authorization', '')
+    allowed = (
+        token and constant_time_compare(header, f"Bearer {token}")
+    ) or request.user.is_staff
+    if not allowed:
+        return HttpResponseForbidden()
+    body = "\n".join(histogram.exposition() for histogram in HISTOGRAMS)
+    return HttpResponse(
+        body + "\n", content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
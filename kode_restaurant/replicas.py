@@ -0,0 +1,167 @@
+"""
+Send the reads of read-only requests to replica databases.
+
+Replicas are the aliases of ``DATABASES`` listed in
+``DATABASE_REPLICAS``. :class:`ReplicaMiddleware` lets a GET or HEAD
+request read from a random replica; everything else reads from the
+primary (``default``): other requests, views that write (marked with
+:func:`primary_only`), management commands, and the rest of a request
+once it has written anything. A request that wrote sets a cookie pinning
+the client's next requests to the primary for ``REPLICA_PIN_SECONDS``,
+so the page it is redirected to (e.g. My Bookings after a booking) shows
+what it just saved even if the replicas lag behind. All writes go to the
+primary.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+PRIMARY = 'default'
+
+# Cookie pinning a client to the primary after a request that wrote.
+PIN_COOKIE = 'primary_pin'
+
+# Routing of the request being handled, shared with the threads its
+# async views run queries in.
+_routing = ContextVar('database_routing', default=None)
+
+
+def replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', ())
+
+
+def pin_seconds():
+    return getattr(settings, 'REPLICA_PIN_SECONDS', 5)
+
+
+class Routing:
+    """
+    Where the current request reads from, and whether it has written.
+    """
+    def __init__(self, replica_reads):
+        self.replica_reads = replica_reads
+        self.wrote = False
+
+
+@contextmanager
+def read_from_primary():
+    """
+    Read from the primary inside the block, e.g. to fill a cache that
+    outlives the replicas' lag.
+    """
+    routing = _routing.get()
+    if routing is None:
+        yield
+        return
+    replica_reads, routing.replica_reads = routing.replica_reads, False
+    try:
+        yield
+    finally:
+        routing.replica_reads = replica_reads and not routing.wrote
+
+
+def primary_only(view):
+    """
+    Mark a view that writes, so that it reads from the primary whatever
+    the request method; see :meth:`ReplicaMiddleware.process_view`.
+    Apply it outside ``login_required`` and similar decorators.
+    """
+    view.primary_only = True
+    return view
+
+
+class PrimaryReplicaRouter:
+    """
+    Database router reading from a random replica while the current
+    request allows it (see :class:`ReplicaMiddleware`) and from the
+    primary otherwise; every write goes to the primary and keeps the
+    rest of the request on it.
+    """
+
+    def db_for_read(self, model, **hints):
+        routing = _routing.get()
+        if routing is None or not routing.replica_reads or not replicas():
+            return PRIMARY
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db in replicas():
+            # Related rows of an instance come from the same replica.
+            return instance._state.db
+        return random.choice(replicas())
+
+    def db_for_write(self, model, **hints):
+        routing = _routing.get()
+        if routing is not None:
+            routing.wrote = True
+            routing.replica_reads = False
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {PRIMARY, *replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+
+class ReplicaMiddleware:
+    """
+    Let GET and HEAD requests read from the replicas, unless the client
+    is pinned to the primary by a recent write or the view is marked
+    with :func:`primary_only`; pin the client when the request wrote to
+    the database.
+
+    Must come before ``SessionMiddleware``, so saving the session counts
+    as a write. Serves sync and async requests.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        routing = Routing(self.replica_reads(request))
+        token = _routing.set(routing)
+        try:
+            response = self.get_response(request)
+        finally:
+            _routing.reset(token)
+        return self.pin(response, routing)
+
+    async def __acall__(self, request):
+        routing = Routing(self.replica_reads(request))
+        token = _routing.set(routing)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _routing.reset(token)
+        return self.pin(response, routing)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # A view that writes loads what it changes from the primary, e.g.
+        # the booking cancelled by a GET request.
+        routing = _routing.get()
+        if routing is not None and getattr(view_func, 'primary_only', False):
+            routing.replica_reads = False
+        return None
+
+    def replica_reads(self, request):
+        return bool(
+            replicas()
+            and request.method in ('GET', 'HEAD')
+            and PIN_COOKIE not in request.COOKIES
+        )
+
+    def pin(self, response, routing):
+        if routing.wrote and replicas():
+            response.set_cookie(
+                PIN_COOKIE, '1', max_age=pin_seconds(),
+                secure=settings.SESSION_COOKIE_SECURE,
+                httponly=True, samesite='Lax',
+            )
+        return response
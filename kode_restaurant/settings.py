@@ -74,6 +74,8 @@ MESSAGE_TAGS = {
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'kode_restaurant.metrics.MetricsMiddleware',
+    'kode_restaurant.replicas.ReplicaMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -83,11 +85,18 @@ MIDDLEWARE = [
     'allauth.account.middleware.AccountMiddleware',
 ]
 
+# Per-view request, query and template timings are served at /metrics/
+# to staff users and to scrapers sending "Authorization: Bearer
+# <METRICS_TOKEN>". Requests slower than SLOW_REQUEST_MS are logged with
+# their queries.
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+SLOW_REQUEST_MS = int(os.environ.get("SLOW_REQUEST_MS", 1000))
+
 ROOT_URLCONF = 'kode_restaurant.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'kode_restaurant.metrics.DjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -103,6 +112,11 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'kode_restaurant.wsgi.application'
 
+# Serve the booking and restaurant pages with their async views. Only
+# useful when running under ASGI, e.g.
+# uvicorn kode_restaurant.asgi:application
+ASYNC_VIEWS = os.environ.get("ASYNC_VIEWS", "").lower() in ("1", "true")
+
 
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
@@ -118,11 +132,133 @@ DATABASES = {
     'default': dj_database_url.parse(os.environ.get("DATABASE_URL"))
 }
 
+# Connections are kept open between requests for DB_CONN_MAX_AGE seconds
+# and checked before each request is served, so a dropped connection is
+# replaced instead of failing the request. Async views run each query in
+# a different thread, so ASGI mode defaults to a connection per request.
+DATABASES['default']['CONN_MAX_AGE'] = int(
+    os.environ.get("DB_CONN_MAX_AGE", 0 if ASYNC_VIEWS else 600)
+)
+DATABASES['default']['CONN_HEALTH_CHECKS'] = os.environ.get(
+    "DB_CONN_HEALTH_CHECKS", "true"
+).lower() in ("1", "true")
+
+# DB_POOL=1 switches PostgreSQL to a per-process connection pool holding
+# DB_POOL_MIN_SIZE idle connections and at most DB_POOL_MAX_SIZE open
+# ones; every gunicorn worker gets its own pool. A request finding every
+# connection in use waits DB_POOL_TIMEOUT seconds for one, then opens
+# its own.
+if (os.environ.get("DB_POOL", "").lower() in ("1", "true")
+        and 'postgresql' in DATABASES['default']['ENGINE']):
+    DATABASES['default'].update({
+        'ENGINE': 'kode_restaurant.db_pool',
+        'CONN_MAX_AGE': 0,
+        'POOL': {
+            'min_size': int(os.environ.get("DB_POOL_MIN_SIZE", 1)),
+            'max_size': int(os.environ.get("DB_POOL_MAX_SIZE", 4)),
+            'timeout': float(os.environ.get("DB_POOL_TIMEOUT", 5)),
+        },
+    })
+
+# DATABASE_REPLICA_URLS lists read replicas of the database, separated by
+# commas. GET requests read from a random replica unless the client wrote
+# within the last REPLICA_PIN_SECONDS; see kode_restaurant.replicas.
+DATABASE_REPLICAS = []
+for number, url in enumerate(
+    filter(None, os.environ.get("DATABASE_REPLICA_URLS", "").split(",")),
+    start=1,
+):
+    alias = f'replica{number}'
+    DATABASES[alias] = dj_database_url.parse(url.strip())
+    DATABASES[alias]['CONN_MAX_AGE'] = DATABASES['default']['CONN_MAX_AGE']
+    DATABASES[alias]['CONN_HEALTH_CHECKS'] = (
+        DATABASES['default']['CONN_HEALTH_CHECKS']
+    )
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['kode_restaurant.replicas.PrimaryReplicaRouter']
+REPLICA_PIN_SECONDS = int(os.environ.get("REPLICA_PIN_SECONDS", 5))
+
+# Tests run on SQLite, unless TEST_DATABASE_URL names another database:
+# the concurrency tests in booking.test_concurrency need PostgreSQL.
 if 'test' in sys.argv:
-    DATABASES['default']['ENGINE'] = 'django.db.backends.sqlite3'
+    if os.environ.get("TEST_DATABASE_URL"):
+        DATABASES['default'] = dj_database_url.parse(
+            os.environ["TEST_DATABASE_URL"]
+        )
+    else:
+        DATABASES['default']['ENGINE'] = 'django.db.backends.sqlite3'
+    # A second SQLite database stands in for a replica in the tests that
+    # enable it with override_settings(DATABASE_REPLICAS=['replica']).
+    for alias in DATABASE_REPLICAS:
+        del DATABASES[alias]
+    DATABASE_REPLICAS = []
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'replica.sqlite3',
+    }
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# Local memory by default; set CACHE_BACKEND and CACHE_LOCATION to share
+# the cache between processes, e.g.
+# django.core.cache.backends.redis.RedisCache and redis://host:6379.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            "CACHE_BACKEND", 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.environ.get("CACHE_LOCATION", 'kode-restaurant'),
+    }
+}
+
+# Sessions are read from the cache and written through to the database
+# (cached_db) when the cache is shared between processes, i.e. when
+# CACHE_BACKEND is set: a per-process cache could keep serving a session
+# that another worker has changed or logged out. SESSION_ENGINE overrides
+# the choice.
+SESSION_ENGINE = os.environ.get(
+    "SESSION_ENGINE",
+    'django.contrib.sessions.backends.cached_db'
+    if os.environ.get("CACHE_BACKEND")
+    else 'django.contrib.sessions.backends.db'
+)
+
+# Flash messages travel in a signed cookie and never touch the session;
+# set MESSAGE_STORAGE to
+# django.contrib.messages.storage.fallback.FallbackStorage to store
+# messages too large for a cookie in the session.
+MESSAGE_STORAGE = os.environ.get(
+    "MESSAGE_STORAGE", 'django.contrib.messages.storage.cookie.CookieStorage'
+)
+
+# Restaurant pages are invalidated on every change, so they can be kept
+# for a long time.
+RESTAURANT_PAGE_CACHE_TIMEOUT = 60 * 60 * 24
+
+# The booking facts of the occupancy dashboard are refreshed from changed
+# bookings on every view; after this long unused they are read afresh.
+ANALYTICS_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Bookings per section and per "Load more" on the My Bookings page.
+MY_BOOKINGS_PAGE_SIZE = 10
+
+# Restaurant shown on the home page. When empty or not found, the active
+# restaurant with the lowest id is shown.
+FEATURED_RESTAURANT_SLUG = os.environ.get(
+    "FEATURED_RESTAURANT_SLUG", 'kode-restaurant-fictionville'
+)
 
 CLOUDINARY_URL = os.environ.get("CLOUDINARY_URL")
 
+# Builds the resized carousel image URLs. Set CAROUSEL_IMAGE_URL to
+# restaurant.images.local_url to develop without a Cloudinary account.
+CAROUSEL_IMAGE_URL = os.environ.get(
+    "CAROUSEL_IMAGE_URL", 'restaurant.images.cloudinary_url'
+)
+CAROUSEL_IMAGE_WIDTHS = [480, 800, 1200, 1600]
+
 CSRF_TRUSTED_ORIGINS = [
     "https://*.codeinstitute-ide.net/",
     "https://*.herokuapp.com"
@@ -168,6 +304,24 @@ STATIC_URL = 'static/'
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static'), ]
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
+# collectstatic minifies CSS and JS, adds a content hash to every file
+# name and writes gzip and brotli copies. WhiteNoise serves hashed files
+# with a ten-year immutable Cache-Control header. Tests render templates
+# without running collectstatic, so they keep the plain storage.
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'kode_restaurant.storage.StaticFilesStorage',
+    },
+}
+
+if 'test' in sys.argv:
+    STORAGES['staticfiles']['BACKEND'] = (
+        'django.contrib.staticfiles.storage.StaticFilesStorage'
+    )
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -0,0 +1,48 @@
+from django.core.files.base import ContentFile
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+try:
+    import rcssmin
+    import rjsmin
+except ImportError:  # pragma: no cover - minifying is optional
+    rcssmin = rjsmin = None
+
+
+def minify(name, content):
+    """
+    Return the minified text of a CSS or JavaScript file, or None for
+    other files or when rcssmin/rjsmin are not installed.
+    """
+    if rjsmin is None:
+        return None
+    if name.endswith('.css'):
+        return rcssmin.cssmin(content)
+    if name.endswith('.js'):
+        return rjsmin.jsmin(content)
+    return None
+
+
+class StaticFilesStorage(CompressedManifestStaticFilesStorage):
+    """
+    WhiteNoise's compressed manifest storage, which minifies CSS and
+    JavaScript as ``collectstatic`` writes them.
+
+    Every copy written to ``STATIC_ROOT`` is minified, including the
+    hashed names produced after ``url()`` references in CSS have been
+    rewritten. The hashes are still those of the source files, so they
+    change whenever a source file does. WhiteNoise then writes gzip and
+    brotli versions of each file next to it.
+    """
+
+    def _save(self, name, content):
+        if name.endswith(('.css', '.js')):
+            content.seek(0)
+            text = content.read()
+            if isinstance(text, bytes):
+                text = text.decode('utf-8')
+            minified = minify(name, text)
+            if minified is not None:
+                content = ContentFile(minified.encode('utf-8'))
+            else:
+                content.seek(0)
+        return super()._save(name, content)
@@ -0,0 +1,117 @@
+from unittest import mock
+from django.db.utils import ConnectionHandler
+from django.test import SimpleTestCase
+from psycopg2 import extensions
+from .db_pool import base
+
+
+class FakePool:
+    """ Stands in for ``ThreadedConnectionPool`` without a server. """
+
+    def __init__(self, min_size, max_size, **conn_params):
+        self.sizes = (min_size, max_size)
+        self.idle = []
+        self.returned = []
+
+    def getconn(self):
+        if not self.idle:
+            raise base.pool.PoolError("connection pool exhausted")
+        return self.idle.pop(0)
+
+    def putconn(self, connection, close=False):
+        self.returned.append((connection, close))
+
+
+def fake_connection(closed=0):
+    connection = mock.MagicMock(closed=closed)
+    connection.info.transaction_status = extensions.TRANSACTION_STATUS_IDLE
+    return connection
+
+
+class TestConnectionPool(SimpleTestCase):
+    """ Tests for the pooled PostgreSQL backend. """
+
+    def setUp(self):
+        for patcher in (
+            mock.patch.object(base.pool, 'ThreadedConnectionPool', FakePool),
+            mock.patch.object(base.extras, 'register_default_jsonb'),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(base._pools.clear)
+        self.database = ConnectionHandler({'default': {
+            'ENGINE': 'kode_restaurant.db_pool',
+            'NAME': 'kode',
+            'CONN_HEALTH_CHECKS': True,
+            'POOL': {'min_size': 2, 'max_size': 3},
+        }})['default']
+
+    def test_pool_is_created_once_per_process(self):
+        """ A worker reuses its pool but never one from its parent. """
+        pool = base.get_pool('default', self.database.settings_dict, {})
+        self.assertEqual(pool.sizes, (2, 3))
+        self.assertIs(
+            base.get_pool('default', self.database.settings_dict, {}), pool
+        )
+        with mock.patch.object(base.os, 'getpid', return_value=-1):
+            self.assertIsNot(
+                base.get_pool('default', self.database.settings_dict, {}),
+                pool
+            )
+
+    def test_broken_connections_are_discarded(self):
+        """ Closed or failing connections are dropped on checkout. """
+        pool = base.get_pool('default', self.database.settings_dict, {})
+        closed = fake_connection(closed=1)
+        failing = fake_connection()
+        cursor = failing.cursor.return_value.__enter__.return_value
+        cursor.execute.side_effect = self.database.Database.OperationalError
+        working = fake_connection()
+        pool.idle = [closed, failing, working]
+
+        connection = self.database.get_new_connection({})
+        self.assertIs(connection, working)
+        self.assertEqual(pool.returned, [(closed, True), (failing, True)])
+
+    def test_closing_returns_connection_to_pool(self):
+        """ Closing hands the connection back unless it was inherited. """
+        pool = base.get_pool('default', self.database.settings_dict, {})
+        working = fake_connection()
+        pool.idle = [working, working]
+        self.database.connection = self.database.get_new_connection({})
+        self.database._close()
+        self.assertEqual(pool.returned, [(working, False)])
+
+        self.database.connection = self.database.get_new_connection({})
+        with mock.patch.object(base.os, 'getpid', return_value=-1):
+            self.database._close()
+        self.assertEqual(len(pool.returned), 1)
+
+    def test_exhausted_pool_waits_then_connects_directly(self):
+        """
+        Without a free connection a request waits for one, and after the
+        timeout opens and later closes a connection of its own.
+        """
+        pool = base.get_pool('default', self.database.settings_dict, {})
+        working = fake_connection()
+        handed_back = iter([None, working])
+
+        def wait(seconds):
+            connection = next(handed_back)
+            if connection:
+                pool.idle.append(connection)
+
+        with mock.patch.object(base, 'sleep', side_effect=wait):
+            self.assertIs(self.database.get_new_connection({}), working)
+
+        direct = fake_connection()
+        self.database.settings_dict['POOL']['timeout'] = 0
+        with mock.patch.object(
+            base.base.DatabaseWrapper, 'get_new_connection',
+            return_value=direct
+        ):
+            self.database.connection = self.database.get_new_connection({})
+        self.assertIs(self.database.connection, direct)
+        self.database._close()
+        direct.close.assert_called_once_with()
+        self.assertEqual(pool.returned, [])
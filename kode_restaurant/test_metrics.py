@@ -0,0 +1,101 @@
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from restaurant.cache import page_cache
+from restaurant.models import Restaurant
+from . import metrics
+
+
+class TestMetricsMiddleware(TestCase):
+    """ Tests for the per-view request metrics and their endpoint. """
+
+    def setUp(self):
+        page_cache().clear()
+        for histogram in metrics.HISTOGRAMS:
+            histogram.clear()
+        Restaurant.objects.create(
+            name="Test Bistro",
+            slug="test-bistro",
+            address="123 Street",
+            city="Town",
+            phone_number="123456789",
+            description="Test place",
+        )
+        self.url = reverse('restaurant_detail', args=['test-bistro'])
+
+    def test_request_is_recorded_per_view(self):
+        """ Wall, query, database and template time are kept per view. """
+        self.client.get(self.url)
+        view = 'restaurant_detail'
+        for histogram in metrics.HISTOGRAMS:
+            self.assertEqual(sum(histogram.snapshot()[view][0]), 1)
+        self.assertGreater(metrics.DB_QUERIES.snapshot()[view][1], 0)
+        self.assertGreater(metrics.TEMPLATE_SECONDS.snapshot()[view][1], 0)
+
+    @override_settings(ROOT_URLCONF='booking.test_async_views')
+    async def test_async_view_queries_are_counted(self):
+        """ Queries run by async views in worker threads are counted. """
+        response = await self.async_client.get(
+            reverse('availability', args=['test-bistro'])
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(
+            metrics.DB_QUERIES.snapshot()['availability'][1], 0
+        )
+
+    @override_settings(METRICS_TOKEN="secret")
+    def test_endpoint_is_protected(self):
+        """ Metrics are only served to staff and with the token. """
+        self.client.get(self.url)
+        self.assertEqual(
+            self.client.get(reverse('metrics')).status_code, 403
+        )
+        response = self.client.get(
+            reverse('metrics'), HTTP_AUTHORIZATION="Bearer secret"
+        )
+        self.assertContains(
+            response,
+            'kode_request_duration_seconds_count{view="restaurant_detail"} 1'
+        )
+        self.assertContains(response, "# TYPE kode_db_queries histogram")
+
+        staff = User.objects.create_user(username="staff", is_staff=True)
+        self.client.force_login(staff)
+        self.assertEqual(
+            self.client.get(reverse('metrics')).status_code, 200
+        )
+
+    @override_settings(SLOW_REQUEST_MS=0)
+    def test_slow_requests_are_logged(self):
+        """ Slow requests are logged with their query fingerprints. """
+        with self.assertLogs('kode_restaurant.metrics', 'WARNING') as logs:
+            self.client.get(self.url)
+        self.assertIn("Slow request GET", logs.output[0])
+        self.assertIn('"restaurant_restaurant"', logs.output[0])
+
+
+class TestFingerprint(SimpleTestCase):
+    """ Tests for grouping queries by fingerprint. """
+
+    def test_literals_and_lists_are_replaced(self):
+        """ Queries differing only in their values share a fingerprint. """
+        self.assertEqual(
+            metrics.fingerprint(
+                "SELECT *  FROM t WHERE id IN (%s, %s, %s) AND name = 'a' "
+                "LIMIT 21"
+            ),
+            "SELECT * FROM t WHERE id IN (...) AND name = ? LIMIT ?"
+        )
+
+    def test_histogram_exposition(self):
+        """ Buckets are cumulative and end with +Inf. """
+        histogram = metrics.Histogram('h', "Help.", (1, 2))
+        histogram.observe('v', 0.5)
+        histogram.observe('v', 3)
+        self.assertEqual(histogram.exposition().splitlines()[2:], [
+            'h_bucket{view="v",le="1"} 1',
+            'h_bucket{view="v",le="2"} 1',
+            'h_bucket{view="v",le="+Inf"} 2',
+            'h_sum{view="v"} 3.500000',
+            'h_count{view="v"} 2',
+        ])
@@ -0,0 +1,390 @@
+from datetime import date, timedelta
+from django.contrib.auth.models import User
+from django.http import HttpResponse
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from booking.availability import booking_window
+from booking.archive import archive_bookings
+from booking.models import Booking, BookingArchive, WaitlistEntry
+from booking.pagination import encode_cursor
+from restaurant.cache import forget_featured_restaurant, page_cache
+from restaurant.models import Restaurant, RestaurantCarouselImage, Table
+from .testing import QueryCountMixin
+
+
+class TestQueryCountMixin(QueryCountMixin, TestCase):
+    """ Tests for the query count assertions themselves. """
+
+    def test_growing_count_fails(self):
+        """ A request running a query per row fails, listing the counts. """
+        def request():
+            for user in User.objects.all():
+                User.objects.filter(pk=user.pk).exists()
+            return HttpResponse()
+
+        def grow(size):
+            while User.objects.count() < size:
+                User.objects.create(username=f"user{User.objects.count()}")
+
+        with self.assertRaisesMessage(
+            AssertionError, "grows with the rows: {1: 2, 5: 6, 20: 21}"
+        ):
+            self.assertQueryCounts(2, request, grow)
+
+    def test_unexpected_count_fails(self):
+        """ A different but constant count fails, listing the queries. """
+        def request():
+            User.objects.exists()
+            return HttpResponse()
+
+        with self.assertRaisesMessage(
+            AssertionError, 'Expected 2 queries, got 1:\n1. SELECT'
+        ):
+            self.assertQueryCounts(2, request, lambda size: None)
+
+
+class TestQueryCounts(QueryCountMixin, TestCase):
+    """
+    Pins the number of queries of every booking, restaurant and admin
+    page, at several numbers of bookings, restaurants and images.
+    """
+
+    def setUp(self):
+        page_cache().clear()
+        self.restaurant = Restaurant.objects.create(
+            name="Test Bistro",
+            slug="test-bistro",
+            address="123 Street",
+            city="Town",
+            phone_number="123456789",
+            description="Test place",
+        )
+        self.user = User.objects.create_superuser(
+            username="diner", password="password"
+        )
+        self.client.force_login(self.user)
+        self.first_day = booking_window()[0]
+        self.days_used = 0
+
+    def book(self, booking_date, **fields):
+        return Booking.objects.create(
+            user=self.user,
+            restaurant=self.restaurant,
+            booking_date=booking_date,
+            time_slot=720,
+            number_of_people=2,
+            **fields,
+        )
+
+    def new_booking(self):
+        """ Return a new upcoming booking on a day not used before. """
+        self.days_used += 1
+        return self.book(self.first_day + timedelta(days=self.days_used))
+
+    def grow_bookings(self, size):
+        """ Give the user ``size`` upcoming and ``size`` past bookings. """
+        past = Booking.objects.filter(booking_date__lt=date.today())
+        while past.count() < size:
+            self.book(date.today() - timedelta(days=past.count() + 1),
+                      status=3)
+        upcoming = Booking.objects.filter(booking_date__gte=date.today())
+        while upcoming.count() < size:
+            self.new_booking()
+
+    def grow_restaurants(self, size):
+        """ Add restaurants, each with a carousel image, up to ``size``. """
+        while Restaurant.objects.count() < size:
+            i = Restaurant.objects.count()
+            restaurant = Restaurant.objects.create(
+                name=f"Bistro {i}",
+                slug=f"bistro-{i}",
+                address="1 Street",
+                city="Town",
+                phone_number=f"phone-{i}",
+                description="Another place",
+            )
+            RestaurantCarouselImage.objects.create(
+                restaurant=restaurant, image=f"carousel/{i}.jpg"
+            )
+        while self.restaurant.carousel_images.count() < size:
+            RestaurantCarouselImage.objects.create(
+                restaurant=self.restaurant,
+                image="carousel/test.jpg",
+                order=self.restaurant.carousel_images.count(),
+            )
+
+    def grow_waitlist(self, size):
+        """ Add waitlist entries of different users up to ``size``. """
+        while WaitlistEntry.objects.count() < size:
+            user = User.objects.create_user(
+                username=f"waiting{WaitlistEntry.objects.count()}"
+            )
+            WaitlistEntry.join(user, self.restaurant, self.first_day, 720, 2)
+
+    def grow_archive(self, size):
+        """ Archive old bookings of different users up to ``size``. """
+        cutoff = date.today() - timedelta(days=365)
+        while BookingArchive.objects.count() < size:
+            user = User.objects.create_user(
+                username=f"archived{BookingArchive.objects.count()}"
+            )
+            Booking.objects.create(
+                user=user,
+                restaurant=self.restaurant,
+                booking_date=cutoff - timedelta(days=1),
+                time_slot=720,
+                number_of_people=2,
+                status=3,
+            )
+            archive_bookings(cutoff)
+
+    def uncached(self, url):
+        """ Return a request for ``url`` made with an empty page cache. """
+        def request():
+            page_cache().clear()
+            return self.client.get(url)
+        return request
+
+    def test_home(self):
+        """ Home page: session, user, featured restaurant and images. """
+        request = self.uncached(reverse('home'))
+
+        def cold_request():
+            forget_featured_restaurant()
+            return request()
+        self.assertQueryCounts(6, cold_request, self.grow_restaurants)
+
+    def test_restaurant_detail(self):
+        """ Restaurant page: session, user, restaurant and images. """
+        url = reverse('restaurant_detail', args=['test-bistro'])
+        self.assertQueryCounts(4, self.uncached(url), self.grow_restaurants)
+
+    def test_restaurant_detail_cached_for_anonymous_visitors(self):
+        """ Anonymous visitors get the cached page without any query. """
+        url = reverse('restaurant_detail', args=['test-bistro'])
+        self.client.logout()
+
+        def grow(size):
+            self.grow_restaurants(size)
+            self.client.get(url)
+        self.assertQueryCounts(0, lambda: self.client.get(url), grow)
+
+    def test_create_booking_form(self):
+        """ Booking form: session, user and restaurant. """
+        url = reverse('create_booking', args=['test-bistro'])
+        self.assertQueryCounts(
+            3, lambda: self.client.get(url), self.grow_bookings
+        )
+
+    def test_create_booking(self):
+        """ Booking: capacity check, ledger row, tables and insert. """
+        url = reverse('create_booking', args=['test-bistro'])
+
+        def request():
+            self.days_used += 1
+            return self.client.post(url, {
+                'booking_date': self.first_day + timedelta(
+                    days=self.days_used
+                ),
+                'time_slot': 720,
+                'number_of_people': 2,
+            })
+        self.assertQueryCounts(14, request, self.grow_bookings)
+
+    def test_availability(self):
+        """
+        Availability: session, restaurant, the ledger rows in one query
+        and the tables.
+        """
+        url = reverse('availability', args=['test-bistro'])
+        self.assertQueryCounts(4, self.uncached(url), self.grow_bookings)
+
+    def test_find_table(self):
+        """
+        Slot search across a city: session, restaurants, ledger, tables
+        and the bookings seated at them.
+        """
+        for name, seats in (('A', 4), ('B', 2)):
+            Table.objects.create(restaurant=self.restaurant, name=name,
+                                 seats=seats)
+        url = f"{reverse('find_table')}?city=Town&people=2&limit=20"
+
+        def grow(size):
+            self.grow_restaurants(size)
+            self.grow_bookings(size)
+        self.assertQueryCounts(5, self.uncached(url), grow)
+
+    def test_my_bookings(self):
+        """ My Bookings: one joined query per section. """
+        self.assertQueryCounts(
+            4, lambda: self.client.get(reverse('my_bookings')),
+            self.grow_bookings
+        )
+
+    def test_more_bookings(self):
+        """ Load more: one joined query for the page. """
+        first = self.new_booking()
+        self.assertQueryCounts(
+            3, lambda: self.client.get(reverse('more_bookings'), {
+                'section': 'upcoming', 'after': encode_cursor(first),
+            }),
+            self.grow_bookings
+        )
+
+    def test_edit_booking(self):
+        """ Editing a booking: row lock, capacity check, ledger, tables. """
+        booking = self.new_booking()
+        url = reverse('edit_booking', args=[booking.pk])
+        # Growing a booking runs the capacity-checked ledger update.
+        people = iter([3, 4, 5])
+        self.assertQueryCounts(
+            12,
+            lambda: self.client.post(
+                url, {'number_of_people': next(people)}
+            ),
+            self.grow_bookings
+        )
+
+    def test_cancel_booking(self):
+        """ Cancelling a booking: row lock, status, ledger and tables. """
+        targets = []
+
+        def grow(size):
+            self.grow_bookings(size)
+            targets.append(self.new_booking())
+
+        self.assertQueryCounts(
+            9,
+            lambda: self.client.get(
+                reverse('cancel_booking', args=[targets[-1].pk])
+            ),
+            grow
+        )
+
+    def test_admin_booking_changelist(self):
+        """ Bookings list: restaurant, user and occupancy per page. """
+        self.assertQueryCounts(
+            7, lambda: self.client.get(
+                reverse('admin:booking_booking_changelist')
+            ), self.grow_bookings
+        )
+
+    def test_admin_restaurant_changelist(self):
+        """ Restaurants list. """
+        self.assertQueryCounts(
+            5, lambda: self.client.get(
+                reverse('admin:restaurant_restaurant_changelist')
+            ), self.grow_restaurants
+        )
+
+    def test_admin_carousel_image_changelist(self):
+        """ Carousel images list: restaurants joined. """
+        self.assertQueryCounts(
+            6, lambda: self.client.get(
+                reverse('admin:restaurant_restaurantcarouselimage_changelist')
+            ), self.grow_restaurants
+        )
+
+    def test_admin_waitlist_changelist(self):
+        """ Waitlist entries list: restaurants and users joined. """
+        self.assertQueryCounts(
+            6, lambda: self.client.get(
+                reverse('admin:booking_waitlistentry_changelist')
+            ), self.grow_waitlist
+        )
+
+    def test_admin_archive_changelist(self):
+        """ Archived bookings list: joined, without the full count. """
+        self.assertQueryCounts(
+            5, lambda: self.client.get(
+                reverse('admin:booking_bookingarchive_changelist')
+            ), self.grow_archive
+        )
+
+    def test_admin_occupancy_dashboard(self):
+        """ Dashboard: restaurants and the bookings saved since last time. """
+        url = reverse('admin:booking_booking_dashboard')
+        self.assertQueryCounts(
+            5, lambda: self.client.get(url, {
+                'restaurant': self.restaurant.pk,
+                'start': date.today() - timedelta(weeks=12),
+                'end': date.today() + timedelta(weeks=12),
+            }), self.grow_bookings
+        )
+
+
+class TestSessionQueries(QueryCountMixin, TestCase):
+    """
+    Measures the queries the session backend adds to booking a table:
+    the ``create_booking`` POST and the My Bookings page it redirects to.
+    """
+
+    def setUp(self):
+        page_cache().clear()
+        self.restaurant = Restaurant.objects.create(
+            name="Test Bistro",
+            slug="test-bistro",
+            address="123 Street",
+            city="Town",
+            phone_number="123456789",
+        )
+        self.user = User.objects.create_user(username="diner")
+        self.days_used = 0
+
+    def booking_flow(self):
+        """
+        Book a table with a new client and follow the redirect; return
+        the queries of both requests.
+        """
+        client = Client()
+        client.force_login(self.user)
+        self.days_used += 1
+        booked = self.count_queries(lambda: client.post(
+            reverse('create_booking', args=['test-bistro']),
+            {
+                'booking_date': booking_window()[0] + timedelta(
+                    days=self.days_used
+                ),
+                'time_slot': 720,
+                'number_of_people': 2,
+            }
+        ))
+        listed = self.count_queries(
+            lambda: client.get(reverse('my_bookings'))
+        )
+        self.assertTrue(listed)
+        return booked, listed
+
+    def session_queries(self, queries):
+        return [query for query in queries
+                if 'django_session' in query['sql']]
+
+    def test_cached_sessions_skip_the_session_table(self):
+        """
+        Database sessions read the session table on both requests;
+        cached sessions, written through at login, read it on neither,
+        and cookie messages never write the session.
+        """
+        with override_settings(
+            SESSION_ENGINE='django.contrib.sessions.backends.db'
+        ):
+            booked, listed = self.booking_flow()
+        self.assertEqual((len(booked), len(listed)), (14, 4))
+        self.assertEqual(len(self.session_queries(booked + listed)), 2)
+
+        with override_settings(
+            SESSION_ENGINE='django.contrib.sessions.backends.cached_db'
+        ):
+            booked, listed = self.booking_flow()
+        self.assertEqual((len(booked), len(listed)), (13, 3))
+        self.assertEqual(self.session_queries(booked + listed), [])
+
+    @override_settings(
+        MESSAGE_STORAGE='django.contrib.messages.storage.session.'
+                        'SessionStorage'
+    )
+    def test_session_messages_write_the_session(self):
+        """ Storing the confirmation in the session costs a write. """
+        booked, listed = self.booking_flow()
+        self.assertEqual(len(self.session_queries(booked)), 2)
+        self.assertEqual(len(self.session_queries(listed)), 2)
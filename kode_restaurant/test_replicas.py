@@ -0,0 +1,167 @@
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.db import router
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from booking.availability import booking_window, seats_taken
+from booking.models import Booking
+from restaurant.cache import page_cache
+from restaurant.models import Restaurant
+from .replicas import PIN_COOKIE, ReplicaMiddleware, read_from_primary
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class TestReplicaRouting(TestCase):
+    """
+    Tests for reading from replicas, with a second SQLite database
+    standing in for a replica that has not caught up with the primary.
+    """
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        page_cache().clear()
+        self.restaurant = Restaurant.objects.create(
+            name="Test Bistro",
+            slug="test-bistro",
+            address="123 Street",
+            city="Town",
+            phone_number="123456789",
+        )
+        self.user = User.objects.create_user(username="diner")
+        self.client.force_login(self.user)
+        self.replicate(
+            self.restaurant, self.user,
+            Session.objects.get(session_key=self.client.session.session_key),
+        )
+        self.booking_date = booking_window()[0]
+
+    def replicate(self, *objects):
+        """ Copy rows of the primary to the replica. """
+        for instance in objects:
+            instance.save(using='replica')
+
+    def booking(self):
+        return Booking(
+            user=self.user,
+            restaurant=self.restaurant,
+            booking_date=self.booking_date,
+            time_slot=720,
+            number_of_people=2,
+        )
+
+    def test_get_requests_read_from_the_replica(self):
+        """ My Bookings lists the bookings the replica holds. """
+        Booking.objects.using('replica').bulk_create([self.booking()])
+        response = self.client.get(reverse('my_bookings'))
+        self.assertEqual(len(response.context['upcoming']), 1)
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    def test_booking_pins_the_redirect_to_the_primary(self):
+        """
+        The My Bookings page a new booking redirects to shows it, though
+        the replica has not received it yet.
+        """
+        response = self.client.post(
+            reverse('create_booking', args=['test-bistro']),
+            {
+                'booking_date': self.booking_date,
+                'time_slot': 720,
+                'number_of_people': 2,
+            }
+        )
+        self.assertRedirects(response, reverse('my_bookings'),
+                             fetch_redirect_response=False)
+        self.assertEqual(response.cookies[PIN_COOKIE]['max-age'], 5)
+
+        response = self.client.get(reverse('my_bookings'))
+        self.assertEqual(len(response.context['upcoming']), 1)
+
+        del self.client.cookies[PIN_COOKIE]
+        response = self.client.get(reverse('my_bookings'))
+        self.assertEqual(len(response.context['upcoming']), 0)
+
+    def test_views_that_write_read_from_the_primary(self):
+        """
+        Cancelling, a GET request, loads the booking from the primary:
+        a booking the replica still shows but the primary no longer
+        holds is not found, so it is not saved back.
+        """
+        booking = self.booking()
+        booking.save()
+        self.replicate(booking)
+        Booking.objects.filter(pk=booking.pk).delete()
+
+        response = self.client.get(
+            reverse('cancel_booking', args=[booking.pk])
+        )
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(Booking.objects.exists())
+
+    def test_cached_pages_are_read_from_the_primary(self):
+        """ A lagging replica does not put an old page in the cache. """
+        Restaurant.objects.using('replica').filter(
+            pk=self.restaurant.pk
+        ).update(name="Old Bistro")
+        self.client.logout()
+        response = self.client.get(
+            reverse('restaurant_detail', args=['test-bistro'])
+        )
+        self.assertContains(response, "Test Bistro")
+
+    def test_availability_is_cached_from_the_primary(self):
+        """
+        A lagging replica does not put the seats from before a booking
+        in the availability cache, on the calendar or the slot search.
+        """
+        self.booking().save()
+        cache.clear()
+        response = self.client.get(
+            reverse('availability', args=['test-bistro'])
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(seats_taken(self.restaurant),
+                         {self.booking_date: {720: 2}})
+
+        cache.clear()
+        self.client.get(reverse('find_table'),
+                        {'restaurant': 'test-bistro', 'people': 2})
+        self.assertEqual(seats_taken(self.restaurant),
+                         {self.booking_date: {720: 2}})
+
+    def test_writes_keep_the_request_on_the_primary(self):
+        """
+        A GET request reads from the replica until it writes; other
+        requests and code outside requests read from the primary.
+        """
+        used = []
+
+        def view(request):
+            used.append(router.db_for_read(Booking))
+            with read_from_primary():
+                used.append(router.db_for_read(Booking))
+            used.append(router.db_for_read(Booking))
+            used.append(router.db_for_write(Booking))
+            used.append(router.db_for_read(Booking))
+            return HttpResponse()
+
+        middleware = ReplicaMiddleware(view)
+        response = middleware(RequestFactory().get('/'))
+        self.assertEqual(
+            used, ['replica', 'default', 'replica', 'default', 'default']
+        )
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+        used.clear()
+        middleware(RequestFactory().post('/'))
+        self.assertEqual(used[0], 'default')
+        self.assertEqual(router.db_for_read(Booking), 'default')
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_without_replicas_everything_uses_the_primary(self):
+        """ No replicas configured: no routing and no cookie. """
+        response = self.client.get(reverse('my_bookings'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(router.db_for_read(Booking), 'default')
+        self.assertNotIn(PIN_COOKIE, response.cookies)
@@ -0,0 +1,64 @@
+import os
+import tempfile
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+
+class TestStaticFilesStorage(SimpleTestCase):
+    """ Tests for the minified, hashed and compressed static files. """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        root = tempfile.TemporaryDirectory()
+        cls.addClassCleanup(root.cleanup)
+        cls.root = root.name
+        settings = override_settings(STATIC_ROOT=cls.root, STORAGES={
+            'default': {
+                'BACKEND': 'django.core.files.storage.FileSystemStorage',
+            },
+            'staticfiles': {
+                'BACKEND': 'kode_restaurant.storage.StaticFilesStorage',
+            },
+        })
+        settings.enable()
+        cls.addClassCleanup(settings.disable)
+        call_command('collectstatic', interactive=False, verbosity=0)
+
+    def read(self, name):
+        with open(os.path.join(self.root, name), encoding='utf-8') as file:
+            return file.read()
+
+    def test_css_and_js_are_minified_and_hashed(self):
+        """ Hashed copies are minified, with CSS urls pointing at hashes. """
+        css = staticfiles_storage.stored_name('css/style.css')
+        js = staticfiles_storage.stored_name('js/bookings.js')
+        self.assertNotEqual(css, 'css/style.css')
+        self.assertNotIn('\n\n', self.read(css))
+        self.assertNotIn('/*', self.read(js))
+        self.assertIn(
+            staticfiles_storage.stored_name('images/background.webp')
+            .split('/')[-1],
+            self.read(css)
+        )
+
+    def test_files_are_precompressed(self):
+        """ gzip and brotli versions are written next to each file. """
+        js = staticfiles_storage.stored_name('js/bookings.js')
+        for suffix in ('.gz', '.br'):
+            self.assertTrue(
+                os.path.exists(os.path.join(self.root, js + suffix))
+            )
+
+    def test_hashed_files_are_immutable(self):
+        """ WhiteNoise serves hashed names with far-future caching. """
+        middleware = WhiteNoiseMiddleware(lambda request: None)
+        js = staticfiles_storage.stored_name('js/bookings.js')
+        self.assertTrue(
+            middleware.immutable_file_test(None, f'/static/{js}')
+        )
+        self.assertFalse(
+            middleware.immutable_file_test(None, '/static/js/bookings.js')
+        )
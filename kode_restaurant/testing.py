@@ -0,0 +1,49 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryCountMixin:
+    """
+    Assertions pinning the number of queries a request runs, for
+    ``TestCase`` classes.
+
+    :meth:`assertQueryCounts` grows the test data through several sizes
+    and checks the count at each one, so a view that starts running a
+    query per row (an N+1) fails even when its count for one row is
+    unchanged.
+    """
+    # Numbers of rows the data is grown to.
+    query_count_sizes = (1, 5, 20)
+
+    def count_queries(self, request):
+        """
+        Return the queries run by ``request()``, which must return a
+        successful or redirect response.
+        """
+        with CaptureQueriesContext(connection) as captured:
+            response = request()
+        self.assertLess(
+            response.status_code, 400,
+            f"The request failed with status {response.status_code}."
+        )
+        return captured.captured_queries
+
+    def assertQueryCounts(self, expected, request, grow, sizes=None):
+        """
+        Assert that ``request()`` runs ``expected`` queries after each
+        call of ``grow(size)``, which adds rows until there are ``size``.
+        """
+        counts, queries = {}, {}
+        for size in sizes or self.query_count_sizes:
+            grow(size)
+            queries[size] = self.count_queries(request)
+            counts[size] = len(queries[size])
+        if len(set(counts.values())) > 1:
+            self.fail(f"The number of queries grows with the rows: {counts}")
+        size, count = counts.popitem()
+        if count != expected:
+            sql = "\n".join(
+                f"{i}. {query['sql']}"
+                for i, query in enumerate(queries[size], start=1)
+            )
+            self.fail(f"Expected {expected} queries, got {count}:\n{sql}")
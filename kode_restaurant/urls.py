@@ -16,10 +16,12 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
+from .metrics import metrics_view
 
 urlpatterns = [
     path("accounts/", include("allauth.urls")),
     path('admin/', admin.site.urls),
     path('booking/', include('booking.urls')),
+    path('metrics/', metrics_view, name='metrics'),
     path('', include('restaurant.urls')),
 ]
\ No newline at end of file
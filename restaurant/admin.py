@@ -1,6 +1,39 @@
 from django.contrib import admin
+from django.core.exceptions import ValidationError
+from django.forms.models import BaseInlineFormSet
 from .models import Restaurant
 from .models import RestaurantCarouselImage
+from .models import Table
+
+
+class TableFormSet(BaseInlineFormSet):
+    """
+    Checks that the active tables of a restaurant do not seat more
+    people than its ``table_capacity``.
+    """
+    def clean(self):
+        super().clean()
+        seats = sum(
+            form.cleaned_data.get('seats') or 0
+            for form in self.forms
+            if form.cleaned_data.get('is_active')
+            and not form.cleaned_data.get('DELETE')
+        )
+        if seats > self.instance.table_capacity:
+            raise ValidationError(
+                f"The active tables seat {seats} people, more than the "
+                f"table capacity of {self.instance.table_capacity}."
+            )
+
+
+class TableInline(admin.TabularInline):
+    """
+    Edits the :model:`restaurant.Table` rows of a restaurant, which
+    bookings are seated at.
+    """
+    model = Table
+    formset = TableFormSet
+    extra = 0
 
 
 # Register your models here.
@@ -15,6 +48,10 @@ class RestaurantAdmin(admin.ModelAdmin):
     - city
     - phone_number
     - is_active
+
+    **Features:**
+
+    - Tables are edited on the restaurant's page.
     """
     list_display = (
         'name',
@@ -25,6 +62,7 @@ class RestaurantAdmin(admin.ModelAdmin):
         'online_capacity'
     )
     prepopulated_fields = {'slug': ('name',)}
+    inlines = [TableInline]
 
 
 @admin.register(RestaurantCarouselImage)
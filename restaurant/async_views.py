@@ -0,0 +1,29 @@
+from django.shortcuts import render
+from kode_restaurant.async_utils import aget_user
+from .cache import HOME, apage_context, cache_anonymous_page
+
+
+@cache_anonymous_page
+async def home(request):
+    """
+    Async version of :view:`restaurant.views.home`, used when
+    ``ASYNC_VIEWS`` is enabled.
+    """
+    context = await apage_context(HOME)
+    await aget_user(request)
+    return render(request, 'restaurant/restaurant_detail.html', context)
+
+
+@cache_anonymous_page
+async def restaurant_detail(request, slug):
+    """
+    Async version of :view:`restaurant.views.restaurant_detail`, used
+    when ``ASYNC_VIEWS`` is enabled.
+
+    The restaurant and its carousel images are read with the async ORM;
+    the user is loaded before rendering so the template does not query
+    the database from the event loop.
+    """
+    context = await apage_context(slug)
+    await aget_user(request)
+    return render(request, 'restaurant/restaurant_detail.html', context)
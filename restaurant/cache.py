@@ -0,0 +1,277 @@
+from asyncio import iscoroutinefunction
+from functools import wraps
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Prefetch
+from django.http import Http404, HttpResponse
+from kode_restaurant.replicas import read_from_primary
+from .models import Restaurant, RestaurantCarouselImage
+
+# Cache key part used for the home page, which is not addressed by slug.
+HOME = '__home__'
+
+# Cache key of the featured restaurant's primary key, shared by every
+# process and dropped by the restaurant signals.
+FEATURED_KEY = 'restaurant:featured'
+
+
+def page_cache():
+    """
+    Return the cache holding restaurant pages, ``default`` unless
+    ``RESTAURANT_PAGE_CACHE_ALIAS`` names another entry of ``CACHES``.
+    """
+    return caches[getattr(settings, 'RESTAURANT_PAGE_CACHE_ALIAS', 'default')]
+
+
+def page_timeout():
+    return getattr(settings, 'RESTAURANT_PAGE_CACHE_TIMEOUT', 60 * 60 * 24)
+
+
+def context_cache_key(page):
+    return f"restaurant:context:{page}"
+
+
+def static_version():
+    """
+    Return the hash of the static files manifest written by
+    ``collectstatic``, or an empty string without a manifest.
+    """
+    return getattr(staticfiles_storage, 'manifest_hash', '') or ''
+
+
+def response_cache_key(page):
+    # Rendered pages link to hashed static file names, so a deploy that
+    # changes a static file must not serve pages cached before it.
+    return f"restaurant:page:{static_version()}:{page}"
+
+
+def _first(queryset):
+    """Return the first row of an already ordered or filtered queryset."""
+    return next(iter(queryset[:1]), None)
+
+
+def featured_restaurant_id():
+    """
+    Return the primary key of the restaurant shown on the home page.
+
+    This is the restaurant named by ``FEATURED_RESTAURANT_SLUG`` or, when
+    the setting is empty or names no restaurant, the active restaurant
+    with the lowest primary key. The result is kept in the page cache
+    until a restaurant changes; returns None while there are no
+    restaurants.
+    """
+    pk = page_cache().get(FEATURED_KEY)
+    if pk is None:
+        restaurants = Restaurant.objects.values_list('pk', flat=True)
+        slug = getattr(settings, 'FEATURED_RESTAURANT_SLUG', None)
+        pk = _first(restaurants.filter(slug=slug)) if slug else None
+        if pk is None:
+            pk = _first(restaurants.filter(is_active=True).order_by('pk'))
+        if pk is None:
+            return None
+        page_cache().set(FEATURED_KEY, pk, page_timeout())
+    return pk
+
+
+def forget_featured_restaurant():
+    """
+    Resolve the featured restaurant again on the next home page, in
+    every process; like :func:`invalidate_pages`, the key is dropped now
+    and again once the current transaction commits.
+    """
+    page_cache().delete(FEATURED_KEY)
+    transaction.on_commit(lambda: page_cache().delete(FEATURED_KEY))
+
+
+def _with_images(**lookup):
+    return Restaurant.objects.filter(**lookup).prefetch_related(
+        Prefetch(
+            'carousel_images',
+            queryset=RestaurantCarouselImage.objects.order_by('order', 'id'),
+        )
+    )
+
+
+def load_restaurant(**lookup):
+    """
+    Return the restaurant matching ``lookup`` with its carousel images
+    prefetched in display order, or None.
+    """
+    return _first(_with_images(**lookup))
+
+
+async def aload_restaurant(**lookup):
+    """Async version of :func:`load_restaurant`."""
+    async for restaurant in _with_images(**lookup)[:1]:
+        return restaurant
+    return None
+
+
+def featured_restaurant():
+    """
+    Return the featured restaurant with its carousel images, or None if
+    there are no restaurants.
+    """
+    pk = featured_restaurant_id()
+    restaurant = load_restaurant(pk=pk) if pk else None
+    if pk and restaurant is None:
+        # Deleted by another process since it was resolved here.
+        forget_featured_restaurant()
+        pk = featured_restaurant_id()
+        restaurant = load_restaurant(pk=pk) if pk else None
+    return restaurant
+
+
+def _context(restaurant):
+    images = list(restaurant.carousel_images.all()) if restaurant else []
+    for image in images:
+        # Build the variant URLs now so they are cached with the page.
+        image.sources
+    return {
+        'restaurant': restaurant,
+        'carousel_images': images,
+    }
+
+
+def page_context(page):
+    """
+    Return the ``restaurant`` and ``carousel_images`` context of a page,
+    from the cache when possible.
+
+    ``page`` is a restaurant slug or :data:`HOME`, which shows the
+    featured restaurant. Raises ``Http404`` for an unknown slug.
+
+    The page is read from the primary database, so a replica lagging
+    behind a change cannot put the old page back in the cache.
+    """
+    key = context_cache_key(page)
+    context = page_cache().get(key)
+    if context is None:
+        with read_from_primary():
+            if page == HOME:
+                restaurant = featured_restaurant()
+            else:
+                restaurant = load_restaurant(slug=page)
+                if restaurant is None:
+                    raise Http404("No restaurant matches the given slug.")
+            context = _context(restaurant)
+        page_cache().set(key, context, page_timeout())
+    return context
+
+
+async def apage_context(page):
+    """Async version of :func:`page_context`."""
+    key = context_cache_key(page)
+    context = await page_cache().aget(key)
+    if context is None:
+        with read_from_primary():
+            if page == HOME:
+                restaurant = await sync_to_async(featured_restaurant)()
+            else:
+                restaurant = await aload_restaurant(slug=page)
+                if restaurant is None:
+                    raise Http404("No restaurant matches the given slug.")
+            context = _context(restaurant)
+        await page_cache().aset(key, context, page_timeout())
+    return context
+
+
+def is_anonymous_visit(request):
+    """
+    Return True for a GET request without a session or pending messages,
+    whose page is the same for every visitor and can be served from the
+    cache without loading the user or session.
+    """
+    return (
+        request.method == 'GET'
+        and not request.GET
+        and settings.SESSION_COOKIE_NAME not in request.COOKIES
+        and 'messages' not in request.COOKIES
+    )
+
+
+def cache_anonymous_page(view):
+    """
+    Serve the full response of a restaurant page to anonymous visitors
+    from the cache, keyed by slug and :func:`static_version`. Works for
+    sync and async views.
+
+    Signed-in users always get a freshly rendered page, built from the
+    cached context of :func:`page_context`.
+    """
+    def cache_key(request, kwargs):
+        if is_anonymous_visit(request):
+            return response_cache_key(kwargs.get('slug', HOME))
+        return None
+
+    def cached_response(cached):
+        content, content_type = cached
+        return HttpResponse(content, content_type=content_type)
+
+    def cacheable(response):
+        if response.status_code == 200 and not response.cookies:
+            return (response.content, response['Content-Type'])
+        return None
+
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            key = cache_key(request, kwargs)
+            if key is None:
+                return await view(request, *args, **kwargs)
+            cached = await page_cache().aget(key)
+            if cached is not None:
+                return cached_response(cached)
+            response = await view(request, *args, **kwargs)
+            entry = cacheable(response)
+            if entry:
+                await page_cache().aset(key, entry, page_timeout())
+            return response
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        key = cache_key(request, kwargs)
+        if key is None:
+            return view(request, *args, **kwargs)
+        cached = page_cache().get(key)
+        if cached is not None:
+            return cached_response(cached)
+        response = view(request, *args, **kwargs)
+        entry = cacheable(response)
+        if entry:
+            page_cache().set(key, entry, page_timeout())
+        return response
+    return wrapper
+
+
+def invalidate_pages(*pages):
+    """
+    Drop the cached context and responses of ``pages`` now and again once
+    the current transaction commits, so a concurrent request cannot
+    re-cache the page from before the change.
+    """
+    keys = [
+        key for page in pages
+        for key in (context_cache_key(page), response_cache_key(page))
+    ]
+    page_cache().delete_many(keys)
+    transaction.on_commit(lambda: page_cache().delete_many(keys))
+
+
+def home_shows(restaurant):
+    """
+    Return True if the cached home page shows the given restaurant, if
+    it is not cached, or if the restaurant is the configured featured one
+    and so may replace the restaurant shown.
+    """
+    if restaurant.slug == getattr(settings, 'FEATURED_RESTAURANT_SLUG', None):
+        return True
+    context = page_cache().get(context_cache_key(HOME))
+    if context is None:
+        return True
+    shown = context['restaurant']
+    return shown is None or shown.pk == restaurant.pk
@@ -0,0 +1,50 @@
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+# Widths, in pixels, of the carousel image variants offered to browsers.
+CAROUSEL_WIDTHS = (480, 800, 1200, 1600)
+
+# The carousel fills the screen on phones and half of it from the md
+# breakpoint up.
+CAROUSEL_SIZES = "(min-width: 768px) 50vw, 100vw"
+
+
+def cloudinary_url(resource, width):
+    """
+    Return the URL of a Cloudinary image scaled down to at most ``width``
+    pixels, delivered as WebP or AVIF when the browser accepts them.
+    """
+    return resource.build_url(
+        width=width,
+        crop='limit',
+        fetch_format='auto',
+        quality='auto',
+        secure=True,
+    )
+
+
+def local_url(resource, width):
+    """
+    Return a local media URL for an image variant, for development and
+    tests without a Cloudinary account.
+    """
+    return f"/media/{resource.public_id}.{resource.format}?w={width}"
+
+
+def carousel_sources(resource):
+    """
+    Return the ``src``, ``srcset`` and ``sizes`` attributes of a carousel
+    image, built by the function named in ``CAROUSEL_IMAGE_URL`` (default
+    :func:`cloudinary_url`) for each of ``CAROUSEL_IMAGE_WIDTHS``.
+    """
+    build = import_string(getattr(
+        settings, 'CAROUSEL_IMAGE_URL', 'restaurant.images.cloudinary_url'
+    ))
+    widths = sorted(getattr(settings, 'CAROUSEL_IMAGE_WIDTHS',
+                            CAROUSEL_WIDTHS))
+    urls = [(build(resource, width), width) for width in widths]
+    return {
+        'src': urls[len(urls) // 2][0],
+        'srcset': ", ".join(f"{url} {width}w" for url, width in urls),
+        'sizes': CAROUSEL_SIZES,
+    }
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.23 on 2026-10-18 08:51
+
+from django.db import migrations, models
+import restaurant.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='restaurant',
+            name='time_slots',
+            field=models.JSONField(blank=True, default=restaurant.models.default_time_slots, help_text='Slot start times in minutes after midnight, e.g. 720 for 12:00 PM. Leave empty for the default slots.', validators=[restaurant.models.validate_time_slots]),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.23 on 2026-10-18 09:37
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0002_restaurant_time_slots'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Table',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=20)),
+                ('seats', models.PositiveSmallIntegerField()),
+                ('join_group', models.CharField(blank=True, help_text='Tables with the same group can be joined for larger parties. Leave empty if the table stands alone.', max_length=20)),
+                ('is_active', models.BooleanField(default=True)),
+                ('restaurant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tables', to='restaurant.restaurant')),
+            ],
+            options={
+                'ordering': ['restaurant', 'name'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='table',
+            constraint=models.UniqueConstraint(fields=('restaurant', 'name'), name='unique_table_name'),
+        ),
+    ]
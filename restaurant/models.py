@@ -1,13 +1,61 @@
 from django.db import models
+from django.core.exceptions import ValidationError
 from django.core.validators import MaxLengthValidator
+from django.utils.functional import cached_property
 from cloudinary.models import CloudinaryField
+from .images import carousel_sources
+
+# Length of every time slot, in minutes.
+SLOT_LENGTH = 90
+
+# Slot start times in minutes after midnight: 12:00 PM, 1:30 PM, 3:00 PM,
+# 6:00 PM, 7:30 PM and 9:00 PM.
+DEFAULT_TIME_SLOTS = [720, 810, 900, 1080, 1170, 1260]
+
+
+def default_time_slots():
+    return list(DEFAULT_TIME_SLOTS)
+
+
+def format_minutes(minutes):
+    """
+    Format minutes after midnight as a 12-hour clock time, e.g. '1:30 PM'.
+    """
+    hours, minutes = divmod(minutes % (24 * 60), 60)
+    suffix = 'AM' if hours < 12 else 'PM'
+    return f"{(hours - 1) % 12 + 1}:{minutes:02d} {suffix}"
+
+
+def slot_label(start):
+    """
+    Return the display label of the slot starting ``start`` minutes
+    after midnight, e.g. '12:00 PM - 1:30 PM'.
+    """
+    return f"{format_minutes(start)} - {format_minutes(start + SLOT_LENGTH)}"
+
+
+def validate_time_slots(value):
+    """
+    Check that ``value`` is a list of distinct slot start times, each a
+    whole number of minutes within the day.
+    """
+    if not isinstance(value, list) or not all(
+        isinstance(start, int) and 0 <= start < 24 * 60 for start in value
+    ):
+        raise ValidationError(
+            "Enter a list of start times in minutes after midnight, "
+            "e.g. [720, 810] for 12:00 PM and 1:30 PM."
+        )
+    if len(set(value)) != len(value):
+        raise ValidationError("Each start time can only be listed once.")
 
 
 # Create your models here.
 class Restaurant(models.Model):
     """
     Stores information about a restaurant, including contact details,
-    description, table and online capacities.
+    description, table and online capacities, and the time slots it
+    offers for online booking.
     """
     name = models.CharField(max_length=100, unique=True)
     slug = models.SlugField(unique=True)
@@ -22,10 +70,64 @@ class Restaurant(models.Model):
     is_active = models.BooleanField(default=True)
     table_capacity = models.PositiveIntegerField(default=80)
     online_capacity = models.PositiveIntegerField(default=50)
+    time_slots = models.JSONField(
+        default=default_time_slots,
+        blank=True,
+        validators=[validate_time_slots],
+        help_text="Slot start times in minutes after midnight, "
+                  "e.g. 720 for 12:00 PM. Leave empty for the default slots."
+    )
 
     def __str__(self):
         return self.name
 
+    def get_time_slots(self):
+        """
+        Return the ``(start, label)`` pairs of the slots this restaurant
+        offers, in time order.
+        """
+        return [
+            (start, slot_label(start))
+            for start in sorted(self.time_slots or DEFAULT_TIME_SLOTS)
+        ]
+
+
+class Table(models.Model):
+    """
+    Stores one physical table of a :model:`restaurant.Restaurant`.
+
+    Bookings of restaurants with tables are seated at a table, or at
+    several tables of the same ``join_group`` pushed together; see
+    :mod:`booking.tables`. Restaurants without tables are only limited
+    by their online capacity.
+    """
+    restaurant = models.ForeignKey(
+        Restaurant,
+        related_name='tables',
+        on_delete=models.CASCADE
+    )
+    name = models.CharField(max_length=20)
+    seats = models.PositiveSmallIntegerField()
+    join_group = models.CharField(
+        max_length=20,
+        blank=True,
+        help_text="Tables with the same group can be joined for larger "
+                  "parties. Leave empty if the table stands alone."
+    )
+    is_active = models.BooleanField(default=True)
+
+    class Meta:
+        ordering = ['restaurant', 'name']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['restaurant', 'name'],
+                name='unique_table_name'
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.seats} seats)"
+
 
 class RestaurantCarouselImage(models.Model):
     """
@@ -47,3 +149,15 @@ class RestaurantCarouselImage(models.Model):
 
     def __str__(self):
         return f"{self.restaurant.name} - Image{self.order}"
+
+    @cached_property
+    def sources(self):
+        """
+        The ``src``, ``srcset`` and ``sizes`` of the image's resized
+        variants, built once per instance and kept with the cached page
+        context.
+        """
+        image = self.image
+        if isinstance(image, str):
+            image = self._meta.get_field('image').to_python(image)
+        return carousel_sources(image)
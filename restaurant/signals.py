@@ -0,0 +1,46 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from .cache import (
+    HOME, forget_featured_restaurant, home_shows, invalidate_pages
+)
+from .models import Restaurant, RestaurantCarouselImage
+
+
+def invalidate_restaurant_pages(restaurant, *slugs):
+    """
+    Drop the cached pages of one restaurant, including the home page
+    when it shows that restaurant.
+    """
+    pages = list(slugs)
+    if home_shows(restaurant):
+        pages.append(HOME)
+    invalidate_pages(*pages)
+
+
+@receiver(pre_save, sender=Restaurant)
+def remember_previous_slug(sender, instance, raw=False, **kwargs):
+    """Keep the stored slug so a renamed restaurant's old page is dropped."""
+    instance._previous_slug = None
+    if instance.pk and not raw:
+        instance._previous_slug = (
+            Restaurant.objects.filter(pk=instance.pk)
+            .values_list('slug', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Restaurant)
+@receiver(post_delete, sender=Restaurant)
+def restaurant_changed(sender, instance, **kwargs):
+    forget_featured_restaurant()
+    slugs = {instance.slug, getattr(instance, '_previous_slug', None)}
+    invalidate_restaurant_pages(instance, *filter(None, slugs))
+
+
+@receiver(post_save, sender=RestaurantCarouselImage)
+@receiver(post_delete, sender=RestaurantCarouselImage)
+def carousel_image_changed(sender, instance, **kwargs):
+    restaurant = Restaurant.objects.filter(
+        pk=instance.restaurant_id
+    ).only('slug').first()
+    if restaurant:
+        invalidate_restaurant_pages(restaurant, restaurant.slug)
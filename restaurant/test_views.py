@@ -1,12 +1,19 @@
+from unittest import mock
 from django.urls import reverse
-from django.test import TestCase
-from .models import Restaurant, RestaurantCarouselImage
+from django.test import TestCase, override_settings
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from .cache import (
+    FEATURED_KEY, HOME, context_cache_key, page_cache, response_cache_key
+)
+from .models import Restaurant, RestaurantCarouselImage, validate_time_slots
 
 
 class TestRestaurantViews(TestCase):
     """ Tests for restaurant views: home + detail."""
 
     def setUp(self):
+        page_cache().clear()
         self.restaurant = Restaurant.objects.create(
             name="Test Bistro",
             slug="test-bistro",
@@ -82,6 +89,207 @@ class TestRestaurantViews(TestCase):
         self.assertEqual(response.status_code, 404)
 
 
+class TestCarouselImages(TestCase):
+    """ Tests for the responsive, lazily loaded carousel images. """
+
+    def setUp(self):
+        page_cache().clear()
+        self.restaurant = Restaurant.objects.create(
+            name="Test Bistro",
+            slug="test-bistro",
+            address="Restaurant address",
+            city="Restaurant city",
+            phone_number="123456789",
+            description="Test place"
+        )
+        for order in (0, 1):
+            RestaurantCarouselImage.objects.create(
+                restaurant=self.restaurant,
+                image=f"image/upload/v17/carousel/test{order}.jpg",
+                order=order
+            )
+        self.url = reverse('restaurant_detail', args=['test-bistro'])
+
+    def test_srcset_of_cloudinary_variants(self):
+        """ Images offer resized WebP/AVIF variants; later ones lazy-load. """
+        response = self.client.get(self.url)
+        self.assertContains(
+            response, "/image/upload/c_limit,f_auto,q_auto,w_480/v17/"
+            "carousel/test0.jpg 480w"
+        )
+        self.assertContains(response, "w_1600/v17/carousel/test1.jpg 1600w")
+        self.assertContains(response, 'fetchpriority="high"', count=1)
+        self.assertContains(response, 'loading="lazy"', count=1)
+        self.assertNotContains(response, 'src="http://')
+
+    @override_settings(CAROUSEL_IMAGE_URL='restaurant.images.local_url',
+                       CAROUSEL_IMAGE_WIDTHS=[300, 600])
+    def test_local_urls(self):
+        """ The local builder serves variants without Cloudinary. """
+        response = self.client.get(self.url)
+        self.assertContains(
+            response, 'srcset="/media/carousel/test0.jpg?w=300 300w, '
+            '/media/carousel/test0.jpg?w=600 600w"'
+        )
+
+    def test_urls_are_built_once(self):
+        """ Signed-in renders reuse the URLs kept in the cached context. """
+        user = User.objects.create_user(username="diner", password="pw")
+        self.client.force_login(user)
+        with mock.patch('restaurant.images.cloudinary_url',
+                        return_value="https://img/x") as build:
+            self.client.get(self.url)
+            self.client.get(self.url)
+        self.assertEqual(build.call_count, 8)
+
+
+class TestRestaurantPageCache(TestCase):
+    """ Tests for the cached restaurant pages and their invalidation. """
+
+    def setUp(self):
+        page_cache().clear()
+        self.restaurant = Restaurant.objects.create(
+            name="Test Bistro",
+            slug="test-bistro",
+            address="Restaurant address",
+            city="Restaurant city",
+            phone_number="123456789",
+            description="Test place"
+        )
+        self.other = Restaurant.objects.create(
+            name="Other Bistro",
+            slug="other-bistro",
+            address="Other address",
+            city="Other city",
+            phone_number="987654321",
+            description="Other place"
+        )
+        self.image = RestaurantCarouselImage.objects.create(
+            restaurant=self.restaurant,
+            image="carousel/test1.webp",
+            caption="First slide",
+        )
+        self.url = reverse('restaurant_detail', args=['test-bistro'])
+
+    def test_anonymous_page_served_without_queries(self):
+        """ A cached page is served to anonymous visitors with no queries. """
+        self.client.get(self.url)
+        self.client.get(reverse('home'))
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+            home = self.client.get(reverse('home'))
+        self.assertContains(response, "Test place")
+        self.assertContains(home, "Test place")
+
+    def test_static_files_deploy_refreshes_pages(self):
+        """
+        Pages cached before new static files were collected are not
+        served, as they link to the previous hashed file names.
+        """
+        self.client.get(self.url)
+        with mock.patch('restaurant.cache.static_version',
+                        return_value='0123abcd'):
+            key = response_cache_key('test-bistro')
+            self.assertIsNone(page_cache().get(key))
+            self.client.get(self.url)
+            self.assertIsNotNone(page_cache().get(key))
+
+    def test_restaurant_change_refreshes_its_pages(self):
+        """ Saving a restaurant drops its page and the home page. """
+        self.client.get(self.url)
+        self.client.get(reverse('home'))
+        self.restaurant.description = "Updated place"
+        self.restaurant.save()
+        self.assertContains(self.client.get(self.url), "Updated place")
+        self.assertContains(self.client.get(reverse('home')), "Updated place")
+
+    def test_other_restaurant_change_keeps_pages(self):
+        """ Saving another restaurant leaves unrelated pages cached. """
+        self.client.get(self.url)
+        self.client.get(reverse('home'))
+        self.other.description = "Updated other"
+        self.other.save()
+        cache = page_cache()
+        self.assertIsNotNone(cache.get(response_cache_key('test-bistro')))
+        self.assertIsNotNone(cache.get(response_cache_key(HOME)))
+
+    def test_carousel_image_change_refreshes_page(self):
+        """ Deleting a carousel image drops its restaurant's page. """
+        self.assertContains(self.client.get(self.url), "First slide")
+        self.image.delete()
+        self.assertNotContains(self.client.get(self.url), "First slide")
+
+    def test_renamed_restaurant_drops_old_page(self):
+        """ Changing the slug drops the page cached under the old slug. """
+        self.client.get(self.url)
+        self.restaurant.slug = "renamed-bistro"
+        self.restaurant.save()
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    def test_signed_in_user_gets_own_page(self):
+        """ Signed-in users are not served the anonymous page. """
+        self.client.get(self.url)
+        user = User.objects.create_user(username="diner", password="pass")
+        self.client.force_login(user)
+        response = self.client.get(self.url)
+        self.assertContains(response, "Logout")
+        self.assertContains(response, "Test place")
+
+
+class TestFeaturedRestaurant(TestCase):
+    """ Tests for the restaurant shown on the home page. """
+
+    def setUp(self):
+        page_cache().clear()
+        self.first = Restaurant.objects.create(
+            name="First Bistro", slug="first-bistro", address="1 Street",
+            city="Town", phone_number="111", description="First place"
+        )
+        self.featured = Restaurant.objects.create(
+            name="Featured Bistro", slug="featured-bistro",
+            address="2 Street", city="Town", phone_number="222",
+            description="Featured place"
+        )
+
+    @override_settings(FEATURED_RESTAURANT_SLUG='featured-bistro')
+    def test_home_shows_featured_restaurant(self):
+        """ The restaurant named in the setting is shown on the home page. """
+        response = self.client.get(reverse('home'))
+        self.assertEqual(response.context['restaurant'], self.featured)
+
+    @override_settings(FEATURED_RESTAURANT_SLUG='missing-bistro')
+    def test_home_falls_back_to_first_active_restaurant(self):
+        """ Without the featured restaurant the first active one is shown. """
+        self.first.is_active = False
+        self.first.save()
+        response = self.client.get(reverse('home'))
+        self.assertEqual(response.context['restaurant'], self.featured)
+
+    @override_settings(FEATURED_RESTAURANT_SLUG='featured-bistro')
+    def test_featured_restaurant_resolved_once(self):
+        """
+        Later renders, in any process, load the restaurant and images in
+        two queries until a restaurant changes.
+        """
+        self.client.get(reverse('home'))
+        page_cache().delete_many(
+            [context_cache_key(HOME), response_cache_key(HOME)]
+        )
+        with self.assertNumQueries(2):
+            self.client.get(reverse('home'))
+
+        self.first.save()
+        self.assertIsNone(page_cache().get(FEATURED_KEY))
+
+    def test_home_with_no_restaurants(self):
+        """ The home page renders when there are no restaurants. """
+        Restaurant.objects.all().delete()
+        response = self.client.get(reverse('home'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.context['restaurant'])
+        self.assertNotContains(response, "Book a Table")
+
+
 class TestRestaurantModels(TestCase):
     """ Tests for Restaurant and CarouselImage models. """
 
@@ -126,3 +334,25 @@ class TestRestaurantModels(TestCase):
         """Check __str__ returns a descriptive string for carousel images."""
         self.assertEqual(str(self.carousel1), "Test Bistro - Image0")
         self.assertEqual(str(self.carousel2), "Test Bistro - Image1")
+
+    def test_default_time_slots(self):
+        """Restaurants offer the six default slots, labelled in order."""
+        slots = self.restaurant.get_time_slots()
+        self.assertEqual(len(slots), 6)
+        self.assertEqual(slots[0], (720, "12:00 PM - 1:30 PM"))
+        self.assertEqual(slots[1], (810, "1:30 PM - 3:00 PM"))
+
+    def test_custom_time_slots(self):
+        """Configured slots are returned sorted by start time."""
+        self.restaurant.time_slots = [1140, 690]
+        self.assertEqual(self.restaurant.get_time_slots(), [
+            (690, "11:30 AM - 1:00 PM"),
+            (1140, "7:00 PM - 8:30 PM"),
+        ])
+
+    def test_time_slots_validation(self):
+        """Slot start times must be distinct minutes within the day."""
+        validate_time_slots([720, 810])
+        for invalid in ([720, 720], [1440], ["12:00"], 720):
+            with self.assertRaises(ValidationError):
+                validate_time_slots(invalid)
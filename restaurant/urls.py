@@ -1,7 +1,11 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
+
+# With ASYNC_VIEWS the pages are served by their async versions.
+pages = async_views if settings.ASYNC_VIEWS else views
 
 urlpatterns = [
-    path('', views.home, name='home'),  # default to home view
-    path('<slug:slug>/', views.restaurant_detail, name='restaurant_detail'),
-]
\ No newline at end of file
+    path('', pages.home, name='home'),  # default to home view
+    path('<slug:slug>/', pages.restaurant_detail, name='restaurant_detail'),
+]
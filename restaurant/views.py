@@ -1,17 +1,21 @@
-from django.shortcuts import render, get_object_or_404
-from .models import Restaurant
+from django.shortcuts import render
+from .cache import HOME, cache_anonymous_page, page_context
 
 
 # Create your views here.
+@cache_anonymous_page
 def home(request):
     """
-    Display the home page showing the first available restaurant.
+    Display the home page showing the featured restaurant.
+
+    Anonymous visitors are served the cached page; see
+    :func:`restaurant.cache.cache_anonymous_page`.
 
     **Context:**
 
     ``restaurant``
-        An instance of :model:`restaurant.Restaurant`,
-        the first restaurant in the database.
+        The featured :model:`restaurant.Restaurant` (see
+        ``FEATURED_RESTAURANT_SLUG``), or None if there are no restaurants.
     ``carousel_images``
         All carousel images related to the selected restaurant.
 
@@ -19,18 +23,18 @@ def home(request):
 
     :template:`restaurant/restaurant_detail.html`
     """
-    restaurant = Restaurant.objects.first()
-    carousel_images = restaurant.carousel_images.all().order_by('order', 'id')
-    return render(request, 'restaurant/restaurant_detail.html', {
-        'restaurant': restaurant,
-        'carousel_images': carousel_images,
-        })
+    return render(request, 'restaurant/restaurant_detail.html',
+                  page_context(HOME))
 
 
+@cache_anonymous_page
 def restaurant_detail(request, slug):
     """
     Display details for a specific restaurant identified by its slug.
 
+    Anonymous visitors are served the cached page; see
+    :func:`restaurant.cache.cache_anonymous_page`.
+
     **Context**
 
     ``restaurant``
@@ -42,9 +46,5 @@ def restaurant_detail(request, slug):
 
     :template:`restaurant/restaurant_detail.html`
     """
-    restaurant = get_object_or_404(Restaurant, slug=slug)
-    carousel_images = restaurant.carousel_images.all().order_by('order', 'id')
-    return render(request, 'restaurant/restaurant_detail.html', {
-        'restaurant': restaurant,
-        'carousel_images': carousel_images,
-    })
+    return render(request, 'restaurant/restaurant_detail.html',
+                  page_context(slug))
@@ -1,28 +1,43 @@
 document.addEventListener("DOMContentLoaded", function() {
   const editForm = document.getElementById("editForm");
   const peopleField = document.getElementById("id_number_of_people");
-  const editButtons = document.querySelectorAll(".btn-edit");
 
   const closeButton = document.getElementById("closeButton");
 
   const cancelModal = new bootstrap.Modal(document.getElementById("cancelModal"));
-  const cancelButtons = document.getElementsByClassName("btn-cancel");
   const cancelConfirm = document.getElementById("confirmCancel");
+  let cancelBookingId = null;
 
   /*
-   * Initializes edit functionality for the provided edit buttons.
+   * Handles clicks on the booking buttons through a single listener on the
+   * document, so rows added by "Load more" work without extra listeners.
    * *
-   * For each button in the `editButtons` collection:
-   * - Retrives the associated booking's ID upon click.
+   * When an edit button is clicked:
+   * - Retrives the associated booking's ID.
    * - Fetches the current number of people for that booking.
    * - Populates the `peopleField` select input with the current number.
    * - Sets the `editForm` action attribute to `/booking/edit-booking/{bookingID}`.
    * - Displays the hidden edit form.
    * - Scrolls smoothly to the edit form for better user experience.
+   *
+   * When a cancel button is clicked:
+   * - Stores the booking ID for the `confirmCancel` button.
+   * - Shows the Bootstrap confirmation modal.
+   *
+   * When a "Load more" button is clicked, loads the next page of bookings.
    */
+  document.addEventListener("click", (e) => {
+    const button = e.target.closest(".btn-edit[data-id], .btn-cancel, .load-more");
+    if (!button) {
+      return;
+    }
 
-  editButtons.forEach(button => {
-    button.addEventListener("click", () => {
+    if (button.classList.contains("load-more")) {
+      loadMore(button);
+    } else if (button.classList.contains("btn-cancel")) {
+      cancelBookingId = button.dataset.id;
+      cancelModal.show();
+    } else {
       const bookingId = button.dataset.id;
       const currentPeople = document.getElementById(`people${bookingId}`).innerText;
 
@@ -32,34 +47,49 @@ document.addEventListener("DOMContentLoaded", function() {
 
       // Scroll to form for better UX
       editForm.scrollIntoView({ behavior: "smooth" });
-    });
+    }
   });
 
   /*
-   * Initializes cancellation functionality using a Bootstrap modal for the provided cancel buttons
-   * *
-   * For each button in the `cancelButtons` collection:
-   * - Retrives the associated booking's ID upon click.
-   * - Stores the booking ID in a temporary variable.
-   * - Updates the `confirmCancel` button's href.
-   * - Shows the Bootstrap confirmation modal.
-   * 
    * When the "Yes,Cancel" button is clicked:
    * - Checks if a booking ID is stored.
    * Redirects the user to `/booking/cancel-booking/{bookingID}` to performthe cancellation.
    */
+  cancelConfirm.addEventListener("click", () => {
+    if (cancelBookingId) {
+      window.location.href = `/booking/cancel-booking/${cancelBookingId}`;
+    }
+  });
+
+  /*
+   * Fetches the next page of a section from the "load more" endpoint.
+   *
+   * - Appends the returned table rows and mobile cards to the section.
+   * - Moves the button's cursor on, or removes the button on the last page.
+   */
+  function loadMore(button) {
+    const section = button.dataset.section;
+    const params = new URLSearchParams({ section: section, after: button.dataset.next });
+    button.disabled = true;
 
-  for (let button of cancelButtons) {
-    button.addEventListener("click", (e) => {
-      const bookingId = e.target.getAttribute("data-id");
-      cancelConfirm.addEventListener("click", () => {
-        window.location.href = `/booking/cancel-booking/${bookingId}`;
-      }, { once: true });
-      cancelModal.show();
-    });
+    fetch(`${button.dataset.url}?${params}`)
+      .then(response => response.json())
+      .then(page => {
+        document.getElementById(`${section}-rows`).insertAdjacentHTML("beforeend", page.rows);
+        document.getElementById(`${section}-cards`).insertAdjacentHTML("beforeend", page.cards);
+        if (page.next) {
+          button.dataset.next = page.next;
+          button.disabled = false;
+        } else {
+          button.remove();
+        }
+      })
+      .catch(() => {
+        button.disabled = false;
+      });
   }
-  
-  /* 
+
+  /*
    * Handles the close button of the edit form.
    *
    * - When the `closeButton` is clicked: